@@ -23,4 +23,19 @@ class Settings:
     
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
+    # Practice quiz generation runs as background jobs; these bound how many run at once.
+    PRACTICE_QUIZ_MAX_CONCURRENT = int(os.getenv("PRACTICE_QUIZ_MAX_CONCURRENT", "4"))
+    PRACTICE_QUIZ_MAX_JOBS_PER_USER = int(os.getenv("PRACTICE_QUIZ_MAX_JOBS_PER_USER", "1"))
+    PRACTICE_QUIZ_JOB_TTL_SECONDS = int(os.getenv("PRACTICE_QUIZ_JOB_TTL_SECONDS", "900"))
+
+    # Practice questions are generated by the orchestrator, which schedules them on the shared LLM.
+    ORCHESTRATOR_URL = os.getenv("ORCHESTRATOR_URL", "http://127.0.0.1:8001")
+    PRACTICE_QUIZ_TIMEOUT_SECONDS = float(os.getenv("PRACTICE_QUIZ_TIMEOUT_SECONDS", "600"))
+
+    # Pre-generated practice questions per (course, topic), topped up in the background.
+    PRACTICE_POOL_LOW_WATERMARK = int(os.getenv("PRACTICE_POOL_LOW_WATERMARK", "10"))
+    PRACTICE_POOL_REFILL_SIZE = int(os.getenv("PRACTICE_POOL_REFILL_SIZE", "10"))
+    PRACTICE_POOL_MAX_SIZE = int(os.getenv("PRACTICE_POOL_MAX_SIZE", "100"))
+    PRACTICE_POOL_REFILL_CONCURRENCY = int(os.getenv("PRACTICE_POOL_REFILL_CONCURRENCY", "1"))
+
 settings = Settings()
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -19,6 +20,7 @@ from app.routes.assessment_routes import router as assessment_router
 from app.routes.predict_exam_score import router as predict_exam_score_router
 
 from app.config.settings import settings
+from app.services.practice_pool_service import PracticePoolService
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
@@ -38,6 +40,10 @@ app.add_middleware(
 os.makedirs("uploads/materials", exist_ok=True)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
+@app.on_event("startup")
+async def create_indexes():
+    await asyncio.to_thread(PracticePoolService.ensure_indexes)
+
 @app.get("/")
 def root():
     return {"message": "Backend API running"}
@@ -1,31 +1,48 @@
-from fastapi import APIRouter, Depends
-from orchestrator_server.app.graph.student_quiz_graph import build_student_quiz_graph
-from app.dependencies.auth_dependencies import get_current_user
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, status
+from app.dependencies.auth_dependencies import get_current_user, require_role
+from app.services.practice_quiz_service import PracticeQuizService
 
 
 router = APIRouter()
 
-@router.post("/generate-practice")
+@router.post("/generate-practice", status_code=status.HTTP_202_ACCEPTED)
 async def generate_practice_quiz(
     course_id: str, 
     topic: str, 
     num_questions: int = 5,
     current_user: dict = Depends(get_current_user)
 ):
-    quiz_graph = build_student_quiz_graph()
-    
-    initial_state = {
-        "course_id": course_id,
-        "student_topic": topic,
-        "num_questions": num_questions,
-        "question_count": 0,
-        "questions": [],
-        "step_count": 0
+    job = await PracticeQuizService.start_job(current_user["id"], course_id, topic, num_questions)
+
+    return {
+        "message": "Practice quiz generation started",
+        "job": job
+    }
+
+@router.get("/generate-practice/{job_id}")
+async def get_practice_quiz(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = PracticeQuizService.get_job(job_id, current_user["id"])
+
+    return {
+        "job": job,
+        "quiz_data": job["questions"]
     }
-    
-    final_state = quiz_graph.invoke(initial_state)
-    
+
+@router.delete("/generate-practice/{job_id}")
+async def cancel_practice_quiz(job_id: str, current_user: dict = Depends(get_current_user)):
+    return {"job": PracticeQuizService.cancel_job(job_id, current_user["id"])}
+
+@router.post("/generate-practice/pools/{course_id}/warm", status_code=status.HTTP_202_ACCEPTED)
+async def warm_practice_pools(
+    course_id: str,
+    topics: Optional[List[str]] = Body(None, embed=True),
+    current_user: dict = Depends(require_role("lecturer"))
+):
+    scheduled = await PracticeQuizService.warm_pools(course_id, topics)
+
     return {
-        "message": "Practice quiz generated successfully",
-        "quiz_data": final_state.get("questions", [])
-    }
\ No newline at end of file
+        "message": "Practice pool pre-generation started",
+        "topics": scheduled
+    }
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from bson import ObjectId
+
+from app.config.settings import settings
+from app.database.connection import get_database
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+pool_col = db["practice_pool"]
+sessions_col = db["sessions"]
+
+# Running refill tasks by (course_id, topic_key). Holding them here keeps them from being
+# garbage-collected mid-run, since the event loop only keeps weak references to tasks.
+_refilling: Dict[Tuple[str, str], asyncio.Task] = {}
+_refill_slots = asyncio.Semaphore(settings.PRACTICE_POOL_REFILL_CONCURRENCY)
+
+Generate = Callable[[str, str, int], Awaitable[List[Dict[str, Any]]]]
+
+
+class PracticePoolService:
+    """Pre-generated practice questions per (course, topic).
+
+    Students draw random questions they have not been served before; a pool
+    that runs low is topped up in the background, so the live LLM path is
+    only needed for topics the pool has never seen.
+    """
+
+    @staticmethod
+    def ensure_indexes():
+        """Create the pool's indexes; called once at application startup."""
+        pool_col.create_index([("course_id", 1), ("topic_key", 1)])
+
+    @staticmethod
+    def topic_key(topic: str) -> str:
+        return " ".join(topic.casefold().split())
+
+    @staticmethod
+    def _stem_key(question: Dict[str, Any]) -> str:
+        return " ".join(re.sub(r"[^\w\s]", " ", str(question.get("stem", "")).casefold()).split())
+
+    @staticmethod
+    def size(course_id: str, topic: str) -> int:
+        return pool_col.count_documents(
+            {"course_id": course_id, "topic_key": PracticePoolService.topic_key(topic)}
+        )
+
+    @staticmethod
+    def unseen_count(course_id: str, topic: str, user_id: str) -> int:
+        return pool_col.count_documents(
+            {
+                "course_id": course_id,
+                "topic_key": PracticePoolService.topic_key(topic),
+                "served_to": {"$ne": user_id},
+            }
+        )
+
+    @staticmethod
+    def claim(course_id: str, topic: str, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Up to ``limit`` random pool entries the student had not been served, marked as served.
+
+        Each entry is claimed with a conditional update on its ``served_to``, so
+        concurrent requests from the same student never receive the same entry.
+        """
+        claimed: List[Dict[str, Any]] = []
+        key = PracticePoolService.topic_key(topic)
+        while len(claimed) < limit:
+            candidates = list(
+                pool_col.aggregate(
+                    [
+                        {"$match": {"course_id": course_id, "topic_key": key, "served_to": {"$ne": user_id}}},
+                        {"$sample": {"size": limit - len(claimed)}},
+                    ]
+                )
+            )
+            if not candidates:
+                break
+            for candidate in candidates:
+                entry = pool_col.find_one_and_update(
+                    {"_id": candidate["_id"], "served_to": {"$ne": user_id}},
+                    {"$addToSet": {"served_to": user_id}},
+                )
+                if entry is not None:
+                    claimed.append(entry)
+        return claimed
+
+    @staticmethod
+    def add(course_id: str, topic: str, questions: List[Dict[str, Any]], served_to: List[str] | None = None) -> int:
+        """Add questions to the pool, skipping stems it already holds. Returns how many were added.
+
+        ``served_to`` records students who already received these questions live.
+        """
+        key = PracticePoolService.topic_key(topic)
+        known = {
+            doc["stem_key"]
+            for doc in pool_col.find({"course_id": course_id, "topic_key": key}, {"stem_key": 1})
+        }
+        now = datetime.now(timezone.utc)
+        docs = []
+        repeated = []
+        for question in questions:
+            stem_key = PracticePoolService._stem_key(question)
+            if not stem_key:
+                continue
+            if stem_key in known:
+                repeated.append(stem_key)
+                continue
+            known.add(stem_key)
+            docs.append(
+                {
+                    "course_id": course_id,
+                    "topic_key": key,
+                    "topic": topic,
+                    "stem_key": stem_key,
+                    "question": question,
+                    "served_to": list(served_to or []),
+                    "created_at": now,
+                }
+            )
+        if docs:
+            pool_col.insert_many(docs)
+        if repeated and served_to:
+            # Coalesced live runs hand the same questions to several students.
+            pool_col.update_many(
+                {"course_id": course_id, "topic_key": key, "stem_key": {"$in": repeated}},
+                {"$addToSet": {"served_to": {"$each": list(served_to)}}},
+            )
+        return len(docs)
+
+    @staticmethod
+    def needs_refill(course_id: str, topic: str, user_id: str | None = None) -> bool:
+        size = PracticePoolService.size(course_id, topic)
+        if size >= settings.PRACTICE_POOL_MAX_SIZE:
+            return False
+        if size < settings.PRACTICE_POOL_LOW_WATERMARK:
+            return True
+        return (
+            user_id is not None
+            and PracticePoolService.unseen_count(course_id, topic, user_id) < settings.PRACTICE_POOL_LOW_WATERMARK
+        )
+
+    @staticmethod
+    async def _refill(course_id: str, topic: str, generate: Generate):
+        try:
+            async with _refill_slots:
+                questions = await generate(course_id, topic, settings.PRACTICE_POOL_REFILL_SIZE)
+            added = await asyncio.to_thread(PracticePoolService.add, course_id, topic, questions)
+            logger.info("Practice pool %s/%r: added %d question(s)", course_id, topic, added)
+        except Exception:
+            logger.exception("Practice pool refill failed for %s/%r", course_id, topic)
+
+    @staticmethod
+    def schedule_refill(course_id: str, topic: str, generate: Generate) -> bool:
+        """Top the pool up in the background unless a refill for it is already running."""
+        key = (course_id, PracticePoolService.topic_key(topic))
+        if key in _refilling:
+            return False
+        task = asyncio.create_task(PracticePoolService._refill(course_id, topic, generate))
+        _refilling[key] = task
+        task.add_done_callback(lambda done: _refilling.pop(key, None))
+        return True
+
+    @staticmethod
+    def course_topics(course_id: str) -> List[str]:
+        """Distinct topics of the course's timetabled sessions."""
+        if not ObjectId.is_valid(course_id):
+            return []
+        topics = sessions_col.distinct("topic", {"course_id": ObjectId(course_id)})
+        return [topic for topic in topics if isinstance(topic, str) and topic.strip()]
+
+    @staticmethod
+    async def warm_course(course_id: str, topics: List[str], generate: Generate) -> List[str]:
+        """Schedule refills for every given topic whose pool is low; returns the ones scheduled."""
+        low = await asyncio.to_thread(
+            lambda: [topic for topic in topics if PracticePoolService.needs_refill(course_id, topic)]
+        )
+        return [
+            topic for topic in low
+            if PracticePoolService.schedule_refill(course_id, topic, generate)
+        ]
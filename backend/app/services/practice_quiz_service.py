@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.config.settings import settings
+from app.services.practice_pool_service import PracticePoolService
+
+logger = logging.getLogger(__name__)
+
+# Generation runs in the orchestrator, so practice calls are prioritised by its LLM scheduler
+# alongside lecture plans and assessments instead of competing with them unscheduled.
+_orchestrator = httpx.AsyncClient(
+    base_url=settings.ORCHESTRATOR_URL,
+    timeout=settings.PRACTICE_QUIZ_TIMEOUT_SECONDS,
+)
+
+_jobs: Dict[str, Dict[str, Any]] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+_slots = asyncio.Semaphore(settings.PRACTICE_QUIZ_MAX_CONCURRENT)
+
+_ACTIVE = ("queued", "running")
+
+
+class PracticeQuizService:
+    """Runs practice quiz generation as background jobs that students poll by id.
+
+    Questions are drawn from the topic's practice pool first; only the
+    shortfall is generated live, by the orchestrator's ``/api/v1/practice``
+    endpoint, and live questions are added to the pool. At most
+    ``PRACTICE_QUIZ_MAX_CONCURRENT`` runs are in flight and each student may
+    have ``PRACTICE_QUIZ_MAX_JOBS_PER_USER`` unfinished jobs; finished jobs
+    are kept for ``PRACTICE_QUIZ_JOB_TTL_SECONDS``.
+    """
+
+    @staticmethod
+    def _now():
+        return time.time()
+
+    @staticmethod
+    def _prune_finished():
+        cutoff = PracticeQuizService._now() - settings.PRACTICE_QUIZ_JOB_TTL_SECONDS
+        for job_id in [
+            job_id for job_id, job in _jobs.items()
+            if job["status"] not in _ACTIVE and job["finished_at"] < cutoff
+        ]:
+            del _jobs[job_id]
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in job.items() if key != "user_id"}
+
+    @staticmethod
+    async def generate_questions(course_id: str, topic: str, num_questions: int) -> List[Dict[str, Any]]:
+        """Ask the orchestrator for questions once a generation slot is free.
+
+        The orchestrator coalesces concurrent requests for the same course,
+        topic and size into a single run.
+        """
+        async with _slots:
+            response = await _orchestrator.post(
+                "/api/v1/practice",
+                json={"course_id": course_id, "topic": topic, "num_questions": num_questions},
+            )
+        if response.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+            raise RuntimeError("The question generator is busy; please try again shortly.")
+        response.raise_for_status()
+        return list(response.json()["questions"])
+
+    @staticmethod
+    async def _run(job_id: str, shortfall: int):
+        job = _jobs[job_id]
+        try:
+            job["status"] = "running"
+            job["started_at"] = PracticeQuizService._now()
+            generated = await PracticeQuizService.generate_questions(job["course_id"], job["topic"], shortfall)
+            job["questions"] = job["questions"] + generated
+            job["status"] = "completed"
+            await asyncio.to_thread(
+                PracticePoolService.add, job["course_id"], job["topic"], generated, served_to=[job["user_id"]]
+            )
+        except Exception as e:
+            logger.exception("Practice quiz job %s failed", job_id)
+            job["status"] = "failed"
+            job["error"] = str(e)
+
+    @staticmethod
+    def _on_done(job_id: str, task: asyncio.Task):
+        # Also runs for jobs cancelled before they started, when ``_run`` never executed.
+        _tasks.pop(job_id, None)
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        if task.cancelled():
+            job["status"] = "cancelled"
+        job["finished_at"] = PracticeQuizService._now()
+
+    @staticmethod
+    async def start_job(user_id: str, course_id: str, topic: str, num_questions: int) -> Dict[str, Any]:
+        PracticeQuizService._prune_finished()
+
+        # Check and reserve the student's slot before the first await, so two
+        # simultaneous requests cannot both get past the limit.
+        active = sum(1 for job in _jobs.values() if job["user_id"] == user_id and job["status"] in _ACTIVE)
+        if active >= settings.PRACTICE_QUIZ_MAX_JOBS_PER_USER:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="A practice quiz is already being generated for you. Please wait for it to finish.",
+            )
+
+        now = PracticeQuizService._now()
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "user_id": user_id,
+            "course_id": course_id,
+            "topic": topic,
+            "num_questions": num_questions,
+            "num_from_pool": 0,
+            "status": "queued",
+            "questions": [],
+            "error": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        _jobs[job_id] = job
+
+        try:
+            # pymongo is blocking; keep its round trips off the event loop.
+            pooled = await asyncio.to_thread(PracticePoolService.claim, course_id, topic, user_id, num_questions)
+        except Exception:
+            del _jobs[job_id]
+            raise
+        shortfall = num_questions - len(pooled)
+        job["num_from_pool"] = len(pooled)
+        job["questions"] = [entry["question"] for entry in pooled]
+
+        if shortfall > 0:
+            task = asyncio.create_task(PracticeQuizService._run(job_id, shortfall))
+            task.add_done_callback(lambda done: PracticeQuizService._on_done(job_id, done))
+            _tasks[job_id] = task
+        else:
+            job["status"] = "completed"
+            job["started_at"] = job["finished_at"] = PracticeQuizService._now()
+        # A topic seen for the first time is filled by the live run above; refill the rest.
+        if pooled and await asyncio.to_thread(PracticePoolService.needs_refill, course_id, topic, user_id):
+            PracticePoolService.schedule_refill(course_id, topic, PracticeQuizService.generate_questions)
+        return PracticeQuizService._public(job)
+
+    @staticmethod
+    def get_job(job_id: str, user_id: str) -> Dict[str, Any]:
+        job = _jobs.get(job_id)
+        if not job or job["user_id"] != user_id:
+            raise HTTPException(status_code=404, detail="Practice quiz job not found")
+        return PracticeQuizService._public(job)
+
+    @staticmethod
+    def cancel_job(job_id: str, user_id: str) -> Dict[str, Any]:
+        PracticeQuizService.get_job(job_id, user_id)
+        task = _tasks.get(job_id)
+        if task is not None and task.cancel():
+            # Frees the student's slot right away rather than when the task unwinds.
+            _jobs[job_id]["status"] = "cancelled"
+            _jobs[job_id]["finished_at"] = PracticeQuizService._now()
+        return PracticeQuizService._public(_jobs[job_id])
+
+    @staticmethod
+    async def warm_pools(course_id: str, topics: List[str] | None = None) -> List[str]:
+        """Pre-fill practice pools for ``topics`` (default: the course's session topics)."""
+        topics = topics or await asyncio.to_thread(PracticePoolService.course_topics, course_id)
+        return await PracticePoolService.warm_course(course_id, topics, PracticeQuizService.generate_questions)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import {
   Sparkles,
   FileText,
@@ -15,8 +15,8 @@ import {
   CheckCircle,
 } from "lucide-react";
 import {
-  generateAIAssessment,
-  generateAILecturePlan,
+  streamAIAssessment,
+  streamAILecturePlan,
   type AIQuestion,
   type LecturePlan,
 } from "../../services/aiService";
@@ -53,10 +53,15 @@ const AIToolsPage: React.FC = () => {
   const [selectedCourseId, setSelectedCourseId] = useState("");
   const [dueDate, setDueDate] = useState("");
 
+  // Aborting closes the assessment stream, which stops generation server-side.
+  const assessmentAbort = useRef<AbortController | null>(null);
+
   useEffect(() => {
     setEditedQuestions(generatedQuestions);
   }, [generatedQuestions]);
 
+  useEffect(() => () => assessmentAbort.current?.abort(), []);
+
   const handleGeneratePlan = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!moduleTitle || !audience)
@@ -64,10 +69,21 @@ const AIToolsPage: React.FC = () => {
 
     setLoading(true);
     try {
-      const plan = await generateAILecturePlan(
+      const durationMinutes = parseInt(duration);
+      const plan = await streamAILecturePlan(
         moduleTitle,
         audience,
-        parseInt(duration),
+        durationMinutes,
+        (segments) => {
+          // Show segments as they arrive; the final plan replaces them.
+          setGeneratedPlan({
+            module_title: moduleTitle,
+            audience,
+            duration_minutes: durationMinutes,
+            segments,
+          });
+          setLoading(false);
+        },
       );
       setGeneratedPlan(plan);
       toast.success("Lecture plan generated successfully!");
@@ -82,16 +98,27 @@ const AIToolsPage: React.FC = () => {
     e.preventDefault();
     if (!file) return toast.error("Please upload a PDF first.");
 
+    assessmentAbort.current?.abort();
+    const controller = new AbortController();
+    assessmentAbort.current = controller;
+
     setLoading(true);
     try {
-      const questions = await generateAIAssessment(
+      const questions = await streamAIAssessment(
         file,
         parseInt(numQuestions),
+        (partial) => {
+          // Show questions as the critic accepts them.
+          setGeneratedQuestions(partial);
+          setLoading(false);
+        },
+        controller.signal,
       );
       setGeneratedQuestions(questions);
       setEditedQuestions(questions);
       toast.success("Assessment generated successfully!");
     } catch {
+      if (controller.signal.aborted) return;
       toast.error(
         "Failed to generate assessment. Ensure AI server is running.",
       );
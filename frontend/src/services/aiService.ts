@@ -26,6 +26,55 @@ export interface LecturePlan {
   segments: LecturePlanSegment[];
 }
 
+// eslint-disable-next-line @typescript-eslint/no-explicit-any
+async function* readNDJSON(body: ReadableStream<Uint8Array>): AsyncGenerator<any> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  try {
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let newline = buffer.indexOf("\n");
+      while (newline >= 0) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        newline = buffer.indexOf("\n");
+        if (line) yield JSON.parse(line);
+      }
+    }
+  } finally {
+    reader.releaseLock();
+  }
+}
+
+const abortError = () => new DOMException("The operation was aborted.", "AbortError");
+
+const waitForIngestion = async (jobId: string, signal?: AbortSignal): Promise<void> => {
+  // Uploads are indexed in the background; poll until the job settles or the caller aborts.
+  for (;;) {
+    const res = await axios.get(`${AI_API}/upload/${jobId}`, { signal });
+    if (res.data.status === "completed") return;
+    if (res.data.status === "failed") {
+      throw new Error(res.data.error || "Failed to index the uploaded PDF.");
+    }
+    await new Promise<void>((resolve, reject) => {
+      if (signal?.aborted) return reject(abortError());
+      const onAbort = () => {
+        clearTimeout(timer);
+        reject(abortError());
+      };
+      const timer = setTimeout(() => {
+        signal?.removeEventListener("abort", onAbort);
+        resolve();
+      }, 1000);
+      signal?.addEventListener("abort", onAbort, { once: true });
+    });
+  }
+};
+
 export const generateAIAssessment = async (pdfFile: File, numQuestions: number = 5): Promise<AIQuestion[]> => {
   const formData = new FormData();
   formData.append("file", pdfFile);
@@ -34,6 +83,7 @@ export const generateAIAssessment = async (pdfFile: File, numQuestions: number =
   const uploadRes = await axios.post(`${AI_API}/upload`, formData, {
     headers: { "Content-Type": "multipart/form-data" },
   });
+  await waitForIngestion(uploadRes.data.job_id);
 
   const assessmentRes = await axios.post(`${AI_API}/assessments`, {
     document_set_id: uploadRes.data.document_set_id,
@@ -52,4 +102,76 @@ export const generateAILecturePlan = async (module_title: string, audience: stri
   });
   
   return res.data.lecture_plan;
-};
\ No newline at end of file
+};
+
+export const streamAILecturePlan = async (
+  module_title: string,
+  audience: string,
+  duration_minutes: number,
+  onSegment: (segments: LecturePlanSegment[]) => void,
+): Promise<LecturePlan> => {
+  // The stream is NDJSON: one "segment" event per segment as it is generated,
+  // then a final "plan" event carrying the validated plan.
+  const res = await fetch(`${AI_API}/plan/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ module_title, audience, duration_minutes }),
+  });
+  if (!res.ok || !res.body) throw new Error(`Plan stream failed with status ${res.status}`);
+
+  const segments: LecturePlanSegment[] = [];
+  for await (const event of readNDJSON(res.body)) {
+    if (event.event === "segment") {
+      segments.push(event.segment);
+      onSegment([...segments]);
+    } else if (event.event === "plan") {
+      return event.lecture_plan;
+    } else if (event.event === "error") {
+      throw new Error(event.detail);
+    }
+  }
+  throw new Error("Plan stream ended without a plan.");
+};
+
+export const streamAIAssessment = async (
+  pdfFile: File,
+  numQuestions: number,
+  onQuestion: (questions: AIQuestion[], numRejected: number) => void,
+  signal?: AbortSignal,
+): Promise<AIQuestion[]> => {
+  // Aborting the signal closes the stream, which stops generation on the server.
+  const formData = new FormData();
+  formData.append("file", pdfFile);
+
+  const uploadRes = await axios.post(`${AI_API}/upload`, formData, {
+    headers: { "Content-Type": "multipart/form-data" },
+    signal,
+  });
+  await waitForIngestion(uploadRes.data.job_id, signal);
+
+  const res = await fetch(`${AI_API}/assessments/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      document_set_id: uploadRes.data.document_set_id,
+      num_questions: numQuestions,
+    }),
+    signal,
+  });
+  if (!res.ok || !res.body) throw new Error(`Assessment stream failed with status ${res.status}`);
+
+  const questions: AIQuestion[] = [];
+  let numRejected = 0;
+  for await (const event of readNDJSON(res.body)) {
+    if (event.event === "question") {
+      questions.push(event.question);
+      onQuestion([...questions], numRejected);
+    } else if (event.event === "rejected") {
+      numRejected = event.num_rejected;
+      onQuestion([...questions], numRejected);
+    } else if (event.event === "error") {
+      throw new Error(event.detail);
+    }
+  }
+  return questions;
+};
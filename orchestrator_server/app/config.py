@@ -11,14 +11,65 @@ class Settings(BaseSettings):
     ollama_base_url: str = "http://localhost:11434"
     planner_model_name: str = "gemma3:4b"
     embedding_model_name: str = "nomic-embed-text:latest"
+    # How long Ollama keeps models loaded after a request, and idle HTTP connections are kept open.
+    ollama_keep_alive: str = "30m"
+    ollama_http_keepalive_seconds: float = 60.0
+    llm_warm_up_on_startup: bool = True
 
+    llm_max_concurrency: int = 4
+    # LLM calls waiting for a slot beyond which new requests get HTTP 429, and each priority
+    # class's share of slots (practice quizzes, lecture plans, bulk assessments) under contention.
+    llm_max_queue_depth: int = 32
+    llm_class_weights: dict[str, float] = {"practice": 4.0, "plan": 2.0, "assessment": 1.0}
+    planner_llm_timeout_seconds: float = 180.0
     assessment_llm_timeout_seconds: float = 60.0
     assessment_critic_timeout_seconds: float = 45.0
     assessment_max_attempt_multiplier: int = 4
+    # Questions generated concurrently; match Ollama's OLLAMA_NUM_PARALLEL. 1 keeps the sequential graph.
+    assessment_concurrency: int = 1
+    # Candidates whose stem embedding is at least this cosine-similar to an accepted stem are rejected before the critic.
+    assessment_duplicate_threshold: float = 0.9
+    # Rule-based pre-critic: minimum share of the correct answer's content words found in the
+    # passages, and whether an answer quoted verbatim (with no distractor quoted) skips the LLM critic.
+    assessment_precheck_min_answer_overlap: float = 0.25
+    assessment_precheck_fast_accept: bool = True
+    # Token budgets for the context passages of each LLM prompt (0 = no trimming). Overlapping
+    # chunk text is always sent once; see app/llm/prompt_budget.py. The critic never gets less
+    # than the generator, so it sees every passage the question was written from.
+    prompt_budget_generator_tokens: int = 700
+    prompt_budget_critic_tokens: int = 700
+    prompt_budget_practice_tokens: int = 700
+    # Banked questions are reused when their topic embedding is this similar to a requested topic.
+    question_bank_similarity_threshold: float = 0.85
+
+    vectorstore_max_open_collections: int = 32
+    retrieval_cache_size: int = 512
+    # "hybrid" fuses BM25 and dense rankings with reciprocal rank fusion; "dense" is vector search only.
+    retrieval_mode: str = "hybrid"
+    retrieval_candidates: int = 20
+    retrieval_rrf_k: int = 60
+    # MMR trade-off between relevance (1.0) and diversity (0.0), and how much a
+    # passage already used in the same assessment run is pushed down.
+    retrieval_mmr_lambda: float = 0.6
+    retrieval_used_penalty: float = 0.5
+
+    plan_cache_ttl_seconds: float = 30 * 24 * 3600
+    plan_cache_max_entries: int = 500
+    plan_cache_similarity_threshold: float = 0.92
+
+    ingest_embed_batch_size: int = 32
+    ingest_embed_workers: int = 2
+    ingest_job_workers: int = 2
+    ingest_queue_size: int = 16
 
     base_data_dir: Path = Path("data")
     chroma_db_dir: Path = base_data_dir / "chroma"
     uploads_dir: Path = base_data_dir / "uploads"
+    embedding_cache_dir: Path = base_data_dir / "embeddings"
+    bm25_index_dir: Path = base_data_dir / "bm25"
+    ingest_jobs_db_path: Path = base_data_dir / "ingestion_jobs.sqlite3"
+    plan_cache_db_path: Path = base_data_dir / "plan_cache.sqlite3"
+    question_bank_db_path: Path = base_data_dir / "question_bank.sqlite3"
 
 
 settings = Settings()
@@ -26,4 +77,6 @@ settings = Settings()
 settings.base_data_dir.mkdir(parents=True, exist_ok=True)
 settings.chroma_db_dir.mkdir(parents=True, exist_ok=True)
 settings.uploads_dir.mkdir(parents=True, exist_ok=True)
+settings.embedding_cache_dir.mkdir(parents=True, exist_ok=True)
+settings.bm25_index_dir.mkdir(parents=True, exist_ok=True)
 
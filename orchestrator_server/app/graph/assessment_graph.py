@@ -1,17 +1,28 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-import time
+import re
 import uuid
-from typing import Any, Dict, List, Literal, TypedDict
-from langchain_community.chat_models import ChatOllama
+from collections import Counter
+from typing import Any, Dict, List, Literal, Optional, Tuple, TypedDict
+import numpy as np
+from langchain_core.documents import Document
 from langgraph.graph import END, StateGraph
 from ..config import settings
-from ..rag.vectorstore import retrieve_passages
+from ..llm.client import call_llm
+from ..llm.json_extract import extract_json_object
+from ..llm.pool import get_chat_model
+from ..llm.prompt_budget import fit_passages
+from ..rag.vectorstore import embed_transient, retrieve_diverse_passages
+from .question_checks import PrecheckVerdict, check_question, option_text
 
 logger = logging.getLogger(__name__)
 
+# Passages retrieved for each generated question.
+_PASSAGES_PER_QUESTION = 6
+
 class AssessmentState(TypedDict, total=False):
     lecture_plan: Dict[str, Any]
     document_set_id: str
@@ -34,42 +45,22 @@ class AssessmentState(TypedDict, total=False):
     step_count: int
     generator_placeholder: bool
 
+    # Chunk ids of passages already given to the generator in this run.
+    used_passage_ids: List[str]
 
-def _extract_json_from_content(content: str) -> dict[str, Any] | None:
-    """
-    Robustly extract a JSON object from LLM output.
+    # {"stem", "embedding"} of each accepted question that could be embedded,
+    # and the current candidate's stem embedding.
+    stem_vectors: List[Dict[str, Any]]
+    candidate_embedding: List[float] | None
+    candidate_duplicate: bool
 
-    Handles markdown fences, prose around JSON, etc.
-    """
-    content = content.strip()
+    # Outcome of the rule-based checks run before the critic.
+    precheck_verdict: PrecheckVerdict
 
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        pass
-
-    if content.startswith("```"):
-        parts = content.split("```")
-        if len(parts) >= 3:
-            inner = parts[1]
-            if inner.startswith("json"):
-                inner = inner[4:]
-            inner = inner.strip()
-            try:
-                return json.loads(inner)
-            except json.JSONDecodeError:
-                content = inner
-
-    start = content.find("{")
-    end = content.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        candidate = content[start : end + 1]
-        try:
-            return json.loads(candidate)
-        except json.JSONDecodeError:
-            return None
-
-    return None
+    # Batched mode only: pending critic feedback per topic, and the passages
+    # a slot was dealt when its topic repeats within a round.
+    topic_feedback: Dict[str, str]
+    slot_passages: List[Document]
 
 
 def _extract_topics(state: AssessmentState) -> List[str]:
@@ -99,7 +90,6 @@ def _extract_topics(state: AssessmentState) -> List[str]:
 def _generator_prompt(
     topic: str,
     passages: List[Dict[str, Any]],
-    previous_stems: List[str] | None = None,
     feedback: str | None = None,
 ) -> str:
     context_blocks = []
@@ -120,7 +110,6 @@ CONTEXT:
 
 Create exactly ONE multiple-choice question that can be answered directly from the context.
 The question must have exactly 4 options with one correct answer.
-The question MUST be unique and different from any previously generated questions.
 
 You MUST respond with ONLY a JSON object, no other text. Use this exact format:
 {
@@ -133,14 +122,6 @@ You MUST respond with ONLY a JSON object, no other text. Use this exact format:
   "source_metadata": {}
 }}"""
 
-    if previous_stems:
-        stems_list = "\n".join(f"- {s}" for s in previous_stems[-10:])
-        base += (
-            f"\n\nIMPORTANT: The following questions have ALREADY been asked. "
-            f"You MUST ask about a DIFFERENT concept or detail.\n"
-            f"Already asked:\n{stems_list}"
-        )
-
     if feedback:
         base += (
             "\n\nFeedback from a previous attempt:\n"
@@ -176,19 +157,12 @@ You MUST respond with ONLY a JSON object, no other text. Use this exact format:
 Use "accept" if the answer is supported, or "reject" if it is not."""
 
 
-def _call_llm(llm: ChatOllama, prompt: str, timeout_seconds: float) -> str | None:
-    """Invoke LLM with logging. Returns content string or None on failure."""
-    start = time.perf_counter()
-    try:
-        response = llm.invoke(prompt)
-        elapsed = time.perf_counter() - start
-        content = response.content if hasattr(response, "content") else str(response)
-        logger.info("LLM call completed in %.1fs (%d chars)", elapsed, len(content))
-        return content
-    except Exception as exc:
-        elapsed = time.perf_counter() - start
-        logger.warning("LLM call failed after %.1fs: %s", elapsed, exc)
-        return None
+def _critic_query(question: Dict[str, Any]) -> str:
+    """The stem and correct answer, used to rank passages for the critic."""
+    options = question.get("options") or []
+    index = question.get("correct_option_index")
+    answer = option_text(options[index]) if isinstance(index, int) and 0 <= index < len(options) else ""
+    return f"{question.get('stem', '')} {answer}"
 
 
 def _make_placeholder(topic: str, note: str) -> Dict[str, Any]:
@@ -220,13 +194,8 @@ def _normalise_option_index(value: Any) -> int:
     return 0
 
 
-def generator_node(state: AssessmentState) -> AssessmentState:
-    llm = ChatOllama(
-        model=settings.planner_model_name,
-        base_url=settings.ollama_base_url,
-        temperature=0.7,
-        format="json",
-    )
+async def generator_node(state: AssessmentState) -> AssessmentState:
+    llm = get_chat_model(temperature=0.7, format="json")
 
     topics = state.get("topics") or _extract_topics(state)
     if not topics:
@@ -241,18 +210,28 @@ def generator_node(state: AssessmentState) -> AssessmentState:
     state["current_topic"] = topic
 
     logger.info("Generator: topic='%s' (index %d of %d)", topic, topic_index, len(topics))
-    passages = retrieve_passages(state["document_set_id"], topic, k=6)
-    state["supporting_passages"] = [
-        {"page_content": doc.page_content, "metadata": dict(doc.metadata or {})}
-        for doc in passages
-    ]
-
-
-    previous_stems = [q.get("stem", "") for q in (state.get("questions") or [])]
+    used_ids = list(state.get("used_passage_ids") or [])
+    passages = state.pop("slot_passages", None)
+    if passages is None:
+        passages = await asyncio.to_thread(
+            retrieve_diverse_passages, state["document_set_id"], topic, _PASSAGES_PER_QUESTION, set(used_ids)
+        )
+    # The critic and pre-checks judge the question against the same trimmed context.
+    state["supporting_passages"] = fit_passages(
+        [
+            {"id": doc.id, "page_content": doc.page_content, "metadata": dict(doc.metadata or {})}
+            for doc in passages
+        ],
+        topic,
+        settings.prompt_budget_generator_tokens,
+    )
+    # Only passages the model is shown count as used; trimmed ones stay fresh for later attempts.
+    kept_ids = [doc["id"] for doc in state["supporting_passages"] if doc.get("id")]
+    state["used_passage_ids"] = list(dict.fromkeys(used_ids + kept_ids))
 
     feedback = state.get("critic_feedback")
-    prompt = _generator_prompt(topic, state["supporting_passages"], previous_stems=previous_stems, feedback=feedback)
-    content = _call_llm(llm, prompt, settings.assessment_llm_timeout_seconds)
+    prompt = _generator_prompt(topic, state["supporting_passages"], feedback=feedback)
+    content = await call_llm(llm, prompt, settings.assessment_llm_timeout_seconds)
 
     placeholder_used = False
 
@@ -261,7 +240,7 @@ def generator_node(state: AssessmentState) -> AssessmentState:
         candidate = _make_placeholder(topic, "generator_timeout")
         placeholder_used = True
     else:
-        parsed = _extract_json_from_content(content)
+        parsed = extract_json_object(content)
         if parsed is not None:
             candidate = parsed
             logger.info("Generator: successfully parsed JSON question for topic='%s'", topic)
@@ -277,6 +256,7 @@ def generator_node(state: AssessmentState) -> AssessmentState:
         candidate["source_metadata"] = {}
     candidate["source_metadata"].setdefault("topic", topic)
     candidate["source_metadata"].setdefault("document_set_id", state["document_set_id"])
+    candidate["source_metadata"]["passage_ids"] = kept_ids
 
     state["candidate_question"] = candidate
     state["generator_placeholder"] = placeholder_used
@@ -284,7 +264,117 @@ def generator_node(state: AssessmentState) -> AssessmentState:
     return state
 
 
-def critic_node(state: AssessmentState) -> AssessmentState:
+def precheck_node(state: AssessmentState) -> AssessmentState:
+    """Rule-based checks that reject or fast-accept a candidate without an LLM call.
+
+    Rejections are counted like critic rejections and their reason becomes
+    the generator's feedback. Fast-accepted candidates still go through the
+    duplicate check; the critic then accepts them without calling the model.
+    """
+    state["precheck_verdict"] = "pass"
+    if state.get("generator_placeholder"):
+        return state
+
+    candidate = state.get("candidate_question") or {}
+    verdict, reason = check_question(
+        candidate,
+        state.get("supporting_passages") or [],
+        min_answer_overlap=settings.assessment_precheck_min_answer_overlap,
+        fast_accept=settings.assessment_precheck_fast_accept,
+    )
+    state["precheck_verdict"] = verdict
+    if verdict == "reject":
+        logger.info("Precheck: rejecting question id=%s: %s", candidate.get("id"), reason)
+        state["last_verdict"] = "reject"
+        state["critic_feedback"] = reason
+        state["num_rejected"] = int(state.get("num_rejected", 0)) + 1
+    elif verdict == "accept":
+        logger.info("Precheck: answer quoted verbatim from context; fast-accepting id=%s", candidate.get("id"))
+    return state
+
+
+def decide_after_precheck(state: AssessmentState) -> Literal["dedupe", "route"]:
+    return "route" if state.get("precheck_verdict") == "reject" else "dedupe"
+
+
+def _max_similarity(vector: List[float], others: List[List[float]]) -> tuple[float, int]:
+    """Highest cosine similarity of ``vector`` to any row of ``others``, and that row's index."""
+    if not others:
+        return 0.0, -1
+    matrix = np.asarray(others, dtype=np.float32)
+    query = np.asarray(vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    scores = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+    best = int(np.argmax(scores))
+    return float(scores[best]), best
+
+
+async def dedupe_node(state: AssessmentState) -> AssessmentState:
+    """Reject candidates that paraphrase an accepted question, before the critic is called.
+
+    The candidate's stem is embedded and compared with the stems accepted so
+    far in this run; at or above ``settings.assessment_duplicate_threshold``
+    it is rejected with feedback naming the question it repeats. A stem that
+    matches an accepted one once normalised is rejected without embedding, so
+    exact repeats are still caught when the embedding model is unavailable.
+    """
+    state["candidate_duplicate"] = False
+    state["candidate_embedding"] = None
+    candidate = state.get("candidate_question") or {}
+    stem = str(candidate.get("stem", "")).strip()
+    if state.get("generator_placeholder") or not stem:
+        return state
+
+    def reject(duplicate_of: str) -> AssessmentState:
+        state["candidate_duplicate"] = True
+        state["last_verdict"] = "reject"
+        state["critic_feedback"] = (
+            f'The question repeats an accepted one ("{duplicate_of}"). '
+            "Ask about a different concept or detail."
+        )
+        state["num_rejected"] = int(state.get("num_rejected", 0)) + 1
+        return state
+
+    normalised = _normalise_stem(stem)
+    for question in state.get("questions") or []:
+        if _normalise_stem(str(question.get("stem", ""))) == normalised:
+            logger.info("Dedupe: rejecting exact repeat of '%s'", question.get("stem"))
+            return reject(str(question.get("stem")))
+
+    try:
+        (embedding,) = await asyncio.to_thread(embed_transient, [stem])
+    except Exception as exc:
+        logger.warning("Dedupe: could not embed stem, checked exact repeats only: %s", exc)
+        return state
+    state["candidate_embedding"] = list(embedding)
+
+    accepted = state.get("stem_vectors") or []
+    score, index = _max_similarity(embedding, [entry["embedding"] for entry in accepted])
+    if score < settings.assessment_duplicate_threshold:
+        return state
+
+    duplicate_of = accepted[index]["stem"]
+    logger.info("Dedupe: rejecting near-duplicate (similarity %.3f) of '%s'", score, duplicate_of)
+    return reject(duplicate_of)
+
+
+def decide_after_dedupe(state: AssessmentState) -> Literal["critic", "route"]:
+    return "route" if state.get("candidate_duplicate") else "critic"
+
+
+def _critic_budget() -> int:
+    """The critic's passage budget, never below the generator's.
+
+    A smaller budget could cut the passage a question was written from, and
+    the critic would then reject a valid question.
+    """
+    critic, generator = settings.prompt_budget_critic_tokens, settings.prompt_budget_generator_tokens
+    if critic <= 0 or generator <= 0:
+        return 0
+    return max(critic, generator)
+
+
+async def critic_node(state: AssessmentState) -> AssessmentState:
     candidate = state.get("candidate_question") or {}
 
     if state.get("generator_placeholder"):
@@ -296,17 +386,24 @@ def critic_node(state: AssessmentState) -> AssessmentState:
         state["generator_placeholder"] = False
         return state
 
-    llm = ChatOllama(
-        model=settings.planner_model_name,
-        base_url=settings.ollama_base_url,
-        temperature=0.0,
-        format="json",
-    )
+    if state.get("precheck_verdict") == "accept":
+        candidate.setdefault("source_metadata", {})["note"] = "precheck_accepted"
+        questions = state.get("questions") or []
+        questions.append(candidate)
+        state["questions"] = questions
+        state["last_verdict"] = "accept"
+        return state
 
-    passages = state.get("supporting_passages") or []
+    llm = get_chat_model(temperature=0.0, format="json")
+
+    passages = fit_passages(
+        state.get("supporting_passages") or [],
+        _critic_query(candidate),
+        _critic_budget(),
+    )
     prompt = _critic_prompt(candidate, passages)
     logger.info("Critic: evaluating question id=%s", candidate.get("id"))
-    content = _call_llm(llm, prompt, settings.assessment_critic_timeout_seconds)
+    content = await call_llm(llm, prompt, settings.assessment_critic_timeout_seconds)
 
     if content is None:
         logger.warning("Critic: LLM failed; auto-accepting question id=%s", candidate.get("id"))
@@ -317,7 +414,7 @@ def critic_node(state: AssessmentState) -> AssessmentState:
         state["last_verdict"] = "accept"
         return state
 
-    parsed = _extract_json_from_content(content)
+    parsed = extract_json_object(content)
     if parsed is None:
         logger.warning("Critic: could not extract JSON; auto-accepting question id=%s", candidate.get("id"))
         candidate.setdefault("source_metadata", {})["note"] = "critic_json_accepted"
@@ -348,12 +445,23 @@ def critic_node(state: AssessmentState) -> AssessmentState:
     return state
 
 
+def _remember_stem(state: AssessmentState, candidate: Dict[str, Any], embedding: List[float] | None) -> None:
+    """Add an accepted question's stem embedding to the run's duplicate index."""
+    if embedding is None:
+        return
+    state["stem_vectors"] = [
+        *(state.get("stem_vectors") or []),
+        {"stem": str(candidate.get("stem", "")), "embedding": list(embedding)},
+    ]
+
+
 def route_node(state: AssessmentState) -> AssessmentState:
     """Update counters and choose whether to continue or end."""
     state["step_count"] = int(state.get("step_count", 0)) + 1
 
     if state.get("last_verdict") == "accept":
         state["question_count"] = int(state.get("question_count", 0)) + 1
+        _remember_stem(state, state.get("candidate_question") or {}, state.get("candidate_embedding"))
 
     num_questions = int(state.get("num_questions", 5))
     max_attempts = int(state.get("max_attempts", num_questions * settings.assessment_max_attempt_multiplier))
@@ -385,15 +493,224 @@ def decide_route(state: AssessmentState) -> Literal["more", "done"]:
     return "more" if decision == "more" else "done"
 
 
-def build_assessment_graph():
-    """Create the LangGraph graph for assessment generation."""
+def _normalise_stem(stem: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", stem.lower()).split())
+
+
+async def _plan_slots(
+    state: AssessmentState, topics: List[str], topic_indices: List[int]
+) -> List[Tuple[int, Optional[List[Document]]]]:
+    """The slots to start this round, with the passages dealt to slots of repeated topics.
+
+    A topic that occurs once retrieves its own passages in the generator. A
+    topic that occurs ``c`` times (e.g. the single default topic when no
+    lecture plan is sent) gets one MMR pool of ``c * _PASSAGES_PER_QUESTION``
+    passages dealt round-robin across its slots, so each writes from
+    different material; only as many slots start as the pool has full shares
+    for.
+    """
+    counts = Counter(topics[idx] for idx in topic_indices)
+    used_ids = set(state.get("used_passage_ids") or [])
+    shares: Dict[str, List[Optional[List[Document]]]] = {}
+    for topic, count in counts.items():
+        if count == 1:
+            continue
+        pool = await asyncio.to_thread(
+            retrieve_diverse_passages,
+            state["document_set_id"],
+            topic,
+            count * _PASSAGES_PER_QUESTION,
+            used_ids,
+        )
+        num_shares = max(1, min(count, len(pool) // _PASSAGES_PER_QUESTION))
+        shares[topic] = [pool[i::num_shares] for i in range(num_shares)]
+
+    slots: List[Tuple[int, Optional[List[Document]]]] = []
+    for idx in topic_indices:
+        topic = topics[idx]
+        if topic not in shares:
+            slots.append((idx, None))
+        elif shares[topic]:
+            slots.append((idx, shares[topic].pop(0)))
+    return slots
+
+
+async def _run_slot(
+    state: AssessmentState,
+    topic_index: int,
+    feedback: str | None,
+    passages: Optional[List[Document]] = None,
+) -> AssessmentState:
+    """Generate, check, dedupe and critique one candidate on a private copy of the state."""
+    slot: AssessmentState = {
+        **state,
+        "topic_index": topic_index,
+        "questions": list(state.get("questions") or []),
+        "generator_placeholder": False,
+    }
+    slot.pop("critic_feedback", None)
+    if passages is not None:
+        slot["slot_passages"] = passages
+    if feedback:
+        slot["critic_feedback"] = feedback
+    slot = precheck_node(await generator_node(slot))
+    if slot.get("precheck_verdict") == "reject":
+        return slot
+    slot = await dedupe_node(slot)
+    if slot.get("candidate_duplicate"):
+        return slot
+    return await critic_node(slot)
+
+
+async def batch_node(state: AssessmentState, concurrency: int) -> AssessmentState:
+    """Generate and critique up to ``concurrency`` topic slots at once.
+
+    Each slot runs the regular generator, precheck, dedupe and critic nodes
+    on its own copy of the state. Results are merged in topic order: accepted questions
+    that repeat one accepted earlier, including by another slot of the same
+    round, are counted as rejections, and critic feedback from every slot of
+    a topic is carried to the next attempt on it. Slots repeating a topic in
+    one round write from disjoint passages (see :func:`_plan_slots`).
+    """
+    topics = state.get("topics") or _extract_topics(state)
+    state["topics"] = topics
+
+    num_questions = int(state.get("num_questions", 5))
+    max_attempts = int(state.get("max_attempts", num_questions * settings.assessment_max_attempt_multiplier))
+    accepted = list(state.get("questions") or [])
+    step_count = int(state.get("step_count", 0))
+    num_slots = max(1, min(concurrency, num_questions - len(accepted), max_attempts - step_count))
+
+    start = int(state.get("topic_index", 0))
+    topic_indices = [(start + i) % len(topics) for i in range(num_slots)]
+    feedback_by_topic = dict(state.get("topic_feedback") or {})
+
+    slots = await _plan_slots(state, topics, topic_indices)
+    logger.info("Batch: running %d slot(s) from topic index %d", len(slots), start)
+    results = await asyncio.gather(
+        *(_run_slot(state, idx, feedback_by_topic.get(topics[idx]), passages) for idx, passages in slots)
+    )
+
+    state["used_passage_ids"] = list(
+        dict.fromkeys(
+            item_id
+            for source in (state, *results)
+            for item_id in source.get("used_passage_ids") or []
+        )
+    )
+
+    seen_stems = {_normalise_stem(q.get("stem", "")) for q in accepted}
+    num_rejected = int(state.get("num_rejected", 0))
+    # Feedback from every slot of a topic this round, so repeated topics keep all of it.
+    round_feedback: Dict[str, List[str]] = {}
+    accepted_topics = set()
+    for result in results:
+        topic = result.get("current_topic", "")
+        candidate = result.get("candidate_question") or {}
+
+        if result.get("last_verdict") != "accept":
+            num_rejected += 1
+            round_feedback.setdefault(topic, []).append(result.get("critic_feedback", ""))
+            continue
+
+        stem = _normalise_stem(candidate.get("stem", ""))
+        embedding = result.get("candidate_embedding")
+        similarity = 0.0
+        if embedding is not None:
+            vectors = [entry["embedding"] for entry in state.get("stem_vectors") or []]
+            similarity, _ = _max_similarity(embedding, vectors)
+        if stem in seen_stems or similarity >= settings.assessment_duplicate_threshold:
+            logger.info("Batch: dropping duplicate stem for topic='%s'", topic)
+            num_rejected += 1
+            round_feedback.setdefault(topic, []).append(
+                "That question duplicates one that was already accepted. "
+                "Ask about a different concept or detail."
+            )
+            continue
+
+        seen_stems.add(stem)
+        accepted.append(candidate)
+        _remember_stem(state, candidate, embedding)
+        accepted_topics.add(topic)
+
+    for topic in accepted_topics - round_feedback.keys():
+        feedback_by_topic.pop(topic, None)
+    for topic, notes in round_feedback.items():
+        feedback_by_topic[topic] = " ".join(dict.fromkeys(note for note in notes if note))
+
+    state["questions"] = accepted
+    state["question_count"] = len(accepted)
+    state["num_rejected"] = num_rejected
+    state["step_count"] = step_count + len(slots)
+    state["topic_index"] = (start + num_slots) % len(topics)
+    state["topic_feedback"] = feedback_by_topic
+
+    if len(accepted) >= num_questions:
+        logger.info("Batch: target reached (%s questions); done", len(accepted))
+        state["route_decision"] = "done"
+    elif state["step_count"] >= max_attempts:
+        logger.warning(
+            "Batch: max_attempts reached (step=%s, max=%s, accepted=%s, target=%s); stopping early",
+            state["step_count"], max_attempts, len(accepted), num_questions,
+        )
+        state["route_decision"] = "done"
+    else:
+        state["route_decision"] = "more"
+    return state
+
+
+def build_assessment_graph(concurrency: int = 1):
+    """Create the LangGraph graph for assessment generation.
+
+    With ``concurrency`` above 1 the graph runs in batched mode: a single
+    node fans out that many generator/precheck/dedupe/critic slots per round
+    instead of looping generator -> precheck -> dedupe -> critic -> route one
+    question at a time. A candidate rejected by the precheck or dedupe node
+    skips the rest of the chain.
+    """
+    if concurrency > 1:
+
+        async def run_batch(state: AssessmentState) -> AssessmentState:
+            return await batch_node(state, concurrency)
+
+        graph = StateGraph(AssessmentState)
+        graph.add_node("batch", run_batch)
+        graph.set_entry_point("batch")
+        graph.add_conditional_edges(
+            "batch",
+            decide_route,
+            {
+                "more": "batch",
+                "done": END,
+            },
+        )
+        return graph.compile()
+
     graph = StateGraph(AssessmentState)
     graph.add_node("generator", generator_node)
+    graph.add_node("precheck", precheck_node)
+    graph.add_node("dedupe", dedupe_node)
     graph.add_node("critic", critic_node)
     graph.add_node("route", route_node)
 
     graph.set_entry_point("generator")
-    graph.add_edge("generator", "critic")
+    graph.add_edge("generator", "precheck")
+    graph.add_conditional_edges(
+        "precheck",
+        decide_after_precheck,
+        {
+            "dedupe": "dedupe",
+            "route": "route",
+        },
+    )
+    graph.add_conditional_edges(
+        "dedupe",
+        decide_after_dedupe,
+        {
+            "critic": "critic",
+            "route": "route",
+        },
+    )
     graph.add_edge("critic", "route")
 
     graph.add_conditional_edges(
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
 import json
+import logging
 from typing import Any, Dict, List, TypedDict
 
-from langchain_community.chat_models import ChatOllama
 from langgraph.graph import END, StateGraph
 
 from ..config import settings
+from ..llm.client import call_llm
+from ..llm.json_extract import extract_json_object
+from ..llm.pool import get_chat_model
 from ..schemas import LecturePlan, LectureSegment
 
+logger = logging.getLogger(__name__)
+
 
 class PlannerState(TypedDict, total=False):
     module_title: str
@@ -18,40 +23,6 @@ class PlannerState(TypedDict, total=False):
     _attempt: int
 
 
-def _extract_json_from_content(content: str) -> dict[str, Any] | None:
-    """
-    Try to robustly extract a JSON object from LLM output.
-
-    Handles cases where the model wraps JSON in prose or markdown fences.
-    """
-    content = content.strip()
-
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        pass
-
-    if content.startswith("```"):
-  
-        parts = content.split("```")
-        if len(parts) >= 3:
-            inner = "```".join(parts[1:-1]).strip()
-            try:
-                return json.loads(inner)
-            except json.JSONDecodeError:
-                content = inner 
-    start = content.find("{")
-    end = content.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        candidate = content[start : end + 1]
-        try:
-            return json.loads(candidate)
-        except json.JSONDecodeError:
-            return None
-
-    return None
-
-
 def _build_planner_prompt(
     state: PlannerState,
     previous_plan: dict[str, Any] | None = None,
@@ -118,14 +89,97 @@ def _validate_lecture_plan(
     return abs(total - target_duration) <= tolerance, total
 
 
-def planner_node(state: PlannerState) -> PlannerState:
-    """LangGraph node that calls Gemma 3 and validates the resulting plan."""
-    llm = ChatOllama(
-        model=settings.planner_model_name,
-        base_url=settings.ollama_base_url,
-        temperature=0.2,
+def _repair_segment_durations(
+    plan: dict[str, Any], target_duration: int
+) -> dict[str, Any] | None:
+    """Rescale segment durations proportionally so they sum exactly to the target.
+
+    Uses largest-remainder rounding and keeps every segment at least one
+    minute long when the target allows it. Returns None when the structure
+    itself is unusable (no segments, non-integer or negative durations, a
+    zero total), in which case the model has to be asked again.
+    """
+    segments = plan.get("segments")
+    if not isinstance(segments, list) or not segments or target_duration <= 0:
+        return None
+
+    durations: List[int] = []
+    for seg in segments:
+        if not isinstance(seg, dict):
+            return None
+        try:
+            minutes = int(seg.get("duration_minutes"))
+        except (TypeError, ValueError):
+            return None
+        if minutes < 0:
+            return None
+        durations.append(minutes)
+
+    total = sum(durations)
+    if total == 0:
+        return None
+
+    scaled = [minutes * target_duration / total for minutes in durations]
+    rounded = [int(value) for value in scaled]
+    by_remainder = sorted(range(len(scaled)), key=lambda i: scaled[i] - rounded[i], reverse=True)
+    for i in by_remainder[: target_duration - sum(rounded)]:
+        rounded[i] += 1
+
+    if target_duration >= len(rounded):
+        for i, minutes in enumerate(rounded):
+            if minutes == 0:
+                longest = max(range(len(rounded)), key=rounded.__getitem__)
+                rounded[longest] -= 1
+                rounded[i] = 1
+
+    return {
+        **plan,
+        "segments": [
+            {**seg, "duration_minutes": minutes} for seg, minutes in zip(segments, rounded)
+        ],
+    }
+
+
+def _accept_plan(plan: dict[str, Any], target_duration: int) -> dict[str, Any] | None:
+    """Return the plan if its durations validate, repairing them locally if needed."""
+    is_valid, total = _validate_lecture_plan(plan, target_duration)
+    if is_valid:
+        return plan
+
+    repaired = _repair_segment_durations(plan, target_duration)
+    if repaired is not None:
+        logger.info(
+            "Planner: rescaled segment durations from %d to %d minutes",
+            total, target_duration,
+        )
+    return repaired
+
+
+def _build_segment(seg: dict[str, Any], index: int) -> LectureSegment:
+    return LectureSegment(
+        sequence_index=int(seg.get("sequence_index", index + 1)),
+        title=str(seg.get("title", f"Segment {index + 1}")),
+        description=str(seg.get("description", "")),
+        duration_minutes=int(seg.get("duration_minutes", 0)),
+        learning_objectives=list(seg.get("learning_objectives") or []),
     )
 
+
+def _build_lecture_plan(
+    plan: dict[str, Any], module_title: str, audience: str, target_duration: int
+) -> dict[str, Any]:
+    return LecturePlan(
+        module_title=plan.get("module_title", module_title),
+        audience=plan.get("audience", audience),
+        duration_minutes=target_duration,
+        segments=[_build_segment(seg, i) for i, seg in enumerate(plan.get("segments") or [])],
+    ).model_dump()
+
+
+async def planner_node(state: PlannerState) -> PlannerState:
+    """LangGraph node that calls Gemma 3 and validates the resulting plan."""
+    llm = get_chat_model(temperature=0.2)
+
     target_duration = int(state["duration_minutes"])
     previous_plan: dict[str, Any] | None = None
     feedback: str | None = None
@@ -134,41 +188,31 @@ def planner_node(state: PlannerState) -> PlannerState:
         prompt = _build_planner_prompt(
             state, previous_plan=previous_plan, feedback=feedback
         )
-        response = llm.invoke(prompt)
-        content = response.content if hasattr(response, "content") else str(response)
+        content = await call_llm(llm, prompt, settings.planner_llm_timeout_seconds)
+        if content is None:
+            logger.warning("Planner: LLM call failed on attempt %d; giving up", attempt + 1)
+            break
 
-        plan_dict = _extract_json_from_content(content)
+        plan_dict = extract_json_object(content)
         if plan_dict is None:
             feedback = "Your previous response was not valid JSON. Return ONLY valid JSON that follows the schema."
             previous_plan = None
             continue
 
-        is_valid, total = _validate_lecture_plan(plan_dict, target_duration)
-        if is_valid:
-            state["lecture_plan"] = LecturePlan(
-                module_title=plan_dict.get("module_title", state["module_title"]),
-                audience=plan_dict.get("audience", state["audience"]),
-                duration_minutes=target_duration,
-                segments=[
-                    LectureSegment(
-                        sequence_index=int(seg.get("sequence_index", i + 1)),
-                        title=str(seg.get("title", f"Segment {i + 1}")),
-                        description=str(seg.get("description", "")),
-                        duration_minutes=int(seg.get("duration_minutes", 0)),
-                        learning_objectives=list(seg.get("learning_objectives") or []),
-                    )
-                    for i, seg in enumerate(plan_dict.get("segments") or [])
-                ],
-            ).model_dump()
+        accepted = _accept_plan(plan_dict, target_duration)
+        if accepted is not None:
+            state["lecture_plan"] = _build_lecture_plan(
+                accepted, state["module_title"], state["audience"], target_duration
+            )
             state["_attempt"] = attempt + 1
             return state
 
-        # Not valid; prepare another attempt
+        # Structure could not be repaired locally; prepare another attempt
         previous_plan = plan_dict
         feedback = (
-            f"The total of the segment durations is {total} minutes, "
-            f"but it must be {target_duration} minutes. "
-            "Re-adjust only the duration_minutes fields to match the target while keeping the same structure."
+            "The plan must contain a non-empty \"segments\" array, and every segment needs "
+            "an integer \"duration_minutes\" that is not negative, and at least one segment "
+            f"must be longer than zero. The segment durations must add up to {target_duration} minutes."
         )
 
     if previous_plan is not None:
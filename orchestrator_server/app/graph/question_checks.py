@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Literal, Tuple
+
+from ..rag.bm25 import tokenize
+
+PrecheckVerdict = Literal["reject", "accept", "pass"]
+
+NUM_OPTIONS = 4
+
+# "A. ", "b) ", "(C) " and similar labels the model puts in front of options.
+_OPTION_LABEL = re.compile(r"^\s*\(?[A-Da-d]\s*[.):]\s*")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def option_text(option: Any) -> str:
+    """An option without its leading letter label."""
+    return _OPTION_LABEL.sub("", str(option)).strip()
+
+
+def _normalise(text: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def check_question(
+    question: Dict[str, Any],
+    passages: List[Dict[str, Any]],
+    min_answer_overlap: float,
+    fast_accept: bool = True,
+) -> Tuple[PrecheckVerdict, str]:
+    """Deterministic checks run before the LLM critic.
+
+    Rejects malformed questions (empty stem, not exactly four distinct
+    non-empty options, correct index out of range) and questions whose
+    correct answer shares too few content words with the passages.
+    Fast-accepts, if enabled, when the correct answer appears verbatim in a
+    passage and no distractor does. Anything else is left to the critic
+    (``"pass"``). Returns the verdict and, for rejections, the reason.
+    """
+    stem = str(question.get("stem") or "").strip()
+    if not stem:
+        return "reject", "The question stem is empty. Write a complete question."
+
+    options = question.get("options")
+    if not isinstance(options, list) or len(options) != NUM_OPTIONS:
+        count = len(options) if isinstance(options, list) else 0
+        return "reject", f"The question has {count} options; it must have exactly {NUM_OPTIONS}."
+
+    texts = [option_text(option) for option in options]
+    if any(not text for text in texts):
+        return "reject", "Some options are empty. Every option needs answer text."
+    if len({_normalise(text) for text in texts}) != NUM_OPTIONS:
+        return "reject", "Some options repeat each other. All four options must be different."
+
+    index = question.get("correct_option_index")
+    if not isinstance(index, int) or not 0 <= index < NUM_OPTIONS:
+        return "reject", f"correct_option_index must be an integer from 0 to {NUM_OPTIONS - 1}."
+
+    if not passages:
+        return "pass", ""
+
+    context = " ".join(str(doc.get("page_content", "")) for doc in passages)
+    context_tokens = set(tokenize(context))
+    answer_tokens = set(tokenize(texts[index]))
+    if len(answer_tokens) >= 2:
+        overlap = len(answer_tokens & context_tokens) / len(answer_tokens)
+        if overlap < min_answer_overlap:
+            return "reject", (
+                f'The correct answer "{texts[index]}" is not supported by the context passages. '
+                "Base the correct answer on the passages."
+            )
+
+    if fast_accept and len(answer_tokens) >= 2:
+        padded_context = f" {_normalise(context)} "
+
+        def verbatim(text: str) -> bool:
+            return f" {_normalise(text)} " in padded_context
+
+        if verbatim(texts[index]) and not any(
+            verbatim(text) for i, text in enumerate(texts) if i != index
+        ):
+            return "accept", ""
+
+    return "pass", ""
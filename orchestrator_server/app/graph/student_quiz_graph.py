@@ -1,13 +1,15 @@
 from typing import Any, Dict, List, Literal, TypedDict
+import asyncio
 import json
 import logging
 import uuid
-from langchain_community.chat_models import ChatOllama
 from langgraph.graph import END, StateGraph
 
-from orchestrator_server.app.graph.assessment_graph import _call_llm, _extract_json_from_content
-
 from ..config import settings
+from ..llm.client import call_llm
+from ..llm.json_extract import extract_json_object
+from ..llm.pool import get_chat_model
+from ..llm.prompt_budget import estimate_tokens, fit_passages
 from ..rag.vectorstore import retrieve_passages_for_course 
 
 logger = logging.getLogger(__name__)
@@ -27,6 +29,15 @@ class StudentQuizState(TypedDict, total=False):
     step_count: int
     max_attempts: int
 
+# The prompt repeats at most this many earlier stems so the model avoids them.
+_MAX_PREVIOUS_STEMS = 5
+
+def _previous_stems_block(previous_stems: List[str] | None) -> str:
+    if not previous_stems:
+        return ""
+    stems_list = "\n".join(f"- {s}" for s in previous_stems[-_MAX_PREVIOUS_STEMS:])
+    return f"\n\nIMPORTANT: Do not repeat these questions:\n{stems_list}"
+
 def _student_generator_prompt(topic: str, passages: List[Dict[str, Any]], previous_stems: List[str] | None = None) -> str:
     context_blocks = []
     for doc in passages:
@@ -59,39 +70,36 @@ You MUST respond with ONLY a JSON object, no other text. Use this exact format:
     "source_metadata": {{}}
 }}"""
 
-    if previous_stems:
-        stems_list = "\n".join(f"- {s}" for s in previous_stems[-5:])
-        base += f"\n\nIMPORTANT: Do not repeat these questions:\n{stems_list}"
-
-    return base
+    return base + _previous_stems_block(previous_stems)
 
-def student_generator_node(state: StudentQuizState) -> StudentQuizState:
-    llm = ChatOllama(
-        model=settings.planner_model_name,
-        base_url=settings.ollama_base_url,
-        temperature=0.7,
-        format="json",
-    )
+async def student_generator_node(state: StudentQuizState) -> StudentQuizState:
+    llm = get_chat_model(temperature=0.7, format="json")
 
     topic = state.get("student_topic", "Key concepts from the course materials")
     course_id = state.get("course_id")
 
-    passages = retrieve_passages_for_course(course_id, topic, k=6)
-    state["supporting_passages"] = [
-        {"page_content": doc.page_content, "metadata": dict(doc.metadata or {})}
-        for doc in passages
-    ]
-
     previous_stems = [q.get("stem", "") for q in (state.get("questions") or [])]
+    # The stems the prompt lists come out of the same budget as the context passages.
+    budget = settings.prompt_budget_practice_tokens
+    if budget > 0:
+        budget = max(budget - estimate_tokens(_previous_stems_block(previous_stems)), 1)
+
+    passages = await asyncio.to_thread(retrieve_passages_for_course, course_id, topic, 6)
+    state["supporting_passages"] = fit_passages(
+        [{"page_content": doc.page_content, "metadata": dict(doc.metadata or {})} for doc in passages],
+        topic,
+        budget,
+    )
+
     prompt = _student_generator_prompt(topic, state["supporting_passages"], previous_stems)
     
-    content = _call_llm(llm, prompt, settings.assessment_llm_timeout_seconds)
+    content = await call_llm(llm, prompt, settings.assessment_llm_timeout_seconds)
 
     if content is None:
         state["last_verdict"] = "reject"
         return state
 
-    parsed = _extract_json_from_content(content) 
+    parsed = extract_json_object(content) 
     if parsed is not None:
         candidate = parsed
         candidate["id"] = str(uuid.uuid4())
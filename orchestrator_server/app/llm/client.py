@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from ..config import settings
+from .prompt_budget import estimate_tokens
+from .scheduler import LLMScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """Async entry point for chat-model calls.
+
+    Every call runs under a deadline that covers both waiting for a
+    concurrency slot and the generation itself. When the deadline passes the
+    in-flight request is cancelled, which closes the HTTP connection so
+    Ollama stops generating. Slots are handed out by an ``LLMScheduler``,
+    by the priority class and tenant set with ``llm_request``.
+    """
+
+    def __init__(self, scheduler: LLMScheduler) -> None:
+        self.scheduler = scheduler
+
+    async def _invoke(self, llm: BaseChatModel, prompt: str) -> str:
+        async with self.scheduler.slot(estimate_tokens(prompt)):
+            response = await llm.ainvoke(prompt)
+        return response.content if hasattr(response, "content") else str(response)
+
+    async def ainvoke(self, llm: BaseChatModel, prompt: str, timeout_seconds: float) -> str:
+        """Return the model output, raising ``asyncio.TimeoutError`` past the deadline."""
+        return await asyncio.wait_for(self._invoke(llm, prompt), timeout=timeout_seconds)
+
+    async def astream(
+        self, llm: BaseChatModel, prompt: str, timeout_seconds: float
+    ) -> AsyncIterator[str]:
+        """Yield content chunks as the model produces them, under one overall deadline."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+
+        slot = self.scheduler.slot(estimate_tokens(prompt))
+        await asyncio.wait_for(slot.__aenter__(), timeout=timeout_seconds)
+        try:
+            stream = llm.astream(prompt)
+            try:
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        return
+                    yield chunk.content if hasattr(chunk, "content") else str(chunk)
+            finally:
+                await stream.aclose()
+        finally:
+            await slot.__aexit__(None, None, None)
+
+
+llm_client = LLMClient(
+    LLMScheduler(
+        settings.llm_max_concurrency,
+        max_queue_depth=settings.llm_max_queue_depth,
+        weights=settings.llm_class_weights,
+    )
+)
+
+
+async def call_llm(llm: BaseChatModel, prompt: str, timeout_seconds: float) -> str | None:
+    """Invoke LLM with logging. Returns content string or None on failure."""
+    start = time.perf_counter()
+    try:
+        content = await llm_client.ainvoke(llm, prompt, timeout_seconds)
+    except asyncio.TimeoutError:
+        elapsed = time.perf_counter() - start
+        logger.warning("LLM call timed out after %.1fs (limit %.1fs)", elapsed, timeout_seconds)
+        return None
+    except Exception as exc:
+        elapsed = time.perf_counter() - start
+        logger.warning("LLM call failed after %.1fs: %s", elapsed, exc)
+        return None
+
+    elapsed = time.perf_counter() - start
+    logger.info("LLM call completed in %.1fs (%d chars)", elapsed, len(content))
+    return content
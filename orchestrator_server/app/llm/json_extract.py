@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+_decoder = json.JSONDecoder()
+
+# Characters that can change the scanner's state outside of a string.
+_STRUCTURAL = re.compile(r'[{}\[\]":,]')
+# Characters that can end (or escape inside) a string.
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+def _balanced_end(text: str, start: int) -> Optional[int]:
+    """Index just past the object opened at ``text[start]``, or None if it never closes."""
+    depth = 0
+    pos = start
+    while True:
+        match = _STRUCTURAL.search(text, pos)
+        if match is None:
+            return None
+        char = match.group()
+        pos = match.end()
+        if char == '"':
+            pos = _skip_string(text, pos)
+            if pos < 0:
+                return None
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def _skip_string(text: str, pos: int) -> int:
+    """Index just past the string whose opening quote ends at ``pos``; -1 if unterminated."""
+    while True:
+        match = _STRING_SPECIAL.search(text, pos)
+        if match is None:
+            return -1
+        if match.group() == "\\":
+            pos = match.end() + 1
+            continue
+        return match.end()
+
+
+def extract_json_object(content: str) -> dict[str, Any] | None:
+    """Return the first JSON object in LLM output, tolerating fences and prose around it.
+
+    Each top-level ``{`` is decoded in place with :meth:`json.JSONDecoder.raw_decode`,
+    so clean output costs a single parse. When a candidate does not decode, the
+    string-aware brace scanner skips to the end of its span and tries the next
+    one; the text is never re-sliced. An object that never closes (truncated
+    output) yields None rather than one of its nested objects.
+    """
+    start = content.find("{")
+    while start != -1:
+        try:
+            value, _ = _decoder.raw_decode(content, start)
+        except json.JSONDecodeError:
+            end = _balanced_end(content, start)
+            if end is None:
+                # Unclosed (e.g. truncated) object: anything after it is nested inside it.
+                return None
+            start = content.find("{", end)
+            continue
+        if isinstance(value, dict):
+            return value
+        start = content.find("{", start + 1)
+    return None
+
+
+class JSONObjectStream:
+    """Incremental form of :func:`extract_json_object` for streamed LLM output.
+
+    :meth:`feed` scans only the newly arrived text, keeping the brace, string
+    and key state between chunks. Objects that are direct elements of the
+    array stored under ``item_key`` (e.g. a plan's ``"segments"``) are returned
+    as soon as they close; the first complete top-level object is kept in
+    :attr:`result`.
+    """
+
+    def __init__(self, item_key: str | None = None) -> None:
+        self.item_key = item_key
+        self.text = ""
+        self.result: dict[str, Any] | None = None
+        self._pos = 0
+        # One frame per open container: (opening char, start index, key it is stored under).
+        self._stack: List[Tuple[str, int, Optional[str]]] = []
+        self._in_string = False
+        self._string_start = 0
+        self._last_string: str | None = None
+        self._pending_key: str | None = None
+
+    def feed(self, chunk: str) -> List[dict[str, Any]]:
+        self.text += chunk
+        items: List[dict[str, Any]] = []
+        if self.result is not None:
+            return items
+
+        text = self.text
+        pos = self._pos
+        while True:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(text):
+                        # The escaped character has not arrived yet.
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                pos = match.end()
+                self._in_string = False
+                self._last_string = text[self._string_start : pos - 1]
+                continue
+
+            if not self._stack:
+                start = text.find("{", pos)
+                if start == -1:
+                    pos = len(text)
+                    break
+                self._stack.append(("{", start, None))
+                pos = start + 1
+                continue
+
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                pos = len(text)
+                break
+            char = match.group()
+            pos = match.end()
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ":":
+                self._pending_key = self._last_string
+            elif char == ",":
+                self._pending_key = None
+            elif char in "{[":
+                parent = self._stack[-1][0]
+                key = self._pending_key if parent == "{" else None
+                self._stack.append((char, pos - 1, key))
+                self._pending_key = None
+            else:
+                opener, start, _ = self._stack.pop()
+                self._pending_key = None
+                if opener != ("{" if char == "}" else "["):
+                    # Mismatched bracket: not JSON, drop this candidate.
+                    self._stack.clear()
+                    pos = start + 1
+                    continue
+                if char != "}":
+                    continue
+                if not self._stack:
+                    value = self._decode(start, pos)
+                    if value is not None:
+                        self.result = value
+                        break
+                elif self._is_item(self._stack[-1]):
+                    value = self._decode(start, pos)
+                    if value is not None:
+                        items.append(value)
+
+        self._pos = pos
+        return items
+
+    def _is_item(self, parent: Tuple[str, int, Optional[str]]) -> bool:
+        return self.item_key is not None and parent[0] == "[" and parent[2] == self.item_key
+
+    def _decode(self, start: int, end: int) -> dict[str, Any] | None:
+        try:
+            value = json.loads(self.text[start:end])
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
+
+    def finish(self) -> dict[str, Any] | None:
+        """The parsed object, falling back to a full extraction of everything received."""
+        if self.result is not None:
+            return self.result
+        return extract_json_object(self.text)
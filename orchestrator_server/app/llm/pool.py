@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+from langchain_community.chat_models import ChatOllama
+from langchain_community.llms.ollama import OllamaEndpointNotFoundError
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_session: aiohttp.ClientSession | None = None
+_session_loop: asyncio.AbstractEventLoop | None = None
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Return the keep-alive HTTP session for the running event loop."""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=max(settings.llm_max_concurrency * 2, 4),
+                keepalive_timeout=settings.ollama_http_keepalive_seconds,
+            )
+        )
+        _session_loop = loop
+    return _session
+
+
+class PooledChatOllama(ChatOllama):
+    """ChatOllama that reuses one keep-alive HTTP session for async calls.
+
+    The upstream implementation opens a new ``aiohttp.ClientSession`` (and a
+    new connection) per request; this override builds the same request but
+    sends it over the shared session.
+    """
+
+    async def _acreate_stream(
+        self,
+        api_url: str,
+        payload: Any,
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        if self.stop is not None and stop is not None:
+            raise ValueError("`stop` found in both the input and default params.")
+        elif self.stop is not None:
+            stop = self.stop
+
+        params = self._default_params
+        for key in self._default_params:
+            if key in kwargs:
+                params[key] = kwargs[key]
+
+        if "options" in kwargs:
+            params["options"] = kwargs["options"]
+        else:
+            params["options"] = {
+                **params["options"],
+                "stop": stop,
+                **{k: v for k, v in kwargs.items() if k not in self._default_params},
+            }
+
+        if payload.get("messages"):
+            request_payload = {"messages": payload.get("messages", []), **params}
+        else:
+            request_payload = {
+                "prompt": payload.get("prompt"),
+                "images": payload.get("images", []),
+                **params,
+            }
+
+        session = await _get_session()
+        async with session.post(
+            url=api_url,
+            headers={
+                "Content-Type": "application/json",
+                **(self.headers if isinstance(self.headers, dict) else {}),
+            },
+            auth=self.auth,  # type: ignore[arg-type]
+            json=request_payload,
+            timeout=self.timeout,  # type: ignore[arg-type]
+        ) as response:
+            if response.status != 200:
+                if response.status == 404:
+                    raise OllamaEndpointNotFoundError("Ollama call failed with status code 404.")
+                raise ValueError(
+                    f"Ollama call failed with status code {response.status}."
+                    f" Details: {await response.text()}"
+                )
+            async for line in response.content:
+                yield line.decode("utf-8")
+
+
+_clients_lock = threading.Lock()
+_clients: Dict[Tuple[str, float, Optional[str]], PooledChatOllama] = {}
+
+
+def get_chat_model(
+    temperature: float,
+    format: Optional[str] = None,
+    model: Optional[str] = None,
+) -> ChatOllama:
+    """Return the shared chat client for ``(model, temperature, format)``."""
+    model = model or settings.planner_model_name
+    key = (model, float(temperature), format)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = PooledChatOllama(
+                model=model,
+                base_url=settings.ollama_base_url,
+                temperature=temperature,
+                format=format,
+                keep_alive=settings.ollama_keep_alive,
+            )
+            _clients[key] = client
+        return client
+
+
+async def warm_up_models() -> None:
+    """Ask Ollama to load the chat and embedding models before the first request.
+
+    Failures are logged and ignored so the API still starts when Ollama is
+    not up yet.
+    """
+    session = await _get_session()
+    targets = [
+        (
+            f"{settings.ollama_base_url}/api/generate",
+            {"model": settings.planner_model_name, "keep_alive": settings.ollama_keep_alive},
+        ),
+        (
+            f"{settings.ollama_base_url}/api/embeddings",
+            {
+                "model": settings.embedding_model_name,
+                "prompt": "warm-up",
+                "keep_alive": settings.ollama_keep_alive,
+            },
+        ),
+    ]
+    for url, body in targets:
+        try:
+            async with session.post(url, json=body) as response:
+                await response.read()
+            logger.info("Warm-up: loaded %s (status %s)", body["model"], response.status)
+        except Exception as exc:
+            logger.warning("Warm-up: could not load %s: %s", body["model"], exc)
+
+
+async def close_chat_models() -> None:
+    """Close the shared HTTP session."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import logging
+import math
+import re
+from typing import Any, Dict, List
+
+from ..rag.bm25 import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Rough English average for Gemma/Llama-style tokenizers; good enough for budgeting.
+CHARS_PER_TOKEN = 4.0
+
+# Ingestion splits with a 150-char overlap; shorter shared runs are treated as coincidence.
+_MAX_OVERLAP_CHARS = 200
+_MIN_OVERLAP_CHARS = 30
+# A passage cut down to fewer tokens than this is dropped rather than sent as a fragment.
+_MIN_PASSAGE_TOKENS = 40
+
+_SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _overlap(head: str, tail: str) -> int:
+    """Length of the longest suffix of ``head`` that ``tail`` starts with."""
+    for size in range(min(len(head), len(tail), _MAX_OVERLAP_CHARS), _MIN_OVERLAP_CHARS - 1, -1):
+        if head.endswith(tail[:size]):
+            return size
+    return 0
+
+
+def _dedupe(texts: List[str]) -> List[str]:
+    """Drop text repeated across passages: contained passages and chunk-overlap margins."""
+    kept: List[str] = []
+    for text in texts:
+        text = text.strip()
+        if any(text in other for other in kept):
+            kept.append("")
+            continue
+        for other in kept:
+            if not other:
+                continue
+            # The splitter overlap shows up as this passage's head repeating another's tail,
+            # or its tail repeating another's head.
+            text = text[_overlap(other, text):]
+            cut = _overlap(text, other)
+            if cut:
+                text = text[:-cut]
+        kept.append(text.strip())
+    return kept
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to ``max_tokens``, at the last sentence end that fits if there is one."""
+    limit = int(max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    ends = [match.end() for match in _SENTENCE_END.finditer(head)]
+    if ends and ends[-1] >= limit // 2:
+        return head[: ends[-1]]
+    return head.rsplit(" ", 1)[0] + " ..."
+
+
+def fit_passages(
+    passages: List[Dict[str, Any]],
+    query: str,
+    budget_tokens: int,
+) -> List[Dict[str, Any]]:
+    """Passages for a prompt, deduplicated, ranked against ``query`` and trimmed to a token budget.
+
+    Overlapping chunk text is sent once. Passages are ranked by how many of the
+    query's content words they contain, ties keeping retrieval order, and
+    added best-first until ``budget_tokens`` is spent; the first passage that
+    does not fit is truncated into the remainder. A budget of 0 or less
+    only deduplicates and ranks. Returns copies with the trimmed
+    ``page_content``; metadata is unchanged.
+    """
+    texts = _dedupe([str(doc.get("page_content", "")) for doc in passages])
+    query_tokens = set(tokenize(query))
+    ranked = sorted(
+        (i for i, text in enumerate(texts) if text),
+        key=lambda i: (-len(query_tokens & set(tokenize(texts[i]))), i),
+    )
+
+    fitted: List[Dict[str, Any]] = []
+    remaining = budget_tokens if budget_tokens > 0 else math.inf
+    for i in ranked:
+        text = texts[i]
+        cost = estimate_tokens(text)
+        if cost > remaining:
+            if remaining < _MIN_PASSAGE_TOKENS:
+                break
+            text = _truncate(text, remaining)
+            cost = estimate_tokens(text)
+        fitted.append({**passages[i], "page_content": text})
+        remaining -= cost
+
+    logger.debug(
+        "Prompt budget: %d of %d passage(s) kept, ~%d of ~%d context tokens",
+        len(fitted),
+        len(passages),
+        sum(estimate_tokens(doc["page_content"]) for doc in fitted),
+        sum(estimate_tokens(str(doc.get("page_content", ""))) for doc in passages),
+    )
+    return fitted
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Deque, Dict, Iterator, Literal, Tuple
+
+logger = logging.getLogger(__name__)
+
+Priority = Literal["practice", "plan", "assessment"]
+
+# Share of LLM slots each class gets when all are busy; higher is served more often.
+DEFAULT_WEIGHTS: Dict[str, float] = {"practice": 4.0, "plan": 2.0, "assessment": 1.0}
+
+_DEFAULT_CONTEXT: Tuple[Priority, str] = ("assessment", "default")
+_request_context: contextvars.ContextVar[Tuple[Priority, str]] = contextvars.ContextVar(
+    "llm_request_context", default=_DEFAULT_CONTEXT
+)
+
+
+class LLMQueueFull(Exception):
+    """Raised when the LLM queue is too deep to admit another request."""
+
+
+@contextmanager
+def llm_request(priority: Priority, tenant: str | None) -> Iterator[None]:
+    """Tag LLM calls made in this context (and tasks started from it) with a class and tenant."""
+    token = _request_context.set((priority, tenant or "default"))
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+class _ClassQueue:
+    """Waiters of one priority class, served round-robin across tenants."""
+
+    def __init__(self, weight: float) -> None:
+        self.weight = weight
+        self.pass_value = 0.0
+        self.tenants: "OrderedDict[str, Deque[asyncio.Future[None]]]" = OrderedDict()
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.inference_seconds = 0.0
+        self.prompt_tokens = 0
+
+    def push(self, tenant: str, waiter: "asyncio.Future[None]") -> None:
+        self.tenants.setdefault(tenant, deque()).append(waiter)
+        self.queued += 1
+
+    def pop(self) -> "asyncio.Future[None]":
+        tenant, waiters = next(iter(self.tenants.items()))
+        waiter = waiters.popleft()
+        # The tenant goes to the back of the rotation, or leaves it when drained.
+        del self.tenants[tenant]
+        if waiters:
+            self.tenants[tenant] = waiters
+        self.queued -= 1
+        return waiter
+
+    def discard(self, tenant: str, waiter: "asyncio.Future[None]") -> None:
+        waiters = self.tenants.get(tenant)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del self.tenants[tenant]
+        self.queued -= 1
+
+
+class LLMScheduler:
+    """Hands out ``max_concurrency`` LLM slots across priority classes and tenants.
+
+    Classes share slots by weight (stride scheduling: the backlogged class
+    with the lowest pass value goes next, and its pass advances by
+    ``1 / weight``), so bulk work still progresses while interactive work is
+    favoured. Within a class, tenants (a user, course or document set) take
+    turns, so one large request cannot monopolise its class. ``admit``
+    rejects new requests once ``max_queue_depth`` calls are waiting.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue_depth: int,
+        weights: Dict[str, float] | None = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self._classes = {
+            name: _ClassQueue(weight) for name, weight in (weights or DEFAULT_WEIGHTS).items()
+        }
+        self._running = 0
+        self._virtual_time = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(queue.queued for queue in self._classes.values())
+
+    def _class(self, priority: str) -> _ClassQueue:
+        return self._classes.get(priority) or self._classes[_DEFAULT_CONTEXT[0]]
+
+    def admit(self, priority: Priority | None = None) -> None:
+        """Raise ``LLMQueueFull`` if the queue is too deep for a new request of this class."""
+        if self.queued >= self.max_queue_depth:
+            self._class(priority or _request_context.get()[0]).rejected += 1
+            raise LLMQueueFull(f"LLM queue is full ({self.queued} calls waiting); retry shortly.")
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency:
+            backlogged = [queue for queue in self._classes.values() if queue.queued]
+            if not backlogged:
+                return
+            queue = min(backlogged, key=lambda q: q.pass_value)
+            waiter = queue.pop()
+            if waiter.done():
+                continue
+            self._virtual_time = queue.pass_value
+            queue.pass_value += 1.0 / queue.weight
+            self._running += 1
+            queue.in_flight += 1
+            waiter.set_result(None)
+
+    def _release(self, queue: _ClassQueue) -> None:
+        self._running -= 1
+        queue.in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, prompt_tokens: int = 0) -> AsyncIterator[None]:
+        """Wait for an LLM slot for the current context's class and tenant, and hold it.
+
+        ``prompt_tokens`` (an estimate) is logged and averaged next to the
+        inference time, to tune prompt budgets against latency.
+        """
+        priority, tenant = _request_context.get()
+        queue = self._class(priority)
+        if not queue.queued and not queue.in_flight:
+            # A class returning from idle must not spend credit it built up meanwhile.
+            queue.pass_value = max(queue.pass_value, self._virtual_time)
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        queue.push(tenant, waiter)
+        enqueued = time.perf_counter()
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(queue)
+            else:
+                queue.discard(tenant, waiter)
+            raise
+
+        started = time.perf_counter()
+        wait = started - enqueued
+        queue.wait_seconds += wait
+        queue.max_wait_seconds = max(queue.max_wait_seconds, wait)
+        try:
+            yield
+        finally:
+            inference = time.perf_counter() - started
+            queue.inference_seconds += inference
+            queue.prompt_tokens += prompt_tokens
+            queue.completed += 1
+            self._release(queue)
+            logger.info(
+                "LLM %s call for %s: ~%d prompt tokens, waited %.2fs, inference %.2fs",
+                priority,
+                tenant,
+                prompt_tokens,
+                wait,
+                inference,
+            )
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth plus per-class wait vs. inference time (milliseconds) and prompt size."""
+        stats: Dict[str, float] = {"running": self._running, "queued": self.queued}
+        for name, queue in self._classes.items():
+            done = queue.completed or 1
+            stats[f"{name}_queued"] = queue.queued
+            stats[f"{name}_in_flight"] = queue.in_flight
+            stats[f"{name}_completed"] = queue.completed
+            stats[f"{name}_rejected"] = queue.rejected
+            stats[f"{name}_wait_ms_avg"] = round(queue.wait_seconds / done * 1000, 1)
+            stats[f"{name}_wait_ms_max"] = round(queue.max_wait_seconds * 1000, 1)
+            stats[f"{name}_inference_ms_avg"] = round(queue.inference_seconds / done * 1000, 1)
+            stats[f"{name}_prompt_tokens_avg"] = round(queue.prompt_tokens / done, 1)
+        return stats
@@ -1,5 +1,11 @@
+import asyncio
+import json
+import uuid
+from typing import AsyncIterator
+
 from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 from .config import settings
 from .schemas import (
@@ -7,11 +13,31 @@ from .schemas import (
     AssessmentResponse,
     PlanRequest,
     PlanResponse,
-    UploadResponse,
+    PracticeRequest,
+    PracticeResponse,
+    UploadJobResponse,
+    UploadJobStatus,
+)
+from .llm.client import llm_client
+from .llm.pool import close_chat_models, warm_up_models
+from .llm.scheduler import LLMQueueFull, Priority
+from .services.assessments import (
+    assessment_flight_stats,
+    generate_assessments,
+    question_bank_stats,
+    stream_assessments,
+)
+from .services.ingestion_jobs import IngestionQueueFull, ingestion_jobs
+from .services.planner import get_lecture_plan, plan_cache_stats, stream_lecture_plan
+from .services.practice import generate_practice_questions, practice_flight_stats
+from .rag.vectorstore import (
+    embedding_cache_stats,
+    lexical_index_stats,
+    discard_upload,
+    retrieval_cache_stats,
+    store_upload,
+    vectorstore_cache_stats,
 )
-from .services.assessments import generate_assessments
-from .services.planner import generate_lecture_plan
-from .rag.vectorstore import ingest_pdf
 
 # from backend.app.routes.student_quiz_routes import router as student_quiz_router
 
@@ -29,46 +55,166 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def start_background_workers() -> None:
+    await ingestion_jobs.start()
+    if settings.llm_warm_up_on_startup:
+        # Load the models in the background so startup is not blocked on Ollama.
+        app.state.warm_up_task = asyncio.create_task(warm_up_models())
+
+
+@app.on_event("shutdown")
+async def stop_background_workers() -> None:
+    await ingestion_jobs.stop()
+    await close_chat_models()
+
+
+def _busy(exc: LLMQueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": "5"})
+
+
+def _admit_llm_request(priority: Priority) -> None:
+    """Reject a streaming request up front, before the response has started."""
+    try:
+        llm_client.scheduler.admit(priority)
+    except LLMQueueFull as exc:
+        raise _busy(exc) from exc
+
+
 @app.post("/api/v1/plan", response_model=PlanResponse)
 async def create_plan(payload: PlanRequest) -> PlanResponse:
     try:
-        lecture_plan = await generate_lecture_plan(
+        lecture_plan, cache_status = await get_lecture_plan(
             module_title=payload.module_title,
             audience=payload.audience,
             duration_minutes=payload.duration_minutes,
+            bypass_cache=payload.bypass_cache,
+            tenant=payload.course_id,
         )
+    except LLMQueueFull as exc:
+        raise _busy(exc) from exc
     except Exception as exc:  # pragma: no cover - top-level error guard
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    return PlanResponse(lecture_plan=lecture_plan)
+    return PlanResponse(lecture_plan=lecture_plan, cache=cache_status)
+
 
+@app.post("/api/v1/plan/stream")
+async def create_plan_stream(payload: PlanRequest) -> StreamingResponse:
+    """Stream the plan as NDJSON: one ``segment`` event per segment, then a final ``plan`` event."""
+    _admit_llm_request("plan")
 
-@app.post("/api/v1/upload", response_model=UploadResponse)
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in stream_lecture_plan(
+                module_title=payload.module_title,
+                audience=payload.audience,
+                duration_minutes=payload.duration_minutes,
+                bypass_cache=payload.bypass_cache,
+                tenant=payload.course_id,
+            ):
+                yield json.dumps(event) + "\n"
+        except Exception as exc:  # pragma: no cover - top-level error guard
+            yield json.dumps({"event": "error", "detail": str(exc)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/api/v1/upload", response_model=UploadJobResponse, status_code=202)
 async def upload_pdf(
     file: UploadFile = File(...),
     document_set_id: str | None = None,
-) -> UploadResponse:
+) -> UploadJobResponse:
     if file.content_type not in ("application/pdf", "application/x-pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+    if not ingestion_jobs.has_capacity():
+        raise HTTPException(status_code=429, detail="Ingestion queue is full; retry shortly.")
+
+    if document_set_id is None:
+        document_set_id = str(uuid.uuid4())
 
     try:
-        result = await ingest_pdf(file, document_set_id=document_set_id)
+        file_path = await store_upload(file, document_set_id)
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    return UploadResponse(**result)
+    try:
+        job = ingestion_jobs.submit(document_set_id, file.filename, file_path)
+    except IngestionQueueFull as exc:
+        discard_upload(file_path)
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
+    except Exception as exc:  # pragma: no cover
+        discard_upload(file_path)
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+    return UploadJobResponse(
+        job_id=job["job_id"],
+        document_set_id=document_set_id,
+        status=job["status"],
+    )
+
+
+@app.get("/api/v1/upload/{job_id}", response_model=UploadJobStatus)
+async def upload_status(job_id: str) -> UploadJobStatus:
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingestion job.")
+    return UploadJobStatus(**job)
 
 
 @app.post("/api/v1/assessments", response_model=AssessmentResponse)
 async def create_assessments(payload: AssessmentRequest) -> AssessmentResponse:
     try:
         result = await generate_assessments(payload)
+    except LLMQueueFull as exc:
+        raise _busy(exc) from exc
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
     return result
 
 
+@app.post("/api/v1/assessments/stream")
+async def create_assessments_stream(payload: AssessmentRequest) -> StreamingResponse:
+    """Stream accepted questions as NDJSON; disconnecting stops generation."""
+    _admit_llm_request("assessment")
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in stream_assessments(payload):
+                yield json.dumps(event) + "\n"
+        except Exception as exc:  # pragma: no cover - top-level error guard
+            yield json.dumps({"event": "error", "detail": str(exc)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/api/v1/practice", response_model=PracticeResponse)
+async def create_practice_questions(payload: PracticeRequest) -> PracticeResponse:
+    """Generate practice questions for a student topic; called by the backend's practice jobs."""
+    try:
+        return await generate_practice_questions(payload)
+    except LLMQueueFull as exc:
+        raise _busy(exc) from exc
+    except Exception as exc:  # pragma: no cover
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@app.get("/api/v1/stats")
+async def stats() -> dict[str, dict[str, float]]:
+    return {
+        "vectorstores": vectorstore_cache_stats(),
+        "retrievals": retrieval_cache_stats(),
+        "lexical_indexes": lexical_index_stats(),
+        "embeddings": embedding_cache_stats(),
+        "plans": plan_cache_stats(),
+        "question_bank": question_bank_stats(),
+        "assessments": assessment_flight_stats(),
+        "practice": practice_flight_stats(),
+        "llm": llm_client.scheduler.stats(),
+    }
+
+
 @app.get("/health")
 async def health() -> dict[str, str]:
     return {"status": "ok", "ollama_base_url": settings.ollama_base_url}
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be but by can do does for from has have how in into is it its
+    of on or that the their then there these this to was were what when where which
+    who why will with
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens with common English stopwords removed."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> List[str]:
+    """Fuse ranked id lists: each id scores ``sum(1 / (k + rank))`` over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item_id: scores[item_id], reverse=True)
+
+
+class BM25Index:
+    """Okapi BM25 over a document set's chunks, keyed by chunk id.
+
+    Only per-chunk term frequencies are persisted; postings and lengths are
+    rebuilt when the index is loaded. Chunks can be added and removed in
+    place, so re-ingesting a file only touches the chunks that changed.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._docs
+
+    def _add(self, item_id: str, terms: Dict[str, int]) -> None:
+        self._docs[item_id] = terms
+        length = sum(terms.values())
+        self._lengths[item_id] = length
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[item_id] = tf
+
+    def _remove(self, item_id: str) -> None:
+        terms = self._docs.pop(item_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(item_id)
+        for term in terms:
+            posting = self._postings[term]
+            del posting[item_id]
+            if not posting:
+                del self._postings[term]
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        with self._lock:
+            for item_id, text in zip(ids, texts):
+                self._remove(item_id)
+                self._add(item_id, dict(Counter(tokenize(text))))
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for item_id in ids:
+                self._remove(item_id)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-``k`` ``(chunk id, score)`` pairs for ``query``, best first."""
+        with self._lock:
+            num_docs = len(self._docs)
+            if num_docs == 0:
+                return []
+            avg_length = self._total_length / num_docs
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log((num_docs - len(posting) + 0.5) / (len(posting) + 0.5) + 1.0)
+                for item_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[item_id] / avg_length)
+                    scores[item_id] = scores.get(item_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+        return ranked[:k]
+
+    def save(self, path: Path) -> None:
+        """Write the index atomically, so a crash never leaves a half-written file."""
+        with self._lock:
+            payload = json.dumps({"k1": self.k1, "b": self.b, "docs": self._docs})
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        for item_id, terms in data["docs"].items():
+            index._add(item_id, terms)
+        return index
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_KEY_SIZE = hashlib.sha256().digest_size
+
+
+def _model_dir_name(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+
+
+def embedding_key(kind: str, text: str) -> bytes:
+    """Content address of a text; ``kind`` separates query and document embeddings."""
+    return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).digest()
+
+
+class EmbeddingStore:
+    """Append-only on-disk embedding store for a single model.
+
+    Vectors live in ``vectors.f32`` as a raw row-major float32 matrix that is
+    memory-mapped for reads; ``keys.bin`` holds the SHA-256 key of each row in
+    the same order. Rows are only ever appended, so a torn write is repaired on
+    load by truncating both files to the shorter of the two.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._dir = directory
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = directory / "vectors.f32"
+        self._keys_path = directory / "keys.bin"
+        self._meta_path = directory / "meta.json"
+        self._lock = threading.Lock()
+        self._dim: int | None = None
+        self._rows: Dict[bytes, int] = {}
+        self._matrix: np.memmap | None = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _load(self) -> None:
+        if not self._meta_path.exists():
+            return
+        self._dim = int(json.loads(self._meta_path.read_text())["dim"])
+
+        keys = self._keys_path.read_bytes() if self._keys_path.exists() else b""
+        vector_bytes = self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+        num_rows = min(len(keys) // _KEY_SIZE, vector_bytes // (self._dim * 4))
+
+        for row in range(num_rows):
+            self._rows[keys[row * _KEY_SIZE : (row + 1) * _KEY_SIZE]] = row
+
+        if len(keys) != num_rows * _KEY_SIZE:
+            with self._keys_path.open("r+b") as f:
+                f.truncate(num_rows * _KEY_SIZE)
+        if vector_bytes != num_rows * self._dim * 4:
+            with self._vectors_path.open("r+b") as f:
+                f.truncate(num_rows * self._dim * 4)
+
+    def _mapped(self) -> np.memmap:
+        num_rows = len(self._rows)
+        if self._matrix is None or self._matrix.shape[0] != num_rows:
+            self._matrix = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(num_rows, self._dim),
+            )
+        return self._matrix
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[List[float]]]:
+        with self._lock:
+            if not self._rows:
+                return [None] * len(keys)
+            matrix = self._mapped()
+            return [
+                matrix[self._rows[key]].tolist() if key in self._rows else None
+                for key in keys
+            ]
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[Sequence[float]]) -> None:
+        if not keys:
+            return
+        with self._lock:
+            fresh = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._rows:
+                    fresh[key] = vector
+            if not fresh:
+                return
+
+            matrix = np.asarray(list(fresh.values()), dtype=np.float32)
+            if self._dim is None:
+                self._dim = int(matrix.shape[1])
+                self._meta_path.write_text(json.dumps({"dim": self._dim}))
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension changed from {self._dim} to {matrix.shape[1]}"
+                )
+
+            # Vectors first: on a crash between the two writes, load() drops
+            # the orphaned rows instead of pointing keys at missing data.
+            with self._vectors_path.open("ab") as f:
+                f.write(matrix.tobytes())
+            with self._keys_path.open("ab") as f:
+                f.write(b"".join(fresh.keys()))
+
+            start = len(self._rows)
+            for offset, key in enumerate(fresh):
+                self._rows[key] = start + offset
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that consults an :class:`EmbeddingStore` before the model."""
+
+    def __init__(self, underlying: Embeddings, store: EmbeddingStore) -> None:
+        self.underlying = underlying
+        self.store = store
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, kind: str, texts: List[str]) -> Tuple[List[List[float]], int]:
+        keys = [embedding_key(kind, text) for text in texts]
+        vectors = self.store.get_many(keys)
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            if kind == "query":
+                computed = [self.underlying.embed_query(texts[i]) for i in missing]
+            else:
+                computed = self.underlying.embed_documents([texts[i] for i in missing])
+            self.store.put_many([keys[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = list(vector)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return vectors, len(missing)  # type: ignore[return-value]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("document", texts)[0]
+
+    def embed_documents_reporting(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """Like :meth:`embed_documents`, also returning how many texts hit the model."""
+        return self._embed("document", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text])[0][0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self.store), "hits": self.hits, "misses": self.misses}
+
+
+def open_embedding_store(cache_dir: Path, model_name: str) -> EmbeddingStore:
+    """Return the on-disk store for ``model_name`` under ``cache_dir``."""
+    return EmbeddingStore(cache_dir / _model_dir_name(model_name))
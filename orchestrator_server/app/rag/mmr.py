@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+import numpy as np
+
+
+def mmr_select(
+    relevance: Sequence[float],
+    vectors: np.ndarray,
+    k: int,
+    lambda_mult: float,
+    penalty: Sequence[float] | None = None,
+) -> List[int]:
+    """Pick ``k`` candidate indices by maximal marginal relevance.
+
+    Each step takes the candidate maximising
+    ``lambda_mult * relevance - (1 - lambda_mult) * max_similarity_to_selected - penalty``,
+    where similarity is the cosine between rows of ``vectors``. ``penalty`` lets
+    callers push down candidates they would rather not reuse.
+    """
+    num_candidates = len(relevance)
+    if num_candidates == 0 or k <= 0:
+        return []
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1.0, norms)
+    base = lambda_mult * np.asarray(relevance, dtype=np.float64)
+    if penalty is not None:
+        base = base - np.asarray(penalty, dtype=np.float64)
+
+    max_similarity = np.zeros(num_candidates)
+    available = np.ones(num_candidates, dtype=bool)
+    selected: List[int] = []
+    for _ in range(min(k, num_candidates)):
+        scores = np.where(available, base - (1 - lambda_mult) * max_similarity, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, unit @ unit[best])
+    return selected
@@ -1,87 +1,543 @@
 from __future__ import annotations
+import asyncio
+import hashlib
+import logging
 import shutil
+import threading
 import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Collection, Deque, Dict, List, Tuple
 
+import chromadb
+import numpy as np
+from chromadb.config import Settings as ChromaSettings
 from fastapi import UploadFile
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
 
+from ..cache import LRUCache
 from ..config import settings
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .embedding_cache import CachedEmbeddings, open_embedding_store
+from .mmr import mmr_select
+
+logger = logging.getLogger(__name__)
+
+_client_lock = threading.Lock()
+_chroma_client: chromadb.ClientAPI | None = None
+_embeddings: CachedEmbeddings | None = None
+
+# Open collections keyed by document_set_id; indexing and search reach the raw
+# Chroma collection through the same entries. Evicting an entry only drops the
+# handle; the underlying persistent client stays open.
+_vectorstores: LRUCache[str, Chroma] = LRUCache(settings.vectorstore_max_open_collections)
+
+# BM25 indexes keyed by document_set_id, persisted under settings.bm25_index_dir.
+# Updates hold _lexical_lock across load-modify-save so concurrent ingests of
+# the same document set do not overwrite each other's changes.
+_lexical_indexes: LRUCache[str, BM25Index] = LRUCache(settings.vectorstore_max_open_collections)
+_lexical_lock = threading.Lock()
+
+# Search results keyed by (document_set_id, search kind, normalised query, k).
+# Each ingest bumps the document set's generation and drops its entries, so a
+# search that raced with an ingest never stores a stale result.
+_retrievals: LRUCache[Tuple[str, str, str, int], List[Document]] = LRUCache(settings.retrieval_cache_size)
+_ingest_generations: Dict[str, int] = {}
 
 
 def _get_collection_name(document_set_id: str) -> str:
     return f"lectureai_{document_set_id}"
 
 
+def _get_chroma_client() -> chromadb.ClientAPI:
+    """Return the process-wide persistent Chroma client."""
+    global _chroma_client
+    with _client_lock:
+        if _chroma_client is None:
+            _chroma_client = chromadb.PersistentClient(
+                path=str(settings.chroma_db_dir),
+                settings=ChromaSettings(anonymized_telemetry=False),
+            )
+        return _chroma_client
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """Return the shared embedding function used by every collection.
+
+    Embeddings are served from the on-disk cache when the same text has
+    already been embedded by the configured model.
+    """
+    global _embeddings
+    with _client_lock:
+        if _embeddings is None:
+            _embeddings = CachedEmbeddings(
+                OllamaEmbeddings(
+                    model=settings.embedding_model_name,
+                    base_url=settings.ollama_base_url,
+                ),
+                open_embedding_store(settings.embedding_cache_dir, settings.embedding_model_name),
+            )
+        return _embeddings
+
+
+def embed_transient(texts: List[str]) -> List[List[float]]:
+    """Embed short-lived texts (e.g. draft question stems) without storing them in the cache."""
+    return get_embeddings().underlying.embed_documents(texts)
+
+
+def _open_vectorstore(document_set_id: str) -> Chroma:
+    return Chroma(
+        collection_name=_get_collection_name(document_set_id),
+        embedding_function=get_embeddings(),
+        client=_get_chroma_client(),
+        persist_directory=str(settings.chroma_db_dir),
+    )
+
+
 def get_vectorstore(document_set_id: str) -> Chroma:
-    """Create or load a Chroma collection for a given document set."""
-    embeddings = OllamaEmbeddings(
-        model=settings.embedding_model_name,
-        base_url=settings.ollama_base_url,
+    """Return the open Chroma collection for a document set, loading it on first use."""
+    return _vectorstores.get_or_create(
+        document_set_id, lambda: _open_vectorstore(document_set_id)
     )
-    collection_name = _get_collection_name(document_set_id)
-    vectorstore = Chroma(
-        collection_name=collection_name,
-        embedding_function=embeddings,
-        persist_directory=str(settings.chroma_db_dir),
+
+
+def _get_collection(document_set_id: str) -> chromadb.Collection:
+    """Return the raw Chroma collection held by the document set's registry entry."""
+    return get_vectorstore(document_set_id)._collection
+
+
+def existing_chunk_ids(document_set_id: str, ids: Collection[str]) -> set[str]:
+    """The subset of ``ids`` still present in a document set's collection."""
+    if not ids:
+        return set()
+    return set(_get_collection(document_set_id).get(ids=list(ids), include=[])["ids"])
+
+
+def _lexical_index_path(document_set_id: str) -> Path:
+    return settings.bm25_index_dir / f"{_get_collection_name(document_set_id)}.json"
+
+
+def _open_lexical_index(document_set_id: str) -> BM25Index:
+    path = _lexical_index_path(document_set_id)
+    if path.exists():
+        return BM25Index.load(path)
+
+    # Collections indexed before BM25 existed: build from what Chroma holds.
+    index = BM25Index()
+    stored = _get_collection(document_set_id).get(include=["documents"])
+    if stored["ids"]:
+        logger.info("Building BM25 index for %s (%d chunks)", document_set_id, len(stored["ids"]))
+        index.add(stored["ids"], stored["documents"])
+        index.save(path)
+    return index
+
+
+def get_lexical_index(document_set_id: str) -> BM25Index:
+    """Return the BM25 index for a document set, loading or building it on first use."""
+    return _lexical_indexes.get_or_create(
+        document_set_id, lambda: _open_lexical_index(document_set_id)
     )
-    return vectorstore
 
 
-async def ingest_pdf(file: UploadFile, document_set_id: str | None = None) -> Dict[str, Any]:
-    """Save an uploaded PDF, chunk it, and index into Chroma."""
-    if document_set_id is None:
-        document_set_id = str(uuid.uuid4())
+def _update_lexical_index(
+    document_set_id: str,
+    added: List[Tuple[str, str]],
+    removed: List[str],
+) -> None:
+    if not added and not removed:
+        return
+    with _lexical_lock:
+        index = get_lexical_index(document_set_id)
+        index.remove(removed)
+        index.add([item_id for item_id, _ in added], [text for _, text in added])
+        index.save(_lexical_index_path(document_set_id))
 
-    uploads_dir: Path = settings.uploads_dir / document_set_id
-    uploads_dir.mkdir(parents=True, exist_ok=True)
 
-    file_path = uploads_dir / file.filename
+def vectorstore_cache_stats() -> Dict[str, int]:
+    """Hit/miss/eviction counters for the open-collection registry."""
+    return _vectorstores.stats()
+
+
+def embedding_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters for the on-disk embedding cache."""
+    return get_embeddings().stats()
+
+
+def retrieval_cache_stats() -> Dict[str, int]:
+    """Hit/miss/eviction counters for the retrieval result cache."""
+    return _retrievals.stats()
+
+
+def lexical_index_stats() -> Dict[str, int]:
+    """Hit/miss/eviction counters for the open BM25 indexes."""
+    return _lexical_indexes.stats()
+
+
+def _normalise_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def invalidate_retrieval_cache(document_set_id: str) -> int:
+    """Forget cached search results for a document set after its contents change."""
+    with _client_lock:
+        _ingest_generations[document_set_id] = _ingest_generations.get(document_set_id, 0) + 1
+    return _retrievals.discard_where(lambda key: key[0] == document_set_id)
+
+
+def _cached_search(
+    document_set_id: str,
+    kind: str,
+    query: str,
+    k: int,
+    search: Callable[[], List[Document]],
+) -> List[Document]:
+    key = (document_set_id, kind, _normalise_query(query), k)
+    cached = _retrievals.get(key)
+    if cached is not None:
+        return list(cached)
+
+    generation = _ingest_generations.get(document_set_id, 0)
+    passages = search()
+    if _ingest_generations.get(document_set_id, 0) == generation:
+        _retrievals.put(key, list(passages))
+    return list(passages)
+
+
+def _save_upload(file: UploadFile, file_path: Path) -> None:
     with file_path.open("wb") as f:
         shutil.copyfileobj(file.file, f)
 
-    loader = PyPDFLoader(str(file_path))
-    pages = loader.load()
+
+def _file_sha256(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with file_path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _text_sha256(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def chunk_id(source_file: str, text: str) -> str:
+    """Chroma id of a chunk: SHA-256 of its source file name and whitespace-normalised text.
+
+    Ids are scoped to the source file, so two files containing the same text
+    own separate chunks and re-indexing or deleting one never touches the
+    other's. The embedding itself is still shared through the embedding cache.
+    """
+    return hashlib.sha256(f"{source_file}\0{' '.join(text.split())}".encode("utf-8")).hexdigest()
+
+
+def page_fingerprint(text: str) -> str:
+    """SHA-256 of a page's whitespace-normalised text, stored on each of its chunks."""
+    return _text_sha256(text)
+
+
+def index_pdf(
+    file_path: Path,
+    document_set_id: str,
+    source_file: str,
+    progress: Callable[[int, int], None] | None = None,
+) -> Dict[str, int]:
+    """Stream a PDF into a document set's collection, page by page.
+
+    Pages are read lazily and chunked as they arrive. Chunks are embedded in
+    batches of ``settings.ingest_embed_batch_size`` on a worker pool and each
+    batch is written to Chroma as soon as its embeddings are ready, so peak
+    memory is bounded by the number of in-flight batches, not the PDF size.
+
+    Chunks are stored under :func:`chunk_id`, so text this file already has
+    in the collection is skipped, and text embedded for any other file or
+    document set is served from the embedding cache. ``num_new_chunks``
+    counts chunks that had to be embedded; ``num_reused_chunks`` the rest.
+
+    Re-uploading ``source_file`` re-indexes incrementally: chunks the file
+    already has are kept (``num_unchanged_pages`` counts pages made only of
+    such chunks), new text is embedded, and chunks the new version no longer
+    produces are deleted. Every chunk the upload produces gets this version's
+    page number and hashes, wherever its page moved to.
+
+    ``file_sha256`` is set on the chunks only once the whole file is
+    indexed, so a byte-identical re-upload is skipped only when the previous
+    run completed; an interrupted run is finished by indexing again.
+
+    The document set's BM25 index is updated with the same additions and
+    deletions once the collection has been written.
+
+    ``progress`` is called with ``(pages_parsed, chunks_embedded)`` after every
+    page and every written batch.
+    """
+    collection = _get_collection(document_set_id)
+    file_sha256 = _file_sha256(file_path)
+
+    # What the previous version of this file left in the collection.
+    previous = collection.get(where={"source_file": source_file}, include=["metadatas"])
+    previous_metadata: Dict[str, Dict[str, Any]] = dict(zip(previous["ids"], previous["metadatas"]))
+
+    if previous_metadata and all(
+        meta.get("file_sha256") == file_sha256 for meta in previous_metadata.values()
+    ):
+        num_pages = len(PdfReader(str(file_path)).pages)
+        if progress is not None:
+            progress(num_pages, len(previous_metadata))
+        return {
+            "num_pages": num_pages,
+            "num_chunks": len(previous_metadata),
+            "num_new_chunks": 0,
+            "num_reused_chunks": len(previous_metadata),
+            "num_unchanged_pages": num_pages,
+            "num_deleted_chunks": 0,
+        }
 
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=800,
         chunk_overlap=150,
     )
-    chunks = splitter.split_documents(pages)
+    embeddings = get_embeddings()
+    max_in_flight = max(1, settings.ingest_embed_workers * 2)
+
+    num_pages = 0
+    num_chunks = 0
+    num_done = 0
+    num_new = 0
+    num_unchanged_pages = 0
+    # Final metadata of every chunk this version produces, keyed by chunk id.
+    final_metadata: Dict[str, Dict[str, Any]] = {}
+    batch: List[Tuple[str, Document]] = []
+    added: List[Tuple[str, str]] = []
+    in_flight: Deque[Tuple[List[Tuple[str, Document]], Future]] = deque()
+
+    def report() -> None:
+        if progress is not None:
+            progress(num_pages, num_done)
+
+    def write_oldest() -> None:
+        nonlocal num_done, num_new
+        items, future = in_flight.popleft()
+        vectors, fresh = future.result()
+        collection.upsert(
+            ids=[item_id for item_id, _ in items],
+            embeddings=vectors,
+            documents=[doc.page_content for _, doc in items],
+            metadatas=[doc.metadata for _, doc in items],
+        )
+        added.extend((item_id, doc.page_content) for item_id, doc in items)
+        num_done += len(items)
+        num_new += fresh
+        report()
+
+    with ThreadPoolExecutor(
+        max_workers=settings.ingest_embed_workers,
+        thread_name_prefix="ingest-embed",
+    ) as pool:
+
+        def submit(items: List[Tuple[str, Document]]) -> None:
+            future = pool.submit(
+                embeddings.embed_documents_reporting, [doc.page_content for _, doc in items]
+            )
+            in_flight.append((items, future))
+            while len(in_flight) >= max_in_flight:
+                write_oldest()
+
+        for page in PyPDFLoader(str(file_path)).lazy_load():
+            num_pages += 1
+            fingerprint = page_fingerprint(page.page_content)
+            chunks = splitter.split_documents([page])
+            page_ids = [chunk_id(source_file, chunk.page_content) for chunk in chunks]
+            if chunks and all(item_id in previous_metadata for item_id in page_ids):
+                num_unchanged_pages += 1
+
+            for item_id, chunk in zip(page_ids, chunks):
+                num_chunks += 1
+                if item_id in final_metadata:
+                    num_done += 1
+                    continue
+
+                meta = chunk.metadata or {}
+                meta.setdefault("source_file", source_file)
+                meta.setdefault("document_set_id", document_set_id)
+                meta["chunk_index"] = num_chunks - 1
+                meta["page_sha256"] = fingerprint
+                final_metadata[item_id] = {**meta, "file_sha256": file_sha256}
+
+                if item_id in previous_metadata:
+                    num_done += 1
+                    continue
+                chunk.metadata = meta
+                batch.append((item_id, chunk))
+                if len(batch) >= settings.ingest_embed_batch_size:
+                    submit(batch)
+                    batch = []
+            report()
+
+        if batch:
+            submit(batch)
+        while in_flight:
+            write_oldest()
 
-    for idx, doc in enumerate(chunks):
-        meta = doc.metadata or {}
-        meta.setdefault("source_file", file.filename)
-        meta.setdefault("document_set_id", document_set_id)
-        meta["chunk_index"] = idx
-        doc.metadata = meta
+    stale_ids = [item_id for item_id in previous_metadata if item_id not in final_metadata]
+    if stale_ids:
+        collection.delete(ids=stale_ids)
 
-    vectorstore = get_vectorstore(document_set_id)
-    vectorstore.add_documents(chunks)
-    vectorstore.persist()
+    # Kept chunks take this version's page numbers and hashes; new chunks get file_sha256,
+    # which marks the file as completely indexed.
+    changed = [
+        item_id for item_id, meta in final_metadata.items() if previous_metadata.get(item_id) != meta
+    ]
+    step = max(1, settings.ingest_embed_batch_size)
+    for start in range(0, len(changed), step):
+        ids = changed[start : start + step]
+        collection.update(ids=ids, metadatas=[final_metadata[item_id] for item_id in ids])
 
+    _update_lexical_index(document_set_id, added, stale_ids)
+    invalidate_retrieval_cache(document_set_id)
+    if previous_metadata:
+        logger.info(
+            "Re-indexed %s in %s: %d/%d pages unchanged, %d chunks deleted",
+            source_file, document_set_id, num_unchanged_pages, num_pages, len(stale_ids),
+        )
     return {
-        "document_set_id": document_set_id,
-        "num_pages": len(pages),
-        "num_chunks": len(chunks),
+        "num_pages": num_pages,
+        "num_chunks": num_chunks,
+        "num_new_chunks": num_new,
+        "num_reused_chunks": num_chunks - num_new,
+        "num_unchanged_pages": num_unchanged_pages,
+        "num_deleted_chunks": len(stale_ids),
     }
 
 
-def retrieve_passages(document_set_id: str, query: str, k: int = 6):
-    """Retrieve top-k passages for a query from the vector store."""
-    vectorstore = get_vectorstore(document_set_id)
-    return vectorstore.similarity_search(query, k=k)
+def delete_source_chunks(document_set_id: str, source_file: str) -> None:
+    """Remove every chunk that was indexed from ``source_file`` in a document set."""
+    collection = _get_collection(document_set_id)
+    ids = collection.get(where={"source_file": source_file}, include=[])["ids"]
+    if ids:
+        collection.delete(ids=ids)
+        _update_lexical_index(document_set_id, [], ids)
+    invalidate_retrieval_cache(document_set_id)
+
+
+async def store_upload(file: UploadFile, document_set_id: str) -> Path:
+    """Copy an uploaded PDF to its own ``uploads/<document_set_id>/<upload id>/`` and return its path.
+
+    Each upload is staged separately, so a second upload of the same file
+    name cannot overwrite one that is still queued or being indexed.
+    """
+    uploads_dir: Path = settings.uploads_dir / document_set_id / uuid.uuid4().hex
+    uploads_dir.mkdir(parents=True, exist_ok=True)
+
+    file_path = uploads_dir / file.filename
+    await asyncio.to_thread(_save_upload, file, file_path)
+    return file_path
+
+
+def discard_upload(file_path: Path) -> None:
+    """Delete an upload staged by :func:`store_upload` that will not be indexed."""
+    file_path.unlink(missing_ok=True)
+    try:
+        file_path.parent.rmdir()
+    except OSError:
+        pass
+
+
+def _ranked_search(document_set_id: str, query: str, k: int, hybrid: bool) -> List[Document]:
+    """Top-``k`` passages, with their chunk ids set, ranked by dense search alone or fused with BM25.
+
+    In hybrid mode the top candidates of both rankings are fused with
+    reciprocal rank fusion.
+    """
+    collection = _get_collection(document_set_id)
+    total = collection.count()
+    if total == 0:
+        return []
+    num_candidates = min(max(k, settings.retrieval_candidates), total) if hybrid else min(k, total)
+
+    dense = collection.query(
+        query_embeddings=[get_embeddings().embed_query(query)],
+        n_results=num_candidates,
+        include=["documents", "metadatas"],
+    )
+    docs: Dict[str, Document] = {
+        item_id: Document(id=item_id, page_content=text, metadata=meta or {})
+        for item_id, text, meta in zip(dense["ids"][0], dense["documents"][0], dense["metadatas"][0])
+    }
+    if not hybrid:
+        return list(docs.values())
+
+    lexical_ids = [item_id for item_id, _ in get_lexical_index(document_set_id).search(query, num_candidates)]
+    fused = reciprocal_rank_fusion([dense["ids"][0], lexical_ids], k=settings.retrieval_rrf_k)[:k]
+    missing = [item_id for item_id in fused if item_id not in docs]
+    if missing:
+        fetched = collection.get(ids=missing, include=["documents", "metadatas"])
+        for item_id, text, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+            docs[item_id] = Document(id=item_id, page_content=text, metadata=meta or {})
+    return [docs[item_id] for item_id in fused if item_id in docs]
+
+
+def retrieve_diverse_passages(
+    document_set_id: str,
+    query: str,
+    k: int = 6,
+    used_ids: Collection[str] = (),
+) -> List[Document]:
+    """Retrieve ``k`` passages by maximal marginal relevance, preferring unused ones.
+
+    Re-ranks the top ``settings.retrieval_candidates`` passages (hybrid or
+    dense, per ``settings.retrieval_mode``) so that each pick is relevant but
+    unlike the passages already picked. Chunks in ``used_ids`` (passages an
+    earlier attempt in the same run was given) are pushed down by
+    ``settings.retrieval_used_penalty``, so revisiting a topic yields fresh
+    context while unused chunks remain. Returned documents carry their chunk id.
+    """
+    num_candidates = max(k, settings.retrieval_candidates)
+    hybrid = settings.retrieval_mode == "hybrid"
+    pool = _cached_search(
+        document_set_id,
+        "pool-hybrid" if hybrid else "pool-dense",
+        query,
+        num_candidates,
+        lambda: _ranked_search(document_set_id, query, num_candidates, hybrid=hybrid),
+    )
+    if len(pool) <= k:
+        return pool
+
+    stored = _get_collection(document_set_id).get(ids=[doc.id for doc in pool], include=["embeddings"])
+    vectors = dict(zip(stored["ids"], stored["embeddings"]))
+    pool = [doc for doc in pool if doc.id in vectors]
+    if len(pool) <= k:
+        return pool
+
+    # Candidates arrive best first; relevance falls linearly with rank.
+    relevance = [1.0 - rank / len(pool) for rank in range(len(pool))]
+    penalty = [settings.retrieval_used_penalty if doc.id in used_ids else 0.0 for doc in pool]
+    chosen = mmr_select(
+        relevance,
+        np.asarray([vectors[doc.id] for doc in pool], dtype=np.float32),
+        k,
+        lambda_mult=settings.retrieval_mmr_lambda,
+        penalty=penalty,
+    )
+    return [pool[i] for i in chosen]
+
 
 def retrieve_passages_for_course(course_id: str, topic: str, k: int = 6):
     """Retrieves passages across all materials for a specific course."""
     vectorstore = get_vectorstore(course_id)
-    return vectorstore.similarity_search(
-        query=topic,
-        k=k,
-        filter={"course_id": course_id} 
+    return _cached_search(
+        course_id,
+        "course",
+        topic,
+        k,
+        lambda: vectorstore.similarity_search(
+            query=topic,
+            k=k,
+            filter={"course_id": course_id}
+        ),
     )
-
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, List, Optional
+from typing import Any, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -23,16 +23,44 @@ class PlanRequest(BaseModel):
     module_title: str
     audience: str
     duration_minutes: int = Field(..., gt=0)
+    bypass_cache: bool = Field(False, description="Regenerate even if a cached plan exists.")
+    course_id: Optional[str] = Field(
+        None,
+        description="Course (or lecturer) the plan is for; LLM slots are shared fairly between them.",
+    )
 
 
 class PlanResponse(BaseModel):
     lecture_plan: LecturePlan
+    cache: Literal["hit", "miss", "near"] = Field(
+        "miss",
+        description="Whether the plan was an exact cache hit, a similar cached plan, or freshly generated.",
+    )
+
+
+class UploadJobResponse(BaseModel):
+    job_id: str
+    document_set_id: str
+    status: str
 
 
-class UploadResponse(BaseModel):
+class UploadJobStatus(BaseModel):
+    job_id: str
     document_set_id: str
-    num_pages: int
-    num_chunks: int
+    filename: str
+    status: str = Field(..., description="queued, running, completed or failed.")
+    total_pages: Optional[int] = None
+    pages_parsed: int = 0
+    chunks_embedded: int = 0
+    chunks_new: Optional[int] = Field(None, description="Chunks that had to be embedded.")
+    chunks_reused: Optional[int] = Field(
+        None,
+        description="Chunks already indexed in this set or embedded for another set.",
+    )
+    pages_per_second: Optional[float] = None
+    chunks_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
 
 
 class AssessmentQuestion(BaseModel):
@@ -52,10 +80,25 @@ class AssessmentRequest(BaseModel):
     document_set_id: str
     num_questions: int = Field(5, gt=0, le=50)
     focus_topics: Optional[List[str]] = None
+    use_question_bank: bool = Field(
+        True,
+        description="Serve matching previously accepted questions and only generate the shortfall.",
+    )
 
 
 class AssessmentResponse(BaseModel):
     questions: List[AssessmentQuestion]
     num_generated: int
     num_rejected: int
+    num_from_bank: int = 0
+
+
+
+class PracticeRequest(BaseModel):
+    course_id: str
+    topic: str
+    num_questions: int = Field(5, gt=0, le=50)
+
 
+class PracticeResponse(BaseModel):
+    questions: List[dict[str, Any]]
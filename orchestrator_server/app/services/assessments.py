@@ -1,17 +1,40 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List
 
-from ..graph.assessment_graph import AssessmentState, build_assessment_graph
+from ..cache import SingleFlight
+from ..graph.assessment_graph import AssessmentState, _extract_topics, build_assessment_graph
+from ..llm.client import llm_client
+from ..llm.scheduler import llm_request
+from ..rag.vectorstore import existing_chunk_ids, get_embeddings
 from ..schemas import AssessmentQuestion, AssessmentRequest, AssessmentResponse
 from ..config import settings
+from .question_bank import QuestionBank
 
-_assessment_graph = build_assessment_graph()
+logger = logging.getLogger(__name__)
 
+_assessment_graph = build_assessment_graph(concurrency=settings.assessment_concurrency)
 
-async def generate_assessments(request: AssessmentRequest) -> AssessmentResponse:
-    """Run the assessment graph and return validated questions."""
-    
+_question_bank = QuestionBank(
+    settings.question_bank_db_path,
+    similarity_threshold=settings.question_bank_similarity_threshold,
+    duplicate_threshold=settings.assessment_duplicate_threshold,
+)
+_bank_outcomes: Dict[str, int] = {"served": 0, "generated": 0, "stored": 0}
+_assessment_flights: SingleFlight[str, AssessmentResponse] = SingleFlight()
+
+# Accepted without the critic having checked them; never banked.
+_UNVERIFIED_NOTES = {
+    "generator_timeout",
+    "generator_json_fallback",
+    "critic_timeout_accepted",
+    "critic_json_accepted",
+}
+
+
+def _initial_state(request: AssessmentRequest) -> AssessmentState:
     # Safely handle the optional lecture plan
     safe_lecture_plan = request.lecture_plan.model_dump() if request.lecture_plan else {}
 
@@ -24,19 +47,207 @@ async def generate_assessments(request: AssessmentRequest) -> AssessmentResponse
     
     if request.focus_topics:
         initial_state["focus_topics"] = list(request.focus_topics)
+    return initial_state
 
-    final_state = _assessment_graph.invoke(
-        initial_state,
-        config={"recursion_limit": 150},
+
+async def _draw_from_bank(
+    request: AssessmentRequest, initial_state: AssessmentState
+) -> List[Dict[str, Any]]:
+    """Banked questions for the request's topics whose passages are still indexed."""
+    if not request.use_question_bank:
+        return []
+    topics = _extract_topics(initial_state)
+    try:
+        topic_embeddings = await asyncio.to_thread(get_embeddings().embed_documents, topics)
+    except Exception as exc:
+        logger.warning("Question bank: could not embed topics, generating everything: %s", exc)
+        return []
+
+    entries = await asyncio.to_thread(
+        _question_bank.lookup, request.document_set_id, topic_embeddings, request.num_questions
     )
+    if not entries:
+        return []
+
+    # A re-upload may have removed the passages a banked question was based on.
+    passage_ids = {item_id for entry in entries for item_id in entry["passage_ids"]}
+    existing = await asyncio.to_thread(existing_chunk_ids, request.document_set_id, passage_ids)
+    stale = [entry["question"]["id"] for entry in entries if not set(entry["passage_ids"]) <= existing]
+    if stale:
+        logger.info("Question bank: dropping %d question(s) whose passages were removed", len(stale))
+        await asyncio.to_thread(_question_bank.remove, stale)
+    entries = [entry for entry in entries if set(entry["passage_ids"]) <= existing]
+
+    await asyncio.to_thread(_question_bank.mark_served, [entry["question"]["id"] for entry in entries])
+    for entry in entries:
+        entry["question"].setdefault("source_metadata", {})["question_bank"] = True
+    return entries
+
+
+def _seed_from_bank(initial_state: AssessmentState, entries: List[Dict[str, Any]]) -> None:
+    """Ask the graph only for the shortfall, and treat banked stems as already accepted."""
+    shortfall = int(initial_state["num_questions"]) - len(entries)
+    initial_state["num_questions"] = shortfall
+    initial_state["max_attempts"] = shortfall * settings.assessment_max_attempt_multiplier
+    initial_state["stem_vectors"] = [
+        {"stem": entry["question"].get("stem", ""), "embedding": entry["stem_embedding"]}
+        for entry in entries
+        if entry["stem_embedding"] is not None
+    ]
+
+
+def _bank_questions(
+    document_set_id: str,
+    questions: List[Dict[str, Any]],
+    stem_vectors: List[Dict[str, Any]],
+) -> int:
+    """Store verified new questions in the bank; returns how many were added."""
+    verified = [
+        q for q in questions
+        if (q.get("source_metadata") or {}).get("note") not in _UNVERIFIED_NOTES
+    ]
+    if not verified:
+        return 0
+
+    stems = {entry["stem"]: entry["embedding"] for entry in stem_vectors}
+    topics = [str((q.get("source_metadata") or {}).get("topic", "")) for q in verified]
+    topic_embeddings = get_embeddings().embed_documents(topics)
+
+    stored = 0
+    for question, topic, topic_embedding in zip(verified, topics, topic_embeddings):
+        metadata = question.get("source_metadata") or {}
+        stored += _question_bank.put(
+            document_set_id,
+            topic,
+            question,
+            list(metadata.get("passage_ids") or []),
+            topic_embedding,
+            stems.get(question.get("stem", "")),
+        )
+    return stored
+
+
+async def _store_new_questions(
+    document_set_id: str,
+    questions: List[Dict[str, Any]],
+    stem_vectors: List[Dict[str, Any]],
+) -> None:
+    try:
+        stored = await asyncio.to_thread(_bank_questions, document_set_id, questions, stem_vectors)
+    except Exception as exc:
+        logger.warning("Question bank: could not store new questions: %s", exc)
+        return
+    _bank_outcomes["stored"] += stored
+
+
+async def generate_assessments(request: AssessmentRequest) -> AssessmentResponse:
+    """Serve questions from the question bank and run the assessment graph for the shortfall.
+
+    Identical requests arriving while one is in flight share its response.
+    """
+    with llm_request("assessment", request.document_set_id):
+        return await _assessment_flights.do(request.model_dump_json(), lambda: _generate_assessments(request))
+
+
+async def _generate_assessments(request: AssessmentRequest) -> AssessmentResponse:
+    initial_state = _initial_state(request)
+    banked = await _draw_from_bank(request, initial_state)
+    _seed_from_bank(initial_state, banked)
+    _bank_outcomes["served"] += len(banked)
+
+    raw_questions: List[Dict[str, Any]] = [entry["question"] for entry in banked]
+    num_rejected = 0
+    if initial_state["num_questions"] > 0:
+        llm_client.scheduler.admit("assessment")
+        final_state = await _assessment_graph.ainvoke(
+            initial_state,
+            config={"recursion_limit": 150},
+        )
+        new_questions = list(final_state.get("questions") or [])
+        raw_questions.extend(new_questions)
+        num_rejected = int(final_state.get("num_rejected", 0))
+        _bank_outcomes["generated"] += len(new_questions)
+        await _store_new_questions(
+            request.document_set_id, new_questions, list(final_state.get("stem_vectors") or [])
+        )
 
-    raw_questions: List[Dict[str, Any]] = list(final_state.get("questions") or [])
     questions = [AssessmentQuestion.model_validate(q) for q in raw_questions]
-    num_rejected = int(final_state.get("num_rejected", 0))
 
     return AssessmentResponse(
         questions=questions,
         num_generated=len(questions),
         num_rejected=num_rejected,
+        num_from_bank=len(banked),
     )
 
+
+async def stream_assessments(request: AssessmentRequest) -> AsyncIterator[Dict[str, Any]]:
+    """Yield a ``question`` event per accepted question and a ``rejected`` event per rejection.
+
+    Questions served from the question bank come first. The rest are built on
+    the graph's node updates, so they arrive as the critic (or a batch round)
+    accepts them. A final ``done`` event carries the totals.
+    Cancelling the consumer (e.g. the client disconnecting) cancels the
+    running node, which aborts its in-flight LLM request; no further nodes run.
+    """
+    initial_state = _initial_state(request)
+    banked = await _draw_from_bank(request, initial_state)
+    _seed_from_bank(initial_state, banked)
+    _bank_outcomes["served"] += len(banked)
+    for entry in banked:
+        question = AssessmentQuestion.model_validate(entry["question"])
+        yield {"event": "question", "question": question.model_dump()}
+
+    num_sent = 0
+    num_rejected = 0
+    new_questions: List[Dict[str, Any]] = []
+    stem_vectors: List[Dict[str, Any]] = []
+    if initial_state["num_questions"] > 0:
+        with llm_request("assessment", request.document_set_id):
+            stream = _assessment_graph.astream(
+                initial_state,
+                config={"recursion_limit": 150},
+                stream_mode="updates",
+            )
+            try:
+                async for update in stream:
+                    for node_state in update.values():
+                        if not node_state:
+                            continue
+                        questions = node_state.get("questions") or []
+                        for raw_question in questions[num_sent:]:
+                            new_questions.append(raw_question)
+                            question = AssessmentQuestion.model_validate(raw_question)
+                            yield {"event": "question", "question": question.model_dump()}
+                        num_sent = max(num_sent, len(questions))
+                        stem_vectors = node_state.get("stem_vectors") or stem_vectors
+
+                        rejected = int(node_state.get("num_rejected", 0))
+                        if rejected > num_rejected:
+                            num_rejected = rejected
+                            yield {"event": "rejected", "num_rejected": num_rejected}
+            except asyncio.CancelledError:
+                logger.info("Assessments: stream cancelled after %d question(s)", len(banked) + num_sent)
+                raise
+            finally:
+                await stream.aclose()
+
+        _bank_outcomes["generated"] += len(new_questions)
+        await _store_new_questions(request.document_set_id, new_questions, stem_vectors)
+
+    yield {
+        "event": "done",
+        "num_generated": len(banked) + num_sent,
+        "num_rejected": num_rejected,
+        "num_from_bank": len(banked),
+    }
+
+
+def assessment_flight_stats() -> Dict[str, int]:
+    """In-flight, started and coalesced ``generate_assessments`` runs."""
+    return _assessment_flights.stats()
+
+
+def question_bank_stats() -> Dict[str, int]:
+    """Size of the question bank and how many questions were served from it vs generated."""
+    return {**_question_bank.stats(), **_bank_outcomes}
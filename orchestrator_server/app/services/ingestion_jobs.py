@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from pypdf import PdfReader
+
+from ..config import settings
+from ..rag.vectorstore import index_pdf
+
+logger = logging.getLogger(__name__)
+
+_PROGRESS_WRITE_INTERVAL_SECONDS = 0.5
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the ingestion queue has no room for another upload."""
+
+
+class IngestionJobStore:
+    """SQLite-backed record of ingestion jobs, so progress survives restarts."""
+
+    def __init__(self, db_path: Path) -> None:
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    document_set_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    total_pages INTEGER,
+                    pages_parsed INTEGER NOT NULL DEFAULT 0,
+                    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                    chunks_new INTEGER,
+                    chunks_reused INTEGER,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+
+    def create(self, document_set_id: str, filename: str, file_path: Path) -> Dict[str, Any]:
+        job_id = str(uuid.uuid4())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO ingestion_jobs (job_id, document_set_id, filename, file_path, status, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, document_set_id, filename, str(file_path), time.time()),
+            )
+        return self.get(job_id)  # type: ignore[return-value]
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE ingestion_jobs SET {assignments} WHERE job_id = ?",
+                (*fields.values(), job_id),
+            )
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def describe_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Add throughput and ETA figures to a stored job record."""
+    described = {
+        key: job[key]
+        for key in (
+            "job_id",
+            "document_set_id",
+            "filename",
+            "status",
+            "total_pages",
+            "pages_parsed",
+            "chunks_embedded",
+            "chunks_new",
+            "chunks_reused",
+            "error",
+        )
+    }
+    described.update(pages_per_second=None, chunks_per_second=None, eta_seconds=None)
+
+    started_at = job.get("started_at")
+    if started_at is None:
+        return described
+
+    elapsed = max((job.get("finished_at") or time.time()) - started_at, 1e-6)
+    pages_per_second = job["pages_parsed"] / elapsed
+    described["pages_per_second"] = round(pages_per_second, 2)
+    described["chunks_per_second"] = round(job["chunks_embedded"] / elapsed, 2)
+
+    if job["status"] == "completed":
+        described["eta_seconds"] = 0.0
+    elif job["status"] == "running" and job.get("total_pages") and pages_per_second > 0:
+        remaining = max(job["total_pages"] - job["pages_parsed"], 0)
+        described["eta_seconds"] = round(remaining / pages_per_second, 1)
+    return described
+
+
+class IngestionJobManager:
+    """Bounded queue of PDF ingestion jobs drained by a fixed pool of workers."""
+
+    def __init__(self, store: IngestionJobStore, num_workers: int, queue_size: int) -> None:
+        self.store = store
+        self.num_workers = num_workers
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self._tasks: List[asyncio.Task] = []
+        # One lock per (document_set_id, filename): index_pdf diffs against what the
+        # file already has in the collection, so two versions must not index at once.
+        self._source_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._source_locks_guard = threading.Lock()
+
+    async def start(self) -> None:
+        for _ in range(self.num_workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+        pending = self.store.unfinished()
+        if pending:
+            logger.info("Ingestion: resuming %d unfinished job(s)", len(pending))
+            self._tasks.append(asyncio.create_task(self._requeue([job["job_id"] for job in pending])))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def has_capacity(self) -> bool:
+        return not self._queue.full()
+
+    def submit(self, document_set_id: str, filename: str, file_path: Path) -> Dict[str, Any]:
+        """Record a job for an already-saved upload and queue it for indexing."""
+        if self._queue.full():
+            raise IngestionQueueFull("Too many uploads are being indexed; retry shortly.")
+        job = self.store.create(document_set_id, filename, file_path)
+        self._queue.put_nowait(job["job_id"])
+        return job
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        job = self.store.get(job_id)
+        return describe_job(job) if job is not None else None
+
+    async def _requeue(self, job_ids: List[str]) -> None:
+        for job_id in job_ids:
+            self.store.update(job_id, status="queued")
+            await self._queue.put(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await asyncio.to_thread(self._run, job_id)
+            except Exception:  # pragma: no cover - _run records its own failures
+                logger.exception("Ingestion: worker crashed on job %s", job_id)
+            finally:
+                self._queue.task_done()
+
+    def _source_lock(self, document_set_id: str, filename: str) -> threading.Lock:
+        with self._source_locks_guard:
+            return self._source_locks.setdefault((document_set_id, filename), threading.Lock())
+
+    def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None:
+            return
+        with self._source_lock(job["document_set_id"], job["filename"]):
+            self._index(job_id, job)
+
+    def _index(self, job_id: str, job: Dict[str, Any]) -> None:
+
+        # A run interrupted by a restart is simply indexed again: index_pdf keeps
+        # the chunks it already wrote and only marks the file complete at the end,
+        # so the previous version stays searchable until the new one replaces it.
+        file_path = Path(job["file_path"])
+        self.store.update(
+            job_id,
+            status="running",
+            started_at=time.time(),
+            pages_parsed=0,
+            chunks_embedded=0,
+            error=None,
+        )
+        last_write = 0.0
+
+        def on_progress(pages_parsed: int, chunks_embedded: int) -> None:
+            nonlocal last_write
+            now = time.monotonic()
+            if now - last_write >= _PROGRESS_WRITE_INTERVAL_SECONDS:
+                last_write = now
+                self.store.update(job_id, pages_parsed=pages_parsed, chunks_embedded=chunks_embedded)
+
+        try:
+            self.store.update(job_id, total_pages=len(PdfReader(str(file_path)).pages))
+            result = index_pdf(file_path, job["document_set_id"], job["filename"], progress=on_progress)
+        except Exception as exc:
+            logger.warning("Ingestion: job %s failed: %s", job_id, exc)
+            self.store.update(job_id, status="failed", error=str(exc), finished_at=time.time())
+            return
+
+        self.store.update(
+            job_id,
+            status="completed",
+            pages_parsed=result["num_pages"],
+            chunks_embedded=result["num_chunks"],
+            chunks_new=result["num_new_chunks"],
+            chunks_reused=result["num_reused_chunks"],
+            finished_at=time.time(),
+        )
+        logger.info(
+            "Ingestion: job %s indexed %d pages / %d chunks (%d new, %d reused)",
+            job_id, result["num_pages"], result["num_chunks"],
+            result["num_new_chunks"], result["num_reused_chunks"],
+        )
+
+
+ingestion_jobs = IngestionJobManager(
+    IngestionJobStore(settings.ingest_jobs_db_path),
+    num_workers=settings.ingest_job_workers,
+    queue_size=settings.ingest_queue_size,
+)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _normalise(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def plan_cache_key(module_title: str, audience: str, duration_minutes: int) -> str:
+    """Exact-match key: case- and whitespace-insensitive title and audience, plus duration."""
+    return f"{_normalise(module_title)}|{_normalise(audience)}|{int(duration_minutes)}"
+
+
+def plan_query_text(module_title: str, audience: str) -> str:
+    """Text embedded for similarity lookups: the normalised title and audience only.
+
+    Wrapping them in a sentence shared by every plan would pull unrelated
+    modules' embeddings together.
+    """
+    return f"{_normalise(module_title)}\n{_normalise(audience)}"
+
+
+class PlanCache:
+    """SQLite-backed lecture plan cache with exact and near (embedding) lookup.
+
+    Entries expire ``ttl_seconds`` after they were stored; beyond
+    ``max_entries`` the least recently used entries are dropped. Near matches
+    must have the same duration, since a plan's segment minutes only add up
+    for the duration it was generated for.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        ttl_seconds: float,
+        max_entries: int,
+        similarity_threshold: float,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS lecture_plans (
+                    cache_key TEXT PRIMARY KEY,
+                    duration_minutes INTEGER NOT NULL,
+                    embedding BLOB,
+                    plan_json TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS lecture_plans_duration ON lecture_plans (duration_minutes)"
+            )
+
+    def _expire(self, now: float) -> None:
+        self._conn.execute(
+            "DELETE FROM lecture_plans WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+
+    def _touch(self, cache_key: str, now: float) -> None:
+        self._conn.execute(
+            "UPDATE lecture_plans SET last_used_at = ? WHERE cache_key = ?", (now, cache_key)
+        )
+
+    def get_exact(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock, self._conn:
+            self._expire(now)
+            row = self._conn.execute(
+                "SELECT plan_json FROM lecture_plans WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(cache_key, now)
+        return json.loads(row["plan_json"])
+
+    def get_near(
+        self, duration_minutes: int, embedding: List[float]
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Most similar cached plan of the same duration above the threshold, with its score."""
+        query = np.asarray(embedding, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0.0:
+            return None
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._expire(now)
+            rows = self._conn.execute(
+                "SELECT cache_key, embedding, plan_json FROM lecture_plans "
+                "WHERE duration_minutes = ? AND embedding IS NOT NULL",
+                (int(duration_minutes),),
+            ).fetchall()
+
+            best: Optional[sqlite3.Row] = None
+            best_score = self.similarity_threshold
+            for row in rows:
+                vector = np.frombuffer(row["embedding"], dtype=np.float32)
+                if vector.shape != query.shape:
+                    continue
+                norm = float(np.linalg.norm(vector))
+                if norm == 0.0:
+                    continue
+                score = float(vector @ query) / (norm * query_norm)
+                if score >= best_score:
+                    best, best_score = row, score
+
+            if best is None:
+                return None
+            self._touch(best["cache_key"], now)
+        return json.loads(best["plan_json"]), best_score
+
+    def put(
+        self,
+        cache_key: str,
+        duration_minutes: int,
+        plan: Dict[str, Any],
+        embedding: Optional[List[float]],
+    ) -> None:
+        now = time.time()
+        blob = np.asarray(embedding, dtype=np.float32).tobytes() if embedding is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lecture_plans "
+                "(cache_key, duration_minutes, embedding, plan_json, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, int(duration_minutes), blob, json.dumps(plan), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM lecture_plans WHERE cache_key IN ("
+                "SELECT cache_key FROM lecture_plans ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM lecture_plans").fetchone()
+        return {"size": size, "maxsize": self.max_entries}
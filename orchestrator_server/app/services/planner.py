@@ -1,10 +1,44 @@
 from __future__ import annotations
 
-from ..graph.planner_graph import PlannerState, build_planner_graph
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+from ..cache import SingleFlight
+from ..config import settings
+from ..graph.planner_graph import (
+    PlannerState,
+    _accept_plan,
+    _build_lecture_plan,
+    _build_planner_prompt,
+    _build_segment,
+    _validate_lecture_plan,
+    build_planner_graph,
+)
+from ..llm.client import llm_client
+from ..llm.json_extract import JSONObjectStream
+from ..llm.pool import get_chat_model
+from ..llm.scheduler import llm_request
+from ..rag.vectorstore import get_embeddings
 from ..schemas import LecturePlan
+from .plan_cache import PlanCache, plan_cache_key, plan_query_text
+
+logger = logging.getLogger(__name__)
 
 _planner_graph = build_planner_graph()
 
+_plan_cache = PlanCache(
+    settings.plan_cache_db_path,
+    ttl_seconds=settings.plan_cache_ttl_seconds,
+    max_entries=settings.plan_cache_max_entries,
+    similarity_threshold=settings.plan_cache_similarity_threshold,
+)
+_cache_outcomes: Dict[str, int] = {"hit": 0, "near": 0, "miss": 0}
+
+CacheStatus = Literal["hit", "miss", "near"]
+
+_plan_flights: SingleFlight[Tuple[str, bool], Tuple[LecturePlan, CacheStatus]] = SingleFlight()
+
 
 async def generate_lecture_plan(
     module_title: str,
@@ -17,7 +51,7 @@ async def generate_lecture_plan(
         "audience": audience,
         "duration_minutes": int(duration_minutes),
     }
-    result_state = _planner_graph.invoke(
+    result_state = await _planner_graph.ainvoke(
         initial_state,
         config={"recursion_limit": 25},
     )
@@ -33,3 +67,160 @@ async def generate_lecture_plan(
 
     return LecturePlan.model_validate(lecture_plan_data)
 
+
+
+async def _embed_plan_query(module_title: str, audience: str) -> List[float] | None:
+    try:
+        return await asyncio.to_thread(
+            get_embeddings().embed_query, plan_query_text(module_title, audience)
+        )
+    except Exception as exc:
+        logger.warning("Plan cache: could not embed request, skipping near lookup: %s", exc)
+        return None
+
+
+async def _lookup_cached_plan(
+    cache_key: str,
+    module_title: str,
+    audience: str,
+    duration_minutes: int,
+    bypass_cache: bool,
+) -> Tuple[Optional[LecturePlan], CacheStatus, Optional[List[float]]]:
+    """Exact then near cache lookup; also returns the request embedding for storing."""
+    if not bypass_cache:
+        cached = await asyncio.to_thread(_plan_cache.get_exact, cache_key)
+        if cached is not None:
+            _cache_outcomes["hit"] += 1
+            return LecturePlan.model_validate(cached), "hit", None
+
+    embedding = await _embed_plan_query(module_title, audience)
+    if not bypass_cache and embedding is not None:
+        near = await asyncio.to_thread(_plan_cache.get_near, duration_minutes, embedding)
+        if near is not None:
+            plan, score = near
+            logger.info("Plan cache: near hit for '%s' (similarity %.3f)", module_title, score)
+            _cache_outcomes["near"] += 1
+            plan = {**plan, "module_title": module_title, "audience": audience}
+            return LecturePlan.model_validate(plan), "near", embedding
+
+    _cache_outcomes["miss"] += 1
+    return None, "miss", embedding
+
+
+async def _store_plan(
+    cache_key: str,
+    duration_minutes: int,
+    lecture_plan: LecturePlan,
+    embedding: Optional[List[float]],
+) -> None:
+    plan_data = lecture_plan.model_dump()
+    is_valid, _ = _validate_lecture_plan(plan_data, duration_minutes)
+    if lecture_plan.segments and is_valid:
+        await asyncio.to_thread(_plan_cache.put, cache_key, duration_minutes, plan_data, embedding)
+
+
+async def get_lecture_plan(
+    module_title: str,
+    audience: str,
+    duration_minutes: int,
+    bypass_cache: bool = False,
+    tenant: str | None = None,
+) -> Tuple[LecturePlan, CacheStatus]:
+    """Serve a lecture plan from the plan cache, generating it on a miss.
+
+    Looks for an exact match first, then for a plan of the same duration whose
+    title/audience embedding is similar enough. ``bypass_cache`` forces
+    regeneration; the fresh plan still replaces the cached one. Identical
+    requests arriving while one is in flight share its result. LLM calls are
+    queued under ``tenant`` (the course or lecturer asking), so one tenant's
+    plans cannot crowd out another's.
+    """
+    duration_minutes = int(duration_minutes)
+    cache_key = plan_cache_key(module_title, audience, duration_minutes)
+
+    async def lookup_or_generate() -> Tuple[LecturePlan, CacheStatus]:
+        cached, status, embedding = await _lookup_cached_plan(
+            cache_key, module_title, audience, duration_minutes, bypass_cache
+        )
+        if cached is not None:
+            return cached, status
+
+        llm_client.scheduler.admit("plan")
+        lecture_plan = await generate_lecture_plan(module_title, audience, duration_minutes)
+        await _store_plan(cache_key, duration_minutes, lecture_plan, embedding)
+        return lecture_plan, "miss"
+
+    with llm_request("plan", tenant):
+        return await _plan_flights.do((cache_key, bypass_cache), lookup_or_generate)
+
+
+async def stream_lecture_plan(
+    module_title: str,
+    audience: str,
+    duration_minutes: int,
+    bypass_cache: bool = False,
+    tenant: str | None = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield ``segment`` events as the model writes them, then a final ``plan`` event.
+
+    Segments are emitted as soon as their JSON object closes in the token
+    stream. The final plan is validated (and its durations repaired) like
+    the non-streaming path, so it is authoritative: its durations may differ
+    from the segments streamed before it. If the streamed output cannot be
+    used, the regular planner graph is run and its plan is sent instead.
+    """
+    duration_minutes = int(duration_minutes)
+    cache_key = plan_cache_key(module_title, audience, duration_minutes)
+
+    cached, status, embedding = await _lookup_cached_plan(
+        cache_key, module_title, audience, duration_minutes, bypass_cache
+    )
+    if cached is not None:
+        for segment in cached.segments:
+            yield {"event": "segment", "segment": segment.model_dump()}
+        yield {"event": "plan", "lecture_plan": cached.model_dump(), "cache": status}
+        return
+
+    state: PlannerState = {
+        "module_title": module_title,
+        "audience": audience,
+        "duration_minutes": duration_minutes,
+    }
+    with llm_request("plan", tenant):
+        parser = JSONObjectStream(item_key="segments")
+        num_streamed = 0
+        try:
+            async for chunk in llm_client.astream(
+                get_chat_model(temperature=0.2),
+                _build_planner_prompt(state),
+                settings.planner_llm_timeout_seconds,
+            ):
+                for raw_segment in parser.feed(chunk):
+                    try:
+                        segment = _build_segment(raw_segment, num_streamed)
+                    except (TypeError, ValueError):
+                        continue
+                    num_streamed += 1
+                    yield {"event": "segment", "segment": segment.model_dump()}
+        except asyncio.TimeoutError:
+            logger.warning("Planner stream: timed out after %d segment(s)", num_streamed)
+        except Exception as exc:
+            logger.warning("Planner stream: LLM stream failed after %d segment(s): %s", num_streamed, exc)
+
+        plan_dict = parser.finish()
+        accepted = _accept_plan(plan_dict, duration_minutes) if plan_dict is not None else None
+        if accepted is not None:
+            lecture_plan = LecturePlan.model_validate(
+                _build_lecture_plan(accepted, module_title, audience, duration_minutes)
+            )
+        else:
+            logger.info("Planner stream: streamed plan unusable; falling back to the planner graph")
+            lecture_plan = await generate_lecture_plan(module_title, audience, duration_minutes)
+
+    await _store_plan(cache_key, duration_minutes, lecture_plan, embedding)
+    yield {"event": "plan", "lecture_plan": lecture_plan.model_dump(), "cache": "miss"}
+
+
+def plan_cache_stats() -> Dict[str, int]:
+    """Size and hit/near/miss counters of the lecture plan cache, plus coalesced requests."""
+    return {**_plan_cache.stats(), **_cache_outcomes, "coalesced": _plan_flights.coalesced}
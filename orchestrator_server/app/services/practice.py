@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+from ..cache import SingleFlight
+from ..graph.student_quiz_graph import StudentQuizState, build_student_quiz_graph
+from ..llm.client import llm_client
+from ..llm.scheduler import llm_request
+from ..schemas import PracticeRequest, PracticeResponse
+
+_quiz_graph = build_student_quiz_graph()
+
+_practice_flights: SingleFlight[Tuple[str, str, int], List[Dict[str, Any]]] = SingleFlight()
+
+
+def _topic_key(topic: str) -> str:
+    return " ".join(topic.casefold().split())
+
+
+async def generate_practice_questions(request: PracticeRequest) -> PracticeResponse:
+    """Run the student quiz graph as a ``practice`` class LLM request for the course.
+
+    Practice quizzes are scheduled ahead of plans and bulk assessments on the
+    shared model. Identical requests arriving while one is in flight share
+    its questions.
+    """
+
+    async def run() -> List[Dict[str, Any]]:
+        llm_client.scheduler.admit("practice")
+        initial_state: StudentQuizState = {
+            "course_id": request.course_id,
+            "student_topic": request.topic,
+            "num_questions": request.num_questions,
+            "question_count": 0,
+            "questions": [],
+            "step_count": 0,
+        }
+        final_state = await _quiz_graph.ainvoke(initial_state)
+        return list(final_state.get("questions") or [])
+
+    key = (request.course_id, _topic_key(request.topic), request.num_questions)
+    with llm_request("practice", request.course_id):
+        questions = await _practice_flights.do(key, run)
+    return PracticeResponse(questions=list(questions))
+
+
+def practice_flight_stats() -> Dict[str, int]:
+    """In-flight, started and coalesced practice quiz runs."""
+    return _practice_flights.stats()
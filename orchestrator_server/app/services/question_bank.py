@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def _unit_rows(vectors: List[List[float]]) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class QuestionBank:
+    """SQLite-backed store of accepted assessment questions, per document set.
+
+    Each question keeps the topic it was generated for, the chunk ids of its
+    supporting passages, and embeddings of its topic and stem. Lookups match
+    requested topics against stored topic embeddings; stems are used to keep
+    near-duplicate questions out of the bank and out of a single response.
+    """
+
+    def __init__(self, db_path: Path, similarity_threshold: float, duplicate_threshold: float) -> None:
+        self.similarity_threshold = similarity_threshold
+        self.duplicate_threshold = duplicate_threshold
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS question_bank (
+                    question_id TEXT PRIMARY KEY,
+                    document_set_id TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    passage_ids TEXT NOT NULL,
+                    topic_embedding BLOB NOT NULL,
+                    stem_embedding BLOB,
+                    question_json TEXT NOT NULL,
+                    served_count INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS question_bank_document_set ON question_bank (document_set_id)"
+            )
+
+    def _rows(self, document_set_id: str) -> List[sqlite3.Row]:
+        return self._conn.execute(
+            "SELECT * FROM question_bank WHERE document_set_id = ?", (document_set_id,)
+        ).fetchall()
+
+    def put(
+        self,
+        document_set_id: str,
+        topic: str,
+        question: Dict[str, Any],
+        passage_ids: List[str],
+        topic_embedding: List[float],
+        stem_embedding: Optional[List[float]],
+    ) -> bool:
+        """Store a question unless the bank already has a near-duplicate stem for the set."""
+        stem_blob = np.asarray(stem_embedding, dtype=np.float32).tobytes() if stem_embedding is not None else None
+        with self._lock, self._conn:
+            if stem_embedding is not None:
+                stems = [
+                    np.frombuffer(row["stem_embedding"], dtype=np.float32)
+                    for row in self._rows(document_set_id)
+                    if row["stem_embedding"] is not None
+                ]
+                stems = [vector for vector in stems if vector.shape[0] == len(stem_embedding)]
+                if stems:
+                    scores = _unit_rows(stems) @ _unit_rows([stem_embedding])[0]
+                    if float(scores.max()) >= self.duplicate_threshold:
+                        return False
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO question_bank "
+                "(question_id, document_set_id, topic, passage_ids, topic_embedding, stem_embedding, "
+                "question_json, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(question["id"]),
+                    document_set_id,
+                    topic,
+                    json.dumps(passage_ids),
+                    np.asarray(topic_embedding, dtype=np.float32).tobytes(),
+                    stem_blob,
+                    json.dumps(question),
+                    time.time(),
+                ),
+            )
+        return True
+
+    def lookup(
+        self,
+        document_set_id: str,
+        topic_embeddings: List[List[float]],
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        """Up to ``limit`` banked questions whose topic matches a requested topic.
+
+        Matches are spread round-robin over the requested topics, least-served
+        first, and skip stems that near-duplicate one already picked. Returns
+        entries with ``question``, ``passage_ids`` and ``stem_embedding``; the
+        caller marks the ones it actually serves with :meth:`mark_served`.
+        """
+        if limit <= 0 or not topic_embeddings:
+            return []
+        with self._lock:
+            rows = self._rows(document_set_id)
+        dim = len(topic_embeddings[0])
+        rows = [row for row in rows if len(row["topic_embedding"]) == dim * 4]
+        if not rows:
+            return []
+
+        stored = _unit_rows([np.frombuffer(row["topic_embedding"], dtype=np.float32) for row in rows])
+        scores = stored @ _unit_rows(topic_embeddings).T
+        best_topic = scores.argmax(axis=1)
+        best_score = scores.max(axis=1)
+
+        by_topic: Dict[int, List[int]] = {}
+        for i in np.argsort(-best_score):
+            if best_score[i] < self.similarity_threshold:
+                break
+            by_topic.setdefault(int(best_topic[i]), []).append(int(i))
+        for candidates in by_topic.values():
+            candidates.sort(key=lambda i: (rows[i]["served_count"], -best_score[i]))
+
+        picked: List[Dict[str, Any]] = []
+        picked_stems: List[np.ndarray] = []
+        queues = [by_topic[t] for t in sorted(by_topic)]
+        while queues and len(picked) < limit:
+            for queue in list(queues):
+                if not queue:
+                    queues.remove(queue)
+                    continue
+                row = rows[queue.pop(0)]
+                stem = (
+                    np.frombuffer(row["stem_embedding"], dtype=np.float32)
+                    if row["stem_embedding"] is not None
+                    else None
+                )
+                if stem is not None and picked_stems and stem.shape == picked_stems[0].shape:
+                    if float((_unit_rows(picked_stems) @ _unit_rows([stem])[0]).max()) >= self.duplicate_threshold:
+                        continue
+                picked.append(
+                    {
+                        "question": json.loads(row["question_json"]),
+                        "passage_ids": json.loads(row["passage_ids"]),
+                        "stem_embedding": stem.tolist() if stem is not None else None,
+                    }
+                )
+                if stem is not None:
+                    picked_stems.append(stem)
+                if len(picked) >= limit:
+                    break
+        return picked
+
+    def mark_served(self, question_ids: List[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE question_bank SET served_count = served_count + 1 WHERE question_id = ?",
+                [(question_id,) for question_id in question_ids],
+            )
+
+    def remove(self, question_ids: List[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM question_bank WHERE question_id = ?",
+                [(question_id,) for question_id in question_ids],
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM question_bank").fetchone()
+        return {"size": size}
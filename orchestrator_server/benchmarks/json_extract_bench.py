@@ -0,0 +1,211 @@
+"""Micro-benchmark: shared JSON extractor vs. the old slice-and-retry extractors.
+
+Run from ``orchestrator_server``::
+
+    python -m benchmarks.json_extract_bench
+    python -m benchmarks.json_extract_bench --corpus captured.jsonl
+
+``--corpus`` takes captured model outputs, one JSON object per line with the
+raw text under ``"content"``. Without it a built-in corpus is used that mimics
+the shapes Gemma produces for the planner, generator and critic prompts
+(bare JSON, fenced JSON, prose before/after, escaped quotes, truncated output).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import timeit
+from pathlib import Path
+from typing import Any, Callable, List
+
+from app.llm.json_extract import JSONObjectStream, extract_json_object
+
+
+# Verbatim copies of the two extractors the graphs used before app/llm/json_extract.py.
+def legacy_planner_extract(content: str) -> dict[str, Any] | None:
+    """
+    Try to robustly extract a JSON object from LLM output.
+
+    Handles cases where the model wraps JSON in prose or markdown fences.
+    """
+    content = content.strip()
+
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+
+    if content.startswith("```"):
+
+        parts = content.split("```")
+        if len(parts) >= 3:
+            inner = "```".join(parts[1:-1]).strip()
+            try:
+                return json.loads(inner)
+            except json.JSONDecodeError:
+                content = inner
+    start = content.find("{")
+    end = content.rfind("}")
+    if start != -1 and end != -1 and end > start:
+        candidate = content[start : end + 1]
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            return None
+
+    return None
+
+
+def legacy_assessment_extract(content: str) -> dict[str, Any] | None:
+    """
+    Robustly extract a JSON object from LLM output.
+
+    Handles markdown fences, prose around JSON, etc.
+    """
+    content = content.strip()
+
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+
+    if content.startswith("```"):
+        parts = content.split("```")
+        if len(parts) >= 3:
+            inner = parts[1]
+            if inner.startswith("json"):
+                inner = inner[4:]
+            inner = inner.strip()
+            try:
+                return json.loads(inner)
+            except json.JSONDecodeError:
+                content = inner
+
+    start = content.find("{")
+    end = content.rfind("}")
+    if start != -1 and end != -1 and end > start:
+        candidate = content[start : end + 1]
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            return None
+
+    return None
+
+
+def _plan(rng: random.Random) -> dict[str, Any]:
+    return {
+        "module_title": "Fundamentals of Object-Oriented Programming",
+        "audience": "First-year undergraduates",
+        "duration_minutes": 120,
+        "segments": [
+            {
+                "sequence_index": i + 1,
+                "title": f"Segment {i + 1}: {rng.choice(['Classes', 'Objects', 'Inheritance', 'Polymorphism'])}",
+                "description": "Students explore the \"why\" behind the concept with a worked example {code}.",
+                "duration_minutes": rng.randint(10, 30),
+                "learning_objectives": [f"Explain idea {j}" for j in range(rng.randint(2, 4))],
+            }
+            for i in range(rng.randint(4, 7))
+        ],
+    }
+
+
+def _question(rng: random.Random) -> dict[str, Any]:
+    return {
+        "id": "q1",
+        "stem": f"Which statement about encapsulation is correct? ({rng.randint(1, 99)})",
+        "options": ["A. Hides state", "B. Exposes fields", "C. Removes methods", "D. None"],
+        "correct_option_index": rng.randint(0, 3),
+        "explanation": "The passage states that encapsulation hides internal state.",
+        "source_metadata": {},
+    }
+
+
+def _verdict(rng: random.Random) -> dict[str, Any]:
+    return {"verdict": rng.choice(["accept", "reject"]), "reason": "The answer is supported by page 3."}
+
+
+def builtin_corpus(size: int = 300, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    wrappers: List[Callable[[str], str]] = [
+        lambda body: body,
+        lambda body: f"```json\n{body}\n```",
+        lambda body: f"Here is the lecture plan you asked for:\n\n```json\n{body}\n```\n\nLet me know if you need changes.",
+        lambda body: f"Sure! {body}",
+        lambda body: f"{body}\n\nNote: durations add up to the requested total.",
+        lambda body: body[: len(body) * 2 // 3],  # truncated by a timeout
+    ]
+    makers = [_plan, _question, _verdict]
+    corpus = []
+    for _ in range(size):
+        body = json.dumps(rng.choice(makers)(rng), indent=rng.choice([None, 2]))
+        corpus.append(rng.choice(wrappers)(body))
+    return corpus
+
+
+def load_corpus(path: Path) -> List[str]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line)["content"] for line in f if line.strip()]
+
+
+def _per_call_us(func: Callable[[str], Any], corpus: List[str], repeat: int) -> float:
+    timer = timeit.Timer(lambda: [func(text) for text in corpus])
+    best = min(timer.repeat(repeat=repeat, number=1))
+    return best / len(corpus) * 1e6
+
+
+def _stream_naive(text: str, chunk: int = 4) -> Any:
+    """Re-parse the whole buffer after every chunk: what streaming costs without a scanner."""
+    buffer = ""
+    result = None
+    for start in range(0, len(text), chunk):
+        buffer += text[start : start + chunk]
+        result = legacy_planner_extract(buffer)
+    return result
+
+
+def _stream_incremental(text: str, chunk: int = 4) -> Any:
+    stream = JSONObjectStream(item_key="segments")
+    for start in range(0, len(text), chunk):
+        stream.feed(text[start : start + chunk])
+    return stream.finish()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, help="JSONL file of captured outputs ({'content': ...})")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else builtin_corpus()
+    source = str(args.corpus) if args.corpus else "built-in synthetic corpus"
+    print(f"{len(corpus)} outputs ({source}), mean {sum(map(len, corpus)) // len(corpus)} chars")
+
+    extractors = [
+        ("legacy planner", legacy_planner_extract),
+        ("legacy assessment", legacy_assessment_extract),
+        ("shared", extract_json_object),
+    ]
+    shared = [extract_json_object(text) for text in corpus]
+    print(f"shared: parsed {sum(result is not None for result in shared)}")
+    for name, func in extractors[:-1]:
+        results = [func(text) for text in corpus]
+        parsed = sum(result is not None for result in results)
+        agree = sum(a == b for a, b in zip(results, shared))
+        print(f"{name}: parsed {parsed}, same result as shared {agree}/{len(corpus)}")
+
+    rows = [
+        (f"whole output, {name}", _per_call_us(func, corpus, args.repeat)) for name, func in extractors
+    ] + [
+        ("streamed 4-char chunks, re-parse", _per_call_us(_stream_naive, corpus, args.repeat)),
+        ("streamed 4-char chunks, incremental", _per_call_us(_stream_incremental, corpus, args.repeat)),
+    ]
+    for label, micros in rows:
+        print(f"  {label:<38} {micros:10.1f} us/output")
+
+
+if __name__ == "__main__":
+    main()
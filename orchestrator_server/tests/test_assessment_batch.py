@@ -0,0 +1,232 @@
+import asyncio
+
+from langchain_core.documents import Document
+
+from app.graph import assessment_graph
+from app.graph.assessment_graph import batch_node, dedupe_node
+
+
+_OPTIONS = ["A. One", "B. Two", "C. Three", "D. Four"]
+
+
+async def _fake_generator(state):
+    topic = state["topics"][state["topic_index"]]
+    state["current_topic"] = topic
+    state["candidate_question"] = {
+        "id": topic,
+        "stem": f"What is {topic.split('-')[0]}?",
+        "options": _OPTIONS,
+        "correct_option_index": 0,
+    }
+    return state
+
+
+async def _fake_critic(state):
+    state["last_verdict"] = "accept"
+    return state
+
+
+_CONCEPTS = ["encapsulation", "polymorphism", "classes", "objects", "same", "inheritance"]
+
+
+def _fake_embed(texts):
+    # One axis per concept, so paraphrases about the same concept coincide.
+    return [[float(concept in text.lower()) for concept in _CONCEPTS] for text in texts]
+
+
+def _patch_nodes(monkeypatch, generator=_fake_generator):
+    monkeypatch.setattr(assessment_graph, "generator_node", generator)
+    monkeypatch.setattr(assessment_graph, "critic_node", _fake_critic)
+    monkeypatch.setattr(assessment_graph, "embed_transient", _fake_embed)
+
+
+def test_batch_node_drops_duplicate_stems_and_counts_them(monkeypatch):
+    _patch_nodes(monkeypatch)
+    state = {
+        "topics": ["Encapsulation-1", "Encapsulation-2", "Polymorphism"],
+        "num_questions": 3,
+        "max_attempts": 12,
+    }
+
+    state = asyncio.run(batch_node(state, concurrency=4))
+
+    assert [q["id"] for q in state["questions"]] == ["Encapsulation-1", "Polymorphism"]
+    assert state["num_rejected"] == 1
+    assert state["step_count"] == 3
+    assert state["route_decision"] == "more"
+    assert "duplicates" in state["topic_feedback"]["Encapsulation-2"]
+
+
+def test_batch_node_respects_max_attempts(monkeypatch):
+    _patch_nodes(monkeypatch)
+    state = {
+        "topics": ["Same-1", "Same-2"],
+        "num_questions": 5,
+        "max_attempts": 3,
+        "step_count": 2,
+    }
+
+    state = asyncio.run(batch_node(state, concurrency=4))
+
+    assert state["step_count"] == 3
+    assert state["route_decision"] == "done"
+
+
+def test_batch_node_merges_passages_used_by_each_slot(monkeypatch):
+    async def generator(state):
+        state = await _fake_generator(state)
+        state["used_passage_ids"] = list(state.get("used_passage_ids") or []) + [state["current_topic"]]
+        return state
+
+    _patch_nodes(monkeypatch, generator)
+    state = {
+        "topics": ["Classes", "Objects"],
+        "num_questions": 2,
+        "max_attempts": 8,
+        "used_passage_ids": ["earlier"],
+    }
+
+    state = asyncio.run(batch_node(state, concurrency=2))
+
+    assert state["used_passage_ids"] == ["earlier", "Classes", "Objects"]
+
+
+def test_batch_node_rejects_paraphrases_within_a_round(monkeypatch):
+    async def generator(state):
+        topic = state["topics"][state["topic_index"]]
+        state["current_topic"] = topic
+        stem = "Define polymorphism." if topic == "A" else "What does polymorphism mean?"
+        state["candidate_question"] = {"id": topic, "stem": stem, "options": _OPTIONS, "correct_option_index": 0}
+        return state
+
+    _patch_nodes(monkeypatch, generator)
+    state = {"topics": ["A", "B"], "num_questions": 2, "max_attempts": 8}
+
+    state = asyncio.run(batch_node(state, concurrency=2))
+
+    assert [q["id"] for q in state["questions"]] == ["A"]
+    assert state["num_rejected"] == 1
+    assert [entry["stem"] for entry in state["stem_vectors"]] == ["Define polymorphism."]
+
+
+def test_dedupe_node_rejects_near_duplicates_before_the_critic(monkeypatch):
+    monkeypatch.setattr(assessment_graph, "embed_transient", _fake_embed)
+    accepted = {"stem": "What is encapsulation?", "embedding": _fake_embed(["encapsulation"])[0]}
+
+    duplicate = asyncio.run(
+        dedupe_node(
+            {
+                "candidate_question": {"stem": "Which statement defines Encapsulation?"},
+                "stem_vectors": [accepted],
+            }
+        )
+    )
+    fresh = asyncio.run(
+        dedupe_node(
+            {
+                "candidate_question": {"stem": "What is inheritance?"},
+                "stem_vectors": [accepted],
+            }
+        )
+    )
+
+    assert duplicate["candidate_duplicate"] is True
+    assert duplicate["last_verdict"] == "reject"
+    assert duplicate["num_rejected"] == 1
+    assert "What is encapsulation?" in duplicate["critic_feedback"]
+    assert assessment_graph.decide_after_dedupe(duplicate) == "route"
+    assert fresh["candidate_duplicate"] is False
+    assert fresh["candidate_embedding"] is not None
+    assert assessment_graph.decide_after_dedupe(fresh) == "critic"
+
+
+def test_batch_node_counts_precheck_rejections_without_calling_the_critic(monkeypatch):
+    critic_calls = []
+
+    async def generator(state):
+        state = await _fake_generator(state)
+        state["candidate_question"]["options"] = ["A. One", "B. One", "C. Two", "D. Three"]
+        return state
+
+    async def critic(state):
+        critic_calls.append(state["current_topic"])
+        return await _fake_critic(state)
+
+    _patch_nodes(monkeypatch, generator)
+    monkeypatch.setattr(assessment_graph, "critic_node", critic)
+    state = {"topics": ["Classes"], "num_questions": 1, "max_attempts": 4}
+
+    state = asyncio.run(batch_node(state, concurrency=2))
+
+    assert state["questions"] == []
+    assert state["num_rejected"] == 1
+    assert critic_calls == []
+    assert "repeat" in state["topic_feedback"]["Classes"]
+
+
+def test_dedupe_node_still_catches_exact_repeats_without_embeddings(monkeypatch):
+    def unavailable(texts):
+        raise ConnectionError("embedding model is down")
+
+    monkeypatch.setattr(assessment_graph, "embed_transient", unavailable)
+    accepted = [{"id": "q1", "stem": "What is encapsulation?"}]
+
+    repeat = asyncio.run(
+        dedupe_node({"candidate_question": {"stem": "what is  Encapsulation"}, "questions": accepted})
+    )
+    fresh = asyncio.run(
+        dedupe_node({"candidate_question": {"stem": "What is inheritance?"}, "questions": accepted})
+    )
+
+    assert repeat["candidate_duplicate"] is True
+    assert "What is encapsulation?" in repeat["critic_feedback"]
+    assert fresh["candidate_duplicate"] is False
+    assert fresh["candidate_embedding"] is None
+
+
+def test_slots_of_a_repeated_topic_share_one_pool_without_overlap(monkeypatch):
+    pool = [Document(id=f"c{i}", page_content=f"passage {i}") for i in range(14)]
+    requests = []
+    dealt = []
+
+    def retrieve(document_set_id, topic, k, used_ids):
+        requests.append(k)
+        return pool[:k]
+
+    async def generator(state):
+        dealt.append([doc.id for doc in state["slot_passages"]])
+        state = await _fake_generator(state)
+        state["candidate_question"]["stem"] += f" ({len(dealt)})"
+        return state
+
+    _patch_nodes(monkeypatch, generator)
+    monkeypatch.setattr(assessment_graph, "retrieve_diverse_passages", retrieve)
+    state = {"document_set_id": "set", "topics": ["Classes"], "num_questions": 3, "max_attempts": 12}
+
+    state = asyncio.run(batch_node(state, concurrency=3))
+
+    assert requests == [18]
+    # 14 passages only make two full shares of 6, so the third slot is not started.
+    assert len(dealt) == 2
+    assert not set(dealt[0]) & set(dealt[1])
+    assert state["step_count"] == 2
+
+
+def test_feedback_from_every_slot_of_a_repeated_topic_is_kept(monkeypatch):
+    pool = [Document(id=f"c{i}", page_content=f"passage {i}") for i in range(12)]
+    verdicts = iter(["The answer is not in the passage.", "Two options are correct."])
+
+    async def critic(state):
+        state["last_verdict"] = "reject"
+        state["critic_feedback"] = next(verdicts)
+        return state
+
+    _patch_nodes(monkeypatch)
+    monkeypatch.setattr(assessment_graph, "critic_node", critic)
+    monkeypatch.setattr(assessment_graph, "retrieve_diverse_passages", lambda *args: pool)
+    state = {"document_set_id": "set", "topics": ["Classes"], "num_questions": 2, "max_attempts": 12}
+
+    state = asyncio.run(batch_node(state, concurrency=2))
+
+    assert state["num_rejected"] == 2
+    assert state["topic_feedback"]["Classes"] == "The answer is not in the passage. Two options are correct."
@@ -0,0 +1,77 @@
+import asyncio
+
+from app.schemas import AssessmentRequest
+from app.services import assessments
+
+
+def _question(qid):
+    return {"id": qid, "stem": f"Stem {qid}?", "options": ["A", "B", "C", "D"], "correct_option_index": 0}
+
+
+class _FakeGraph:
+    def __init__(self, updates):
+        self.updates = updates
+        self.closed = False
+
+    async def astream(self, state, config=None, stream_mode=None):
+        try:
+            for update in self.updates:
+                yield update
+        finally:
+            self.closed = True
+
+
+def _patch_graph(monkeypatch, graph):
+    """Run ``stream_assessments`` on ``graph`` without touching the question bank or the embedder."""
+    stored = []
+
+    async def store_new_questions(document_set_id, questions, stem_vectors):
+        stored.append([q["id"] for q in questions])
+
+    monkeypatch.setattr(assessments, "_assessment_graph", graph)
+    monkeypatch.setattr(assessments, "_store_new_questions", store_new_questions)
+    return stored
+
+
+def _collect(agen, limit=None):
+    async def run():
+        events = []
+        async for event in agen:
+            events.append(event)
+            if limit is not None and len(events) >= limit:
+                await agen.aclose()
+                break
+        return events
+
+    return asyncio.run(run())
+
+
+def test_stream_assessments_emits_questions_and_rejections(monkeypatch):
+    q1, q2 = _question("q1"), _question("q2")
+    graph = _FakeGraph(
+        [
+            {"generator": {"questions": []}},
+            {"critic": {"questions": [q1], "num_rejected": 0}},
+            {"route": {"questions": [q1]}},
+            {"critic": {"questions": [q1], "num_rejected": 1}},
+            {"critic": {"questions": [q1, q2], "num_rejected": 1}},
+        ]
+    )
+    stored = _patch_graph(monkeypatch, graph)
+
+    events = _collect(assessments.stream_assessments(AssessmentRequest(document_set_id="s", num_questions=2, use_question_bank=False)))
+
+    assert [e["event"] for e in events] == ["question", "rejected", "question", "done"]
+    assert [events[0]["question"]["id"], events[2]["question"]["id"]] == ["q1", "q2"]
+    assert events[-1] == {"event": "done", "num_generated": 2, "num_rejected": 1, "num_from_bank": 0}
+    assert stored == [["q1", "q2"]]
+
+
+def test_stream_assessments_closes_graph_when_consumer_stops(monkeypatch):
+    graph = _FakeGraph([{"critic": {"questions": [_question(f"q{i}") for i in range(n)]}} for n in range(1, 5)])
+    _patch_graph(monkeypatch, graph)
+
+    events = _collect(assessments.stream_assessments(AssessmentRequest(document_set_id="s", use_question_bank=False)), limit=1)
+
+    assert len(events) == 1
+    assert graph.closed
@@ -0,0 +1,45 @@
+from app.rag.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def _index():
+    index = BM25Index()
+    index.add(
+        ["intro", "encap", "poly"],
+        [
+            "An introduction to programming and to software teams.",
+            "Encapsulation is defined as bundling data with the methods that use it.",
+            "Polymorphism lets one interface stand for many implementations.",
+        ],
+    )
+    return index
+
+
+def test_tokenize_lowercases_and_drops_stopwords():
+    assert tokenize("What IS the Definition of Encapsulation?") == ["definition", "encapsulation"]
+
+
+def test_bm25_ranks_exact_term_matches_first():
+    ranked = _index().search("definition of encapsulation", k=3)
+    assert [item_id for item_id, _ in ranked] == ["encap"]
+
+
+def test_bm25_add_replaces_and_remove_forgets(tmp_path):
+    index = _index()
+    index.add(["encap"], ["Information hiding restricts access to fields."])
+    index.remove(["poly"])
+
+    assert index.search("encapsulation", k=3) == []
+    assert [item_id for item_id, _ in index.search("hiding", k=3)] == ["encap"]
+    assert "poly" not in index
+
+    path = tmp_path / "index.json"
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 2
+    assert loaded.search("hiding", k=3) == index.search("hiding", k=3)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+    assert fused[0] == "b"
+    assert set(fused) == {"a", "b", "c", "d"}
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.cache import LRUCache, SingleFlight
+
+
+def test_lru_cache_evicts_least_recently_used():
+    evicted = []
+    cache = LRUCache(2, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert evicted == ["b"]
+    assert "b" not in cache
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_get_or_create_counts_hits_and_misses():
+    cache = LRUCache(4)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_create("key", factory) == "value"
+    assert cache.get_or_create("key", factory) == "value"
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 0
+
+
+def test_lru_cache_discard_where_only_drops_matching_keys():
+    cache = LRUCache(8)
+    cache.put(("set-a", "q1"), 1)
+    cache.put(("set-a", "q2"), 2)
+    cache.put(("set-b", "q1"), 3)
+
+    removed = cache.discard_where(lambda key: key[0] == "set-a")
+
+    assert removed == 2
+    assert ("set-b", "q1") in cache
+    assert ("set-a", "q1") not in cache
+
+
+def test_single_flight_shares_one_run_between_concurrent_callers():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def run():
+        results = await asyncio.gather(*(flights.do("key", work) for _ in range(3)), flights.do("other", work))
+        again = await flights.do("key", work)
+        return results, again
+
+    results, again = asyncio.run(run())
+    assert results[:3] == [2, 2, 2]
+    assert again == 3
+    assert flights.stats() == {"in_flight": 0, "started": 3, "coalesced": 2}
+
+
+def test_single_flight_survives_a_cancelled_caller_and_propagates_errors():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("key", work))
+        second = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(ValueError):
+            await second
+        return first.cancelled()
+
+    assert asyncio.run(run())
@@ -0,0 +1,42 @@
+from langchain_core.embeddings import Embeddings
+
+from app.rag.embedding_cache import CachedEmbeddings, EmbeddingStore, embedding_key
+
+
+class _CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [float(len(text)), 0.0, 0.5]
+
+
+def test_cached_embeddings_only_embeds_unseen_texts(tmp_path):
+    model = _CountingEmbeddings()
+    embeddings = CachedEmbeddings(model, EmbeddingStore(tmp_path))
+
+    first = embeddings.embed_documents(["alpha", "beta"])
+    second = embeddings.embed_documents(["beta", "gamma", "alpha"])
+
+    assert model.calls == 3
+    assert second[0] == first[1]
+    assert second[2] == first[0]
+    assert embeddings.stats()["hits"] == 2
+
+
+def test_embedding_store_survives_reopen_and_torn_writes(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    key = embedding_key("query", "encapsulation")
+    store.put_many([key], [[0.25, 0.5]])
+
+    with (tmp_path / "vectors.f32").open("ab") as f:
+        f.write(b"\x00\x00")
+
+    reopened = EmbeddingStore(tmp_path)
+    assert len(reopened) == 1
+    assert reopened.get_many([key, embedding_key("query", "other")]) == [[0.25, 0.5], None]
@@ -0,0 +1,121 @@
+import asyncio
+import io
+import threading
+import time
+
+from fastapi import UploadFile
+
+from app.rag import vectorstore
+from app.rag.vectorstore import discard_upload, store_upload
+from app.services.ingestion_jobs import IngestionJobManager, IngestionJobStore, describe_job
+
+
+def test_describe_job_reports_throughput_and_eta(tmp_path):
+    store = IngestionJobStore(tmp_path / "jobs.sqlite3")
+    job = store.create("set-1", "notes.pdf", tmp_path / "notes.pdf")
+    assert describe_job(job)["eta_seconds"] is None
+
+    started = job["created_at"]
+    store.update(
+        job["job_id"],
+        status="running",
+        started_at=started,
+        total_pages=100,
+        pages_parsed=25,
+        chunks_embedded=50,
+    )
+    running = store.get(job["job_id"])
+    running["finished_at"] = started + 10.0  # freeze the clock for the assertion
+    described = describe_job(running)
+
+    assert described["pages_per_second"] == 2.5
+    assert described["chunks_per_second"] == 5.0
+    assert described["eta_seconds"] == 30.0
+
+
+def test_unfinished_jobs_survive_reopening_the_store(tmp_path):
+    db_path = tmp_path / "jobs.sqlite3"
+    job = IngestionJobStore(db_path).create("set-1", "notes.pdf", tmp_path / "notes.pdf")
+
+    reopened = IngestionJobStore(db_path)
+
+    assert [j["job_id"] for j in reopened.unfinished()] == [job["job_id"]]
+
+
+def test_uploads_with_the_same_name_are_staged_separately(tmp_path, monkeypatch):
+    monkeypatch.setattr(vectorstore.settings, "uploads_dir", tmp_path)
+
+    async def upload(content):
+        return await store_upload(UploadFile(io.BytesIO(content), filename="notes.pdf"), "set-1")
+
+    first = asyncio.run(upload(b"first"))
+    second = asyncio.run(upload(b"second"))
+
+    assert first != second
+    assert first.read_bytes() == b"first"
+    discard_upload(second)
+    assert not second.parent.exists()
+    assert first.exists()
+
+
+def test_an_interrupted_job_is_resumed_without_dropping_its_index(tmp_path, monkeypatch):
+    store = IngestionJobStore(tmp_path / "jobs.sqlite3")
+    job = store.create("set-1", "notes.pdf", tmp_path / "notes.pdf")
+    store.update(job["job_id"], status="running", started_at=1.0)
+    calls = []
+
+    class _Reader:
+        def __init__(self, path):
+            self.pages = [1, 2]
+
+    def fake_index_pdf(file_path, document_set_id, source_file, progress=None):
+        calls.append((document_set_id, source_file))
+        return {"num_pages": 2, "num_chunks": 3, "num_new_chunks": 1, "num_reused_chunks": 2}
+
+    monkeypatch.setattr("app.services.ingestion_jobs.PdfReader", _Reader)
+    monkeypatch.setattr("app.services.ingestion_jobs.index_pdf", fake_index_pdf)
+    monkeypatch.setattr(vectorstore, "delete_source_chunks", lambda *args: calls.append("deleted"))
+
+    IngestionJobManager(store, num_workers=1, queue_size=1)._run(job["job_id"])
+
+    assert calls == [("set-1", "notes.pdf")]
+    assert store.get(job["job_id"])["status"] == "completed"
+    assert store.get(job["job_id"])["chunks_reused"] == 2
+
+
+def test_jobs_for_the_same_file_never_index_at_once(tmp_path, monkeypatch):
+    store = IngestionJobStore(tmp_path / "jobs.sqlite3")
+    jobs = [
+        store.create("set-1", "notes.pdf", tmp_path / "v1.pdf"),
+        store.create("set-1", "notes.pdf", tmp_path / "v2.pdf"),
+        store.create("set-1", "other.pdf", tmp_path / "other.pdf"),
+    ]
+    running = []
+    overlaps = []
+    lock = threading.Lock()
+
+    class _Reader:
+        def __init__(self, path):
+            self.pages = [1]
+
+    def fake_index_pdf(file_path, document_set_id, source_file, progress=None):
+        with lock:
+            overlaps.extend(name for name in running if name == source_file)
+            running.append(source_file)
+        time.sleep(0.05)
+        with lock:
+            running.remove(source_file)
+        return {"num_pages": 1, "num_chunks": 1, "num_new_chunks": 1, "num_reused_chunks": 0}
+
+    monkeypatch.setattr("app.services.ingestion_jobs.PdfReader", _Reader)
+    monkeypatch.setattr("app.services.ingestion_jobs.index_pdf", fake_index_pdf)
+    manager = IngestionJobManager(store, num_workers=3, queue_size=3)
+
+    threads = [threading.Thread(target=manager._run, args=(job["job_id"],)) for job in jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps == []
+    assert all(store.get(job["job_id"])["status"] == "completed" for job in jobs)
@@ -0,0 +1,53 @@
+from app.llm.json_extract import JSONObjectStream, extract_json_object
+
+
+def test_extract_json_object_handles_fences_and_prose():
+    assert extract_json_object('{"a": 1}') == {"a": 1}
+    assert extract_json_object('```json\n{"a": {"b": "}"}}\n```') == {"a": {"b": "}"}}
+    assert extract_json_object('Here is {the plan}: {"a": "x\\"{"} - done') == {"a": 'x"{'}
+    assert extract_json_object('[1, 2] then {"b": 2}') == {"b": 2}
+
+
+def test_extract_json_object_rejects_broken_output():
+    assert extract_json_object("no json here") is None
+    assert extract_json_object('{"a": 1') is None
+    assert extract_json_object('{"a": 1,}') is None
+
+
+def _feed_in_chunks(stream, text, size):
+    batches = [stream.feed(text[start : start + size]) for start in range(0, len(text), size)]
+    return batches
+
+
+def test_json_object_stream_emits_items_as_they_close():
+    text = (
+        '```json\n{"module_title": "OOP", "segments": ['
+        '{"title": "Intro {basics}", "duration_minutes": 10, "meta": {"k": 1}}, '
+        '{"title": "Say \\"hi\\" ]", "duration_minutes": 20}'
+        '], "notes": {"title": "not a segment"}}\n```'
+    )
+    for size in (1, 3, 7, len(text)):
+        stream = JSONObjectStream(item_key="segments")
+        batches = _feed_in_chunks(stream, text, size)
+
+        items = [item for batch in batches for item in batch]
+        assert [item["title"] for item in items] == ["Intro {basics}", 'Say "hi" ]']
+        assert stream.finish() == extract_json_object(text)
+        assert stream.text == text
+
+    stream = JSONObjectStream(item_key="segments")
+    batches = _feed_in_chunks(stream, text, 7)
+    first = next(i for i, batch in enumerate(batches) if batch)
+    assert first < len(batches) - 5
+
+
+def test_json_object_stream_falls_back_on_unfinished_output():
+    stream = JSONObjectStream()
+    stream.feed('Sure: {"a": 1')
+    assert stream.result is None
+    assert stream.finish() is None
+
+
+def test_extract_json_object_does_not_return_nested_object_of_truncated_output():
+    truncated = '{"module_title": "OOP", "segments": [{"title": "Intro"}, {"title": "Cla'
+    assert extract_json_object(truncated) is None
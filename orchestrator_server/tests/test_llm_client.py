@@ -0,0 +1,50 @@
+import asyncio
+
+from app.llm.client import LLMClient, call_llm
+from app.llm.scheduler import LLMScheduler
+
+
+class _SlowModel:
+    def __init__(self, delay):
+        self.delay = delay
+        self.cancelled = False
+
+    async def ainvoke(self, prompt):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return type("Response", (), {"content": f"echo: {prompt}"})()
+
+
+def test_call_llm_returns_none_and_cancels_past_deadline():
+    model = _SlowModel(delay=5)
+
+    result = asyncio.run(call_llm(model, "hi", timeout_seconds=0.05))
+
+    assert result is None
+    assert model.cancelled is True
+
+
+def test_llm_client_caps_concurrent_calls():
+    async def scenario():
+        client = LLMClient(LLMScheduler(2, max_queue_depth=100))
+        running = 0
+        peak = 0
+
+        class _Tracking:
+            async def ainvoke(self, prompt):
+                nonlocal running, peak
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+                return type("Response", (), {"content": prompt})()
+
+        results = await asyncio.gather(*(client.ainvoke(_Tracking(), str(i), 1.0) for i in range(6)))
+        return results, peak
+
+    results, peak = asyncio.run(scenario())
+    assert results == [str(i) for i in range(6)]
+    assert peak == 2
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.llm.scheduler import LLMQueueFull, LLMScheduler, _request_context, llm_request
+from app.schemas import PracticeRequest
+from app.services import planner, practice
+
+
+def _run_order(scheduler, jobs):
+    """Start ``jobs`` ((priority, tenant, label) tuples) behind one busy slot; return labels in run order."""
+    order = []
+
+    async def call(priority, tenant, label):
+        with llm_request(priority, tenant):
+            async with scheduler.slot():
+                order.append(label)
+                await asyncio.sleep(0)
+
+    async def scenario():
+        blocker = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await blocker.wait()
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        tasks = [asyncio.ensure_future(call(*job)) for job in jobs]
+        await asyncio.sleep(0)
+        blocker.set()
+        await asyncio.gather(holder, *tasks)
+
+    asyncio.run(scenario())
+    return order
+
+
+def test_classes_share_slots_by_weight():
+    scheduler = LLMScheduler(1, max_queue_depth=100, weights={"practice": 2.0, "assessment": 1.0})
+    jobs = [("assessment", "lecturer", f"a{i}") for i in range(6)] + [
+        ("practice", "student", f"p{i}") for i in range(6)
+    ]
+
+    order = _run_order(scheduler, jobs)
+
+    # Practice is favoured, but bulk assessment work is not starved.
+    assert sum(label.startswith("p") for label in order[:6]) >= 4
+    assert "a0" in order[:6]
+
+
+def test_tenants_take_turns_within_a_class():
+    scheduler = LLMScheduler(1, max_queue_depth=100)
+    jobs = [("assessment", "big", f"big{i}") for i in range(3)] + [("assessment", "small", "small0")]
+
+    order = _run_order(scheduler, jobs)
+
+    assert order.index("small0") <= 1
+
+
+def test_admit_rejects_when_queue_is_deep_and_cancelled_waiters_leave_the_queue():
+    scheduler = LLMScheduler(1, max_queue_depth=1)
+
+    async def scenario():
+        async with scheduler.slot():
+            waiter = asyncio.ensure_future(scheduler.slot().__aenter__())
+            await asyncio.sleep(0)
+            with pytest.raises(LLMQueueFull):
+                scheduler.admit("plan")
+            waiter.cancel()
+            await asyncio.sleep(0)
+            scheduler.admit("plan")
+
+    asyncio.run(scenario())
+    stats = scheduler.stats()
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+    assert stats["plan_rejected"] == 1
+    assert stats["assessment_completed"] == 1
+
+
+def test_practice_and_plan_requests_are_queued_under_their_class_and_tenant(monkeypatch):
+    seen = []
+
+    class _Graph:
+        async def ainvoke(self, state, config=None):
+            seen.append(_request_context.get())
+            return {"questions": [{"stem": "What is a loop?"}]}
+
+    async def no_cached_plan(*args):
+        return None, "miss", None
+
+    monkeypatch.setattr(practice, "_quiz_graph", _Graph())
+    monkeypatch.setattr(planner, "_planner_graph", _Graph())
+    monkeypatch.setattr(planner, "_lookup_cached_plan", no_cached_plan)
+    async def store_plan(*args):
+        return None
+
+    monkeypatch.setattr(planner, "_store_plan", store_plan)
+
+    response = asyncio.run(
+        practice.generate_practice_questions(PracticeRequest(course_id="course-1", topic="Loops", num_questions=1))
+    )
+    asyncio.run(planner.get_lecture_plan("OOP", "Year 1", 60, tenant="course-2"))
+
+    assert response.questions == [{"stem": "What is a loop?"}]
+    assert seen == [("practice", "course-1"), ("plan", "course-2")]
@@ -0,0 +1,25 @@
+import numpy as np
+
+from app.rag.mmr import mmr_select
+
+
+def test_mmr_skips_near_duplicates_of_selected_passages():
+    vectors = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]])
+    relevance = [1.0, 0.95, 0.5]
+
+    assert mmr_select(relevance, vectors, k=2, lambda_mult=1.0) == [0, 1]
+    assert mmr_select(relevance, vectors, k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_mmr_penalty_prefers_unused_passages():
+    vectors = np.eye(3)
+    relevance = [1.0, 0.9, 0.8]
+
+    chosen = mmr_select(relevance, vectors, k=2, lambda_mult=0.6, penalty=[0.5, 0.5, 0.0])
+
+    assert chosen == [2, 0]
+
+
+def test_mmr_handles_small_pools():
+    assert mmr_select([], np.zeros((0, 2)), k=3, lambda_mult=0.5) == []
+    assert mmr_select([0.3], np.ones((1, 2)), k=3, lambda_mult=0.5) == [0]
@@ -0,0 +1,45 @@
+import time
+
+from app.services.plan_cache import PlanCache, plan_cache_key, plan_query_text
+
+
+def _cache(tmp_path, **overrides):
+    options = {"ttl_seconds": 3600, "max_entries": 10, "similarity_threshold": 0.9}
+    options.update(overrides)
+    return PlanCache(tmp_path / "plans.sqlite3", **options)
+
+
+def test_exact_key_ignores_case_and_spacing():
+    assert plan_cache_key("Fundamentals  of OOP", "Undergraduate", 600) == plan_cache_key(
+        "fundamentals of oop", " undergraduate ", 600
+    )
+
+
+def test_query_text_is_only_the_normalised_title_and_audience():
+    assert plan_query_text(" Fundamentals  of OOP", "Year 1 Students ") == "fundamentals of oop\nyear 1 students"
+
+
+def test_near_lookup_requires_same_duration_and_similarity(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("oop|ug|600", 600, {"module_title": "OOP"}, [1.0, 0.0, 0.0])
+
+    plan, score = cache.get_near(600, [0.95, 0.05, 0.0])
+    assert plan == {"module_title": "OOP"}
+    assert score > 0.9
+    assert cache.get_near(300, [1.0, 0.0, 0.0]) is None
+    assert cache.get_near(600, [0.0, 1.0, 0.0]) is None
+
+
+def test_entries_expire_and_least_recently_used_are_evicted(tmp_path):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.put("a", 60, {"id": "a"}, None)
+    cache.put("b", 60, {"id": "b"}, None)
+    time.sleep(0.01)
+    assert cache.get_exact("a") == {"id": "a"}
+    cache.put("c", 60, {"id": "c"}, None)
+
+    assert cache.get_exact("b") is None
+    assert cache.get_exact("a") == {"id": "a"}
+
+    expired = _cache(tmp_path, ttl_seconds=0)
+    assert expired.get_exact("a") is None
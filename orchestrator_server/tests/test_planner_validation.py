@@ -1,4 +1,4 @@
-from app.graph.planner_graph import _validate_lecture_plan
+from app.graph.planner_graph import _repair_segment_durations, _validate_lecture_plan
 
 
 def test_validate_lecture_plan_exact_match():
@@ -25,3 +25,31 @@ def test_validate_lecture_plan_out_of_tolerance():
     assert is_valid is False
     assert total == 300
 
+
+def test_repair_segment_durations_hits_target_exactly():
+    plan = {
+        "module_title": "OOP",
+        "segments": [
+            {"title": "Intro", "duration_minutes": 10},
+            {"title": "Classes", "duration_minutes": 25},
+            {"title": "Wrap-up", "duration_minutes": 10},
+        ],
+    }
+    repaired = _repair_segment_durations(plan, target_duration=100)
+    durations = [seg["duration_minutes"] for seg in repaired["segments"]]
+    assert sum(durations) == 100
+    assert durations == [22, 56, 22]
+    assert repaired["segments"][1]["title"] == "Classes"
+    assert repaired["module_title"] == "OOP"
+
+
+def test_repair_segment_durations_keeps_segments_non_empty():
+    plan = {"segments": [{"duration_minutes": 0}, {"duration_minutes": 200}]}
+    repaired = _repair_segment_durations(plan, target_duration=60)
+    assert [seg["duration_minutes"] for seg in repaired["segments"]] == [1, 59]
+
+
+def test_repair_segment_durations_rejects_broken_structure():
+    assert _repair_segment_durations({"segments": []}, target_duration=60) is None
+    assert _repair_segment_durations({"segments": [{"duration_minutes": "ten"}]}, 60) is None
+    assert _repair_segment_durations({"segments": [{"duration_minutes": 0}]}, 60) is None
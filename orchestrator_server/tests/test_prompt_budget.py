@@ -0,0 +1,108 @@
+import asyncio
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.graph import assessment_graph, student_quiz_graph
+from app.llm.prompt_budget import estimate_tokens, fit_passages
+
+
+def _doc(text, page=1):
+    return {"page_content": text, "metadata": {"source_file": "notes.pdf", "page": page}}
+
+
+def _sentences(prefix, count):
+    return " ".join(f"{prefix} sentence number {i} explains one more detail of the topic." for i in range(count))
+
+
+def test_overlapping_chunks_are_sent_once():
+    text = _sentences("Inheritance", 30)
+    chunks = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150).split_text(text)
+    assert len(chunks) >= 3
+
+    fitted = fit_passages([_doc(chunk) for chunk in chunks], "inheritance", budget_tokens=0)
+
+    joined = " ".join(doc["page_content"] for doc in fitted)
+    assert len(joined) < sum(len(chunk) for chunk in chunks)
+    for i in range(30):
+        assert joined.count(f"sentence number {i} ") == 1
+
+
+def test_contained_passages_are_dropped():
+    long = _sentences("Polymorphism", 4)
+    fitted = fit_passages([_doc(long), _doc(long[10:120])], "polymorphism", budget_tokens=0)
+    assert [doc["page_content"] for doc in fitted] == [long]
+
+
+def test_passages_are_ranked_by_query_and_trimmed_to_budget():
+    passages = [
+        _doc(_sentences("Memory", 8), page=1),
+        _doc(_sentences("Encapsulation hides state", 8), page=2),
+        _doc(_sentences("Networking", 8), page=3),
+    ]
+
+    fitted = fit_passages(passages, "How does encapsulation hide state?", budget_tokens=200)
+
+    assert fitted[0]["metadata"]["page"] == 2
+    assert sum(estimate_tokens(doc["page_content"]) for doc in fitted) <= 200
+    assert fitted[-1]["page_content"].endswith(".")
+    assert passages[1]["page_content"].startswith(fitted[0]["page_content"][:50])
+
+
+def _stub_llm(monkeypatch, module, prompts, reply):
+    async def call_llm(llm, prompt, timeout):
+        prompts.append(prompt)
+        return reply
+
+    monkeypatch.setattr(module, "get_chat_model", lambda **kwargs: None)
+    monkeypatch.setattr(module, "call_llm", call_llm)
+
+
+def test_only_passages_kept_in_the_prompt_count_as_used(monkeypatch):
+    passages = [
+        Document(id="on-topic", page_content=_sentences("Encapsulation hides state", 8)),
+        Document(id="off-topic", page_content=_sentences("Networking", 8)),
+    ]
+    monkeypatch.setattr(assessment_graph, "retrieve_diverse_passages", lambda *args: passages)
+    monkeypatch.setattr(assessment_graph.settings, "prompt_budget_generator_tokens", 150)
+    _stub_llm(monkeypatch, assessment_graph, [], '{"stem": "What does encapsulation hide?", "options": []}')
+
+    state = asyncio.run(
+        assessment_graph.generator_node(
+            {"document_set_id": "set", "topics": ["Encapsulation hides state"], "used_passage_ids": ["earlier"]}
+        )
+    )
+
+    assert [doc["id"] for doc in state["supporting_passages"]] == ["on-topic"]
+    assert state["used_passage_ids"] == ["earlier", "on-topic"]
+    assert state["candidate_question"]["source_metadata"]["passage_ids"] == ["on-topic"]
+
+
+def test_practice_prompt_fits_previous_stems_and_passages_in_one_budget(monkeypatch):
+    passages = [Document(page_content=_sentences(f"Loops part {i}", 6)) for i in range(4)]
+    stems = [f"Earlier practice question {i} about loop invariants and termination?" for i in range(5)]
+    monkeypatch.setattr(student_quiz_graph, "retrieve_passages_for_course", lambda *args: passages)
+    monkeypatch.setattr(student_quiz_graph.settings, "prompt_budget_practice_tokens", 300)
+    prompts = []
+    _stub_llm(monkeypatch, student_quiz_graph, prompts, None)
+
+    state = asyncio.run(
+        student_quiz_graph.student_generator_node(
+            {"course_id": "c1", "student_topic": "Loops", "questions": [{"stem": stem} for stem in stems]}
+        )
+    )
+
+    context = sum(estimate_tokens(doc["page_content"]) for doc in state["supporting_passages"])
+    stems_block = estimate_tokens(student_quiz_graph._previous_stems_block(stems))
+    assert state["supporting_passages"]
+    assert context + stems_block <= 300
+    assert stems[-1] in prompts[0]
+
+
+def test_critic_budget_never_falls_below_the_generator_budget(monkeypatch):
+    monkeypatch.setattr(assessment_graph.settings, "prompt_budget_generator_tokens", 700)
+    monkeypatch.setattr(assessment_graph.settings, "prompt_budget_critic_tokens", 500)
+    assert assessment_graph._critic_budget() == 700
+
+    monkeypatch.setattr(assessment_graph.settings, "prompt_budget_generator_tokens", 0)
+    assert assessment_graph._critic_budget() == 0
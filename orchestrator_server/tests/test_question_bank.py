@@ -0,0 +1,82 @@
+import asyncio
+
+from app.schemas import AssessmentRequest
+from app.services import assessments
+from app.services.question_bank import QuestionBank
+
+
+def _bank(tmp_path):
+    return QuestionBank(tmp_path / "bank.sqlite3", similarity_threshold=0.8, duplicate_threshold=0.9)
+
+
+def _question(qid, stem=None):
+    return {"id": qid, "stem": stem or f"Stem {qid}?", "options": ["A", "B", "C", "D"], "correct_option_index": 0}
+
+
+def test_put_skips_near_duplicate_stems(tmp_path):
+    bank = _bank(tmp_path)
+    assert bank.put("s", "Classes", _question("q1"), ["c1"], [1.0, 0.0], [1.0, 0.0, 0.0])
+    assert not bank.put("s", "Classes", _question("q2"), ["c1"], [1.0, 0.0], [0.99, 0.05, 0.0])
+    assert bank.put("other", "Classes", _question("q3"), ["c1"], [1.0, 0.0], [0.99, 0.05, 0.0])
+    assert bank.stats() == {"size": 2}
+
+
+def test_lookup_matches_topics_round_robin_and_prefers_least_served(tmp_path):
+    bank = _bank(tmp_path)
+    bank.put("s", "Classes", _question("a1"), ["c1"], [1.0, 0.0], [1.0, 0.0, 0.0])
+    bank.put("s", "Classes", _question("a2"), ["c2"], [1.0, 0.0], [0.0, 1.0, 0.0])
+    bank.put("s", "Inheritance", _question("b1"), ["c3"], [0.0, 1.0], [0.0, 0.0, 1.0])
+
+    picked = bank.lookup("s", [[1.0, 0.0], [0.0, 1.0]], limit=2)
+    assert {entry["question"]["id"] for entry in picked} == {"a1", "b1"}
+
+    bank.mark_served(["a1"])
+    picked = bank.lookup("s", [[1.0, 0.0]], limit=1)
+    assert picked[0]["question"]["id"] == "a2"
+    assert picked[0]["passage_ids"] == ["c2"]
+
+    assert bank.lookup("s", [[-1.0, 0.0]], limit=3) == []
+    assert bank.lookup("missing", [[1.0, 0.0]], limit=3) == []
+
+
+def test_generate_serves_bank_and_only_generates_the_shortfall(tmp_path, monkeypatch):
+    bank = _bank(tmp_path)
+    bank.put("s", "Classes", _question("banked"), ["c1"], [1.0, 0.0], [1.0, 0.0, 0.0])
+    bank.put("s", "Classes", _question("stale"), ["gone"], [1.0, 0.0], [0.0, 1.0, 0.0])
+
+    class _Embeddings:
+        def embed_documents(self, texts):
+            return [[1.0, 0.0] for _ in texts]
+
+    seen = {}
+
+    class _Graph:
+        async def ainvoke(self, state, config=None):
+            seen.update(state)
+            fresh = _question("fresh")
+            fresh["source_metadata"] = {"topic": "Classes", "passage_ids": ["c2"]}
+            return {
+                "questions": [fresh],
+                "num_rejected": 0,
+                "stem_vectors": state["stem_vectors"] + [{"stem": fresh["stem"], "embedding": [0.0, 0.0, 1.0]}],
+            }
+
+    monkeypatch.setattr(assessments, "_question_bank", bank)
+    monkeypatch.setattr(assessments, "_assessment_graph", _Graph())
+    monkeypatch.setattr(assessments, "get_embeddings", lambda: _Embeddings())
+    monkeypatch.setattr(assessments, "existing_chunk_ids", lambda set_id, ids: {"c1", "c2"} & set(ids))
+
+    response = asyncio.run(
+        assessments.generate_assessments(
+            AssessmentRequest(document_set_id="s", num_questions=2, focus_topics=["Classes"])
+        )
+    )
+
+    assert [q.id for q in response.questions] == ["banked", "fresh"]
+    assert response.num_from_bank == 1
+    assert response.questions[0].source_metadata["question_bank"] is True
+    assert seen["num_questions"] == 1
+    assert [entry["stem"] for entry in seen["stem_vectors"]] == ["Stem banked?"]
+    # The stale question was dropped and the fresh one banked.
+    assert bank.stats() == {"size": 2}
+    assert {e["question"]["id"] for e in bank.lookup("s", [[1.0, 0.0]], limit=5)} == {"banked", "fresh"}
@@ -0,0 +1,54 @@
+from app.graph.question_checks import check_question, option_text
+
+PASSAGES = [
+    {"page_content": "Encapsulation bundles data with the methods that operate on that data."},
+    {"page_content": "Inheritance lets a subclass reuse the behaviour of its parent class."},
+]
+
+
+def _question(**overrides):
+    question = {
+        "stem": "What does encapsulation do?",
+        "options": [
+            "A. Bundles data with the methods that operate on that data",
+            "B. Compiles classes ahead of time",
+            "C. Deletes unused objects",
+            "D. Sorts records by key",
+        ],
+        "correct_option_index": 0,
+    }
+    question.update(overrides)
+    return question
+
+
+def _check(question, passages=PASSAGES, fast_accept=True):
+    return check_question(question, passages, min_answer_overlap=0.25, fast_accept=fast_accept)
+
+
+def test_option_text_strips_letter_labels():
+    assert option_text("A. Bundles data") == "Bundles data"
+    assert option_text("(c) Deletes") == "Deletes"
+    assert option_text("b) Sorts") == "Sorts"
+
+
+def test_precheck_rejects_malformed_questions():
+    assert _check(_question(stem="  "))[0] == "reject"
+    assert _check(_question(options=["A. x", "B. y", "C. z"]))[0] == "reject"
+    assert _check(_question(options=["A. x", "B. y", "C. z", "D. "]))[0] == "reject"
+    assert _check(_question(options=["A. Same", "B. same!", "C. z", "D. w"]))[0] == "reject"
+    assert _check(_question(correct_option_index=4))[0] == "reject"
+
+
+def test_precheck_rejects_answers_missing_from_context():
+    verdict, reason = _check(_question(correct_option_index=1))
+    assert verdict == "reject"
+    assert "Compiles classes ahead of time" in reason
+
+
+def test_precheck_fast_accepts_verbatim_answers_only():
+    assert _check(_question()) == ("accept", "")
+    assert _check(_question(), fast_accept=False) == ("pass", "")
+
+    paraphrased = _question(options=["A. Groups data together with methods", *_question()["options"][1:]])
+    assert _check(paraphrased) == ("pass", "")
+    assert _check(_question(), passages=[]) == ("pass", "")
@@ -0,0 +1,255 @@
+import hashlib
+
+import chromadb
+import pytest
+from chromadb.config import Settings as ChromaSettings
+from langchain_core.documents import Document
+
+from app.cache import LRUCache
+from app.rag import vectorstore
+from app.rag.embedding_cache import CachedEmbeddings, open_embedding_store
+from app.rag.vectorstore import chunk_id, delete_source_chunks, get_lexical_index, index_pdf
+
+
+class _FakeEmbeddings:
+    """Deterministic 8-dimensional vectors; records every batch sent to the model."""
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+    @staticmethod
+    def _vector(text):
+        return [byte / 255 for byte in hashlib.md5(text.encode("utf-8")).digest()[:8]]
+
+
+class _FakeLoader:
+    """Stands in for PyPDFLoader: one page per line of the fake PDF file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def lazy_load(self):
+        with open(self.path, encoding="utf-8") as f:
+            pages = f.read().split("\n")
+        for number, text in enumerate(pages):
+            yield Document(page_content=text, metadata={"source": self.path, "page": number})
+
+
+class _FakeReader:
+    def __init__(self, path):
+        with open(path, encoding="utf-8") as f:
+            self.pages = f.read().split("\n")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    fake = _FakeEmbeddings()
+    client = chromadb.PersistentClient(
+        path=str(tmp_path / "chroma"), settings=ChromaSettings(anonymized_telemetry=False)
+    )
+    (tmp_path / "bm25").mkdir()
+    monkeypatch.setattr(vectorstore.settings, "bm25_index_dir", tmp_path / "bm25")
+    monkeypatch.setattr(vectorstore, "_chroma_client", client)
+    monkeypatch.setattr(
+        vectorstore, "_embeddings", CachedEmbeddings(fake, open_embedding_store(tmp_path / "emb", "fake"))
+    )
+    monkeypatch.setattr(vectorstore, "_vectorstores", LRUCache(8))
+    monkeypatch.setattr(vectorstore, "_lexical_indexes", LRUCache(8))
+    monkeypatch.setattr(vectorstore, "PyPDFLoader", _FakeLoader)
+    monkeypatch.setattr(vectorstore, "PdfReader", _FakeReader)
+    return fake
+
+
+def _paragraph(topic, n=3):
+    return " ".join(f"{topic} detail {i} is described in this sentence of the notes." for i in range(n))
+
+
+def _pdf(tmp_path, name, pages):
+    path = tmp_path / name
+    path.write_text("\n".join(pages), encoding="utf-8")
+    return path
+
+
+def _chunks(source_file=None):
+    collection = vectorstore._get_collection("set")
+    where = {"source_file": source_file} if source_file else None
+    stored = collection.get(where=where, include=["documents", "metadatas"])
+    return dict(zip(stored["ids"], zip(stored["documents"], stored["metadatas"])))
+
+
+def test_chunk_id_ignores_whitespace_layout_and_is_scoped_to_the_file():
+    assert chunk_id("a.pdf", "Polymorphism  lets\nobjects vary") == chunk_id("a.pdf", "Polymorphism lets objects vary")
+    assert chunk_id("a.pdf", "Polymorphism") != chunk_id("a.pdf", "polymorphism")
+    assert chunk_id("a.pdf", "Polymorphism") != chunk_id("b.pdf", "Polymorphism")
+
+
+def test_files_sharing_text_keep_their_own_chunks(tmp_path, store):
+    shared = _paragraph("Shared")
+    index_pdf(_pdf(tmp_path, "a.pdf", [_paragraph("Alpha"), shared]), "set", "a.pdf")
+    result = index_pdf(_pdf(tmp_path, "b.pdf", [shared]), "set", "b.pdf")
+
+    # b.pdf stores its own chunk, but its embedding comes from the cache.
+    assert result["num_chunks"] == 1
+    assert result["num_new_chunks"] == 0
+
+    index_pdf(_pdf(tmp_path, "a.pdf", [_paragraph("Alpha")]), "set", "a.pdf")
+    b_chunks = _chunks("b.pdf")
+    assert [text for text, _ in b_chunks.values()] == [shared]
+    assert set(b_chunks) <= set(item_id for item_id, _ in get_lexical_index("set").search("shared", 10))
+
+    delete_source_chunks("set", "a.pdf")
+    assert set(_chunks()) == set(b_chunks)
+    assert [item_id for item_id, _ in get_lexical_index("set").search("shared", 10)] == list(b_chunks)
+
+
+def _pages_by_text(source_file):
+    return {text: meta["page"] for text, meta in _chunks(source_file).values()}
+
+
+def test_reupload_keeps_unchanged_pages_and_reembeds_changed_ones(tmp_path, store):
+    a, b, c = _paragraph("Alpha"), _paragraph("Beta"), _paragraph("Gamma")
+    index_pdf(_pdf(tmp_path, "other.pdf", [b]), "set", "other.pdf")
+    index_pdf(_pdf(tmp_path, "notes.pdf", [a, b]), "set", "notes.pdf")
+    store.batches.clear()
+
+    result = index_pdf(_pdf(tmp_path, "notes.pdf", [a, c]), "set", "notes.pdf")
+
+    assert result["num_unchanged_pages"] == 1
+    assert result["num_new_chunks"] == 1
+    assert result["num_deleted_chunks"] == 1
+    assert store.batches == [[c]]
+    assert _pages_by_text("notes.pdf") == {a: 0, c: 1}
+    assert _pages_by_text("other.pdf") == {b: 0}
+    assert [item_id for item_id, _ in get_lexical_index("set").search("gamma", 10)] == [chunk_id("notes.pdf", c)]
+
+
+def test_inserted_page_shifts_metadata_and_reverting_removes_it(tmp_path, store):
+    a, b, cover = _paragraph("Alpha"), _paragraph("Beta"), _paragraph("Cover")
+    v1 = [a, b]
+    index_pdf(_pdf(tmp_path, "notes.pdf", v1), "set", "notes.pdf")
+
+    v2_path = _pdf(tmp_path, "notes.pdf", [cover, a, b])
+    result = index_pdf(v2_path, "set", "notes.pdf")
+
+    assert result["num_unchanged_pages"] == 2
+    assert result["num_new_chunks"] == 1
+    assert _pages_by_text("notes.pdf") == {cover: 0, a: 1, b: 2}
+    v2_sha = vectorstore._file_sha256(v2_path)
+    assert {meta["file_sha256"] for _, meta in _chunks("notes.pdf").values()} == {v2_sha}
+
+    result = index_pdf(_pdf(tmp_path, "notes.pdf", v1), "set", "notes.pdf")
+
+    assert result["num_deleted_chunks"] == 1
+    assert _pages_by_text("notes.pdf") == {a: 0, b: 1}
+    assert get_lexical_index("set").search("cover", 10) == []
+
+
+def test_identical_reupload_is_skipped_only_after_a_complete_run(tmp_path, store):
+    a, b = _paragraph("Alpha"), _paragraph("Beta")
+    path = _pdf(tmp_path, "notes.pdf", [a, b])
+    index_pdf(path, "set", "notes.pdf")
+    store.batches.clear()
+
+    assert index_pdf(path, "set", "notes.pdf")["num_new_chunks"] == 0
+    assert store.batches == []
+
+    # A run interrupted after writing its chunks has not set file_sha256 on them yet.
+    collection = vectorstore._get_collection("set")
+    stored = collection.get(include=["metadatas"])
+    collection.update(
+        ids=stored["ids"],
+        metadatas=[{k: v for k, v in meta.items() if k != "file_sha256"} for meta in stored["metadatas"]],
+    )
+    result = index_pdf(path, "set", "notes.pdf")
+
+    assert result["num_unchanged_pages"] == 2
+    assert store.batches == []
+    assert all(meta.get("file_sha256") for _, meta in _chunks("notes.pdf").values())
+
+
+class _LazyExecutor:
+    """Stands in for ThreadPoolExecutor: runs a task only when its result is asked for."""
+
+    max_pending = 0
+
+    def __init__(self, max_workers, thread_name_prefix=""):
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        executor = self
+
+        class _Future:
+            def result(self):
+                executor.pending.remove(self)
+                return fn(*args)
+
+        future = _Future()
+        self.pending.append(future)
+        _LazyExecutor.max_pending = max(_LazyExecutor.max_pending, len(self.pending))
+        return future
+
+
+def test_chunks_are_embedded_in_bounded_batches_with_bounded_batches_in_flight(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(vectorstore.settings, "ingest_embed_batch_size", 2)
+    monkeypatch.setattr(vectorstore.settings, "ingest_embed_workers", 1)
+    monkeypatch.setattr(vectorstore, "ThreadPoolExecutor", _LazyExecutor)
+    _LazyExecutor.max_pending = 0
+    pages = [_paragraph(f"Topic{i}") for i in range(7)]
+    progress = []
+
+    result = index_pdf(_pdf(tmp_path, "notes.pdf", pages), "set", "notes.pdf", lambda *p: progress.append(p))
+
+    assert [len(batch) for batch in store.batches] == [2, 2, 2, 1]
+    # ingest_embed_workers * 2 batches may be queued before the oldest is written.
+    assert _LazyExecutor.max_pending == 2
+    assert result == {
+        "num_pages": 7,
+        "num_chunks": 7,
+        "num_new_chunks": 7,
+        "num_reused_chunks": 0,
+        "num_unchanged_pages": 0,
+        "num_deleted_chunks": 0,
+    }
+    assert progress[-1] == (7, 7)
+    assert len(_chunks("notes.pdf")) == 7
+
+
+def test_a_failed_batch_fails_the_whole_index_run(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(vectorstore.settings, "ingest_embed_batch_size", 2)
+
+    def embed_documents(texts):
+        if any("Broken" in text for text in texts):
+            raise RuntimeError("embedding model unavailable")
+        return [store._vector(text) for text in texts]
+
+    monkeypatch.setattr(store, "embed_documents", embed_documents)
+    pages = [_paragraph("Alpha"), _paragraph("Beta"), _paragraph("Broken")]
+
+    with pytest.raises(RuntimeError, match="embedding model unavailable"):
+        index_pdf(_pdf(tmp_path, "notes.pdf", pages), "set", "notes.pdf")
+    # Nothing is marked complete, so the next upload indexes the file again.
+    assert not any(meta.get("file_sha256") for _, meta in _chunks("notes.pdf").values())
+
+
+def test_collection_handles_come_from_the_registry(tmp_path, store):
+    index_pdf(_pdf(tmp_path, "notes.pdf", [_paragraph("Alpha")]), "set", "notes.pdf")
+    before = vectorstore.vectorstore_cache_stats()
+
+    vectorstore.retrieve_diverse_passages("set", "alpha detail", k=1)
+
+    after = vectorstore.vectorstore_cache_stats()
+    assert after["hits"] > before["hits"]
+    assert after["misses"] == before["misses"]